@@ -0,0 +1,274 @@
+"""asyncio versions of the database.py (and sessions.py) functions.
+
+    books, total = await asyncio.gather(get_books(limit=50), count_books())
+
+Reads run on a pool of reader threads, each holding its own pooled
+connection. Writes go to one writer thread (so one connection) that
+group-commits everything queued while the previous batch was committing.
+Every function takes an optional timeout=; when a read is cancelled or
+times out its running statement is interrupted, and a write that has not
+started yet is dropped from the queue.
+"""
+import os
+import asyncio
+import threading
+from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+import overdue
+import sessions
+from database import validate_email, validate_password, get_cache_stats, get_pool_stats
+
+
+READERS   = int(os.getenv('ASYNC_DB_READERS', '4'))
+MAX_BATCH = int(os.getenv('ASYNC_DB_MAX_BATCH', '256'))
+TIMEOUT   = float(os.getenv('ASYNC_DB_TIMEOUT', '0')) or None
+
+
+class Writer:
+    """Single writer that group-commits queued write operations.
+
+    A batch runs on one dedicated thread inside one BEGIN IMMEDIATE
+    transaction, every operation in its own savepoint so a failing one
+    cannot undo the rest. The pooled connection is re-entrant per thread,
+    so the functions' own get_connection() blocks join the batch. The
+    database.py functions catch their errors and return a falsy result
+    (False, [] or None), so an operation that returns one is rolled back
+    to its savepoint too; the caller still gets the result.
+    """
+
+    def __init__(self, max_batch=MAX_BATCH):
+        self.max_batch = max_batch
+        self.batches = 0
+        self.operations = 0
+        self.loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+        self._task = self.loop.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._thread.shutdown(wait=True)
+
+    async def run(self, fn, *args):
+        """Run fn alone on the writer thread, for functions that manage their own transactions"""
+        return await self.loop.run_in_executor(self._thread, fn, *args)
+
+    async def submit(self, fn, *args, **kwargs):
+        future = self.loop.create_future()
+        await self._queue.put((fn, args, kwargs, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            # Callers that gave up (cancelled or timed out) before we started are skipped
+            batch = [item for item in batch if not item[3].done()]
+            if not batch:
+                continue
+            try:
+                results = await self.loop.run_in_executor(self._thread, self._commit, batch)
+            except Exception as e:
+                results = [(False, e)] * len(batch)
+            self.batches += 1
+            self.operations += len(batch)
+            for (_, _, _, future), (ok, value) in zip(batch, results):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    @staticmethod
+    def _commit(batch):
+        results = []
+        with database.get_connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            for fn, args, kwargs, _ in batch:
+                conn.execute('SAVEPOINT op')
+                try:
+                    result = fn(*args, **kwargs)
+                    if not result:
+                        conn.execute('ROLLBACK TO op')
+                    conn.execute('RELEASE op')
+                    results.append((True, result))
+                except Exception as e:
+                    conn.execute('ROLLBACK TO op')
+                    conn.execute('RELEASE op')
+                    results.append((False, e))
+        # The functions bumped the cache before the batch committed; bump
+        # again so nothing read in between outlives the commit
+        database.query_cache.bump()
+        return results
+
+    def stats(self):
+        return {'batches': self.batches, 'operations': self.operations, 'queued': self._queue.qsize()}
+
+
+class _Running:
+    """The reader thread running one call, so its query can be interrupted"""
+
+    __slots__ = ('thread', 'cancelled', 'lock')
+
+    def __init__(self):
+        self.thread = None
+        self.cancelled = False
+        self.lock = threading.Lock()
+
+    def interrupt(self):
+        with self.lock:
+            self.cancelled = True
+            if self.thread is not None:
+                (database.replica or database.pool).interrupt(self.thread)
+
+
+_readers = None
+_writer = None
+
+
+def _reader_pool():
+    global _readers
+    if _readers is None:
+        if database.pool.max_connections <= READERS:
+            # Every reader may hold a connection at once; the writer still needs one
+            database.pool.max_connections = READERS + 1
+        _readers = ThreadPoolExecutor(max_workers=READERS, thread_name_prefix='db-reader')
+    return _readers
+
+def writer() -> Writer:
+    """The writer for the running event loop, started on first use"""
+    global _writer
+    if _writer is None or _writer.loop is not asyncio.get_running_loop():
+        _writer = Writer()
+    return _writer
+
+def _call(running, fn, args, kwargs):
+    # No connection is taken here: fn checks one out only around its queries,
+    # so bcrypt in authenticate and prepare_sign_up runs without holding one
+    with running.lock:
+        if running.cancelled:
+            return None
+        running.thread = threading.get_ident()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        with running.lock:
+            running.thread = None
+
+async def run_read(fn, *args, timeout=None, **kwargs):
+    """Run a blocking read on a reader thread; cancelling interrupts its query"""
+    running = _Running()
+    future = asyncio.get_running_loop().run_in_executor(_reader_pool(), _call, running, fn, args, kwargs)
+    try:
+        return await asyncio.wait_for(future, timeout or TIMEOUT)
+    except (asyncio.CancelledError, asyncio.TimeoutError):
+        running.interrupt()
+        raise
+
+async def run_write(fn, *args, timeout=None, **kwargs):
+    """Queue a blocking write for the single writer"""
+    return await asyncio.wait_for(writer().submit(fn, *args, **kwargs), timeout or TIMEOUT)
+
+def _read(fn):
+    @wraps(fn)
+    async def read(*args, timeout=None, **kwargs):
+        return await run_read(fn, *args, timeout=timeout, **kwargs)
+    return read
+
+def _write(fn):
+    @wraps(fn)
+    async def write(*args, timeout=None, **kwargs):
+        return await run_write(fn, *args, timeout=timeout, **kwargs)
+    return write
+
+
+# Reads
+get_books           = _read(database.get_books)
+get_book_models     = _read(database.get_book_models)
+count_books         = _read(database.count_books)
+search_books        = _read(database.search_books)
+get_books_by_author = _read(database.get_books_by_author)
+book_exists         = _read(database.book_exists)
+get_all_users       = _read(database.get_all_users)
+export_books_to_file = _read(database.export_books_to_file)
+prepare_sign_up     = _read(database.prepare_sign_up)
+authenticate        = _read(database.authenticate)
+validate_session    = _read(sessions.validate_session)
+get_loan_history    = _read(database.get_loan_history)
+get_most_borrowed   = _read(database.get_most_borrowed)
+get_loan_stats      = _read(database.get_loan_stats)
+get_daily_loan_totals = _read(database.get_daily_loan_totals)
+get_book_counts     = _read(database.get_book_counts)
+get_user_holds      = _read(database.get_user_holds)
+get_title           = _read(database.get_title)
+get_overdue_report  = _read(overdue.get_overdue_report)
+get_user_overdue    = _read(overdue.get_user_overdue)
+
+# Writes
+create_user         = _write(database.create_user)
+add_book            = _write(database.add_book)
+borrow_book         = _write(database.borrow_book)
+borrow_books        = _write(database.borrow_books)
+return_book         = _write(database.return_book)
+delete_book         = _write(database.delete_book)
+delete_user         = _write(database.delete_user)
+create_session      = _write(sessions.create_session)
+revoke_session      = _write(sessions.revoke_session)
+place_hold          = _write(database.place_hold)
+cancel_hold         = _write(database.cancel_hold)
+
+
+async def create_database(timeout=None) -> int:
+    """Create or upgrade the schema (migrations run their own transactions)"""
+    return await asyncio.wait_for(writer().run(database.create_database), timeout or TIMEOUT)
+
+async def sweep_sessions(timeout=None) -> int:
+    """Delete expired and revoked sessions (the sweep commits in batches of its own)"""
+    return await asyncio.wait_for(writer().run(sessions.sweep_sessions), timeout or TIMEOUT)
+
+async def sign_up(username: str, password: str, email: str, timeout=None) -> bool:
+    """Register a new user; bcrypt runs on a reader thread, the insert on the writer"""
+    hashed = await prepare_sign_up(username, password, email, timeout=timeout)
+    return hashed is not None and await create_user(username, hashed, email, timeout=timeout)
+
+async def login(username: str, password: str, timeout=None) -> dict:
+    """Authenticate user and return user data with a session token if successful"""
+    user = await authenticate(username, password, timeout=timeout)
+    if user is None:
+        return None
+    user['session_token'] = await create_session(user['user_id'], timeout=timeout)
+    return user
+
+async def catalog_page(after_book_id: int = None, limit: int = 50, detailed: bool = False, timeout=None) -> dict:
+    """A page of books and the catalog size, fetched concurrently"""
+    books, total = await asyncio.gather(
+        get_books(after_book_id, limit, detailed=detailed, timeout=timeout),
+        count_books(timeout=timeout),
+    )
+    return {'books': books, 'total': total}
+
+async def set_readers(count: int):
+    """Resize the reader pool (takes effect once running reads finish)"""
+    global READERS, _readers
+    READERS = count
+    if _readers is not None:
+        old, _readers = _readers, None
+        await asyncio.get_running_loop().run_in_executor(None, old.shutdown)
+
+async def close():
+    """Stop the writer and the reader threads"""
+    global _readers, _writer
+    if _writer is not None:
+        await _writer.stop()
+        _writer = None
+    if _readers is not None:
+        _readers.shutdown(wait=True)
+        _readers = None
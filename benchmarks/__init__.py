@@ -0,0 +1,5 @@
+"""Benchmarks for the library database layer.
+
+Run from the repository root, e.g. ``python -m benchmarks.bench_borrow``.
+Every benchmark works on its own temporary database file.
+"""
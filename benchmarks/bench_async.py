@@ -0,0 +1,163 @@
+"""async_database under concurrency: read scaling, serialized writes, timeouts.
+
+Runs in a fresh interpreter on a seeded temporary library with the query
+cache off, and checks what the async API promises:
+
+* reads/s for concurrent search + page reads as reader threads are added
+* 100 tasks racing to borrow one book: exactly one wins
+* concurrent borrow/return pairs leave the catalog consistent, with
+  writes group-committed (fewer commits than writes)
+* a full-catalog read that times out is interrupted and frees its reader
+* catalog_page() (gather) against awaiting the same two reads in turn
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import multiprocessing
+
+
+def _available_books(limit):
+    import database
+    with database.get_connection() as conn:
+        return [row[0] for row in conn.execute(
+            "SELECT book_id FROM books WHERE status = 'Available' LIMIT ?", (limit,))]
+
+
+def _count_borrowed(book_ids):
+    import database
+    with database.get_connection() as conn:
+        return conn.execute(
+            f"SELECT COUNT(*) FROM books WHERE status = 'Borrowed' AND book_id IN ({','.join('?' * len(book_ids))})",
+            book_ids).fetchone()[0]
+
+
+async def _reads(adb, tasks, seconds, books):
+    done = 0
+    deadline = time.perf_counter() + seconds
+
+    async def reader(seed):
+        nonlocal done
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            if rng.random() < 0.5:
+                await adb.search_books(f'Author{rng.randint(0, books // 20)}', 20)
+            else:
+                await adb.get_books(rng.randint(0, books), 50)
+            done += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(reader(i) for i in range(tasks)))
+    return done / (time.perf_counter() - started)
+
+
+async def _bench(args, failures):
+    import database
+    import async_database as adb
+
+    database.set_cache_enabled(False)
+    user = {'user_id': 1, 'username': 'user1'}
+
+    print(f"Concurrent reads ({args.tasks} tasks, {os.cpu_count()} CPUs):")
+    for readers in args.readers:
+        await adb.set_readers(readers)
+        rate = await _reads(adb, args.tasks, args.seconds, args.books)
+        print(f"  {readers:>2} readers: {rate:8.0f} reads/s")
+
+    available = await adb.run_read(_available_books, 1001)
+    contested, spare = available[0], available[1:]
+
+    wins = sum(await asyncio.gather(*(adb.borrow_book(user, contested) for _ in range(100))))
+    print(f"100 tasks borrowing book {contested}: {wins} succeeded")
+    if wins != 1:
+        failures.append(f"{wins} tasks borrowed the same book")
+
+    writer = adb.writer()
+    before_batches, before_ops = writer.batches, writer.operations
+
+    async def pair(book_id):
+        borrowed = await adb.borrow_book(user, book_id)
+        returned = await adb.return_book(user['user_id'], book_id)
+        return borrowed and returned
+
+    started = time.perf_counter()
+    read_rate, pairs = await asyncio.gather(
+        _reads(adb, args.tasks, args.seconds, args.books),
+        asyncio.gather(*(pair(book_id) for book_id in spare)))
+    elapsed = time.perf_counter() - started
+    ops = writer.operations - before_ops
+    commits = writer.batches - before_batches
+    print(f"{len(spare)} borrow/return pairs under read load: {ops / elapsed:.0f} writes/s, "
+          f"{ops} writes in {commits} commits; reads meanwhile {read_rate:.0f}/s")
+    borrowed = await adb.run_read(_count_borrowed, spare)
+    if not all(pairs) or borrowed:
+        failures.append(f"{pairs.count(False)} failed pairs, {borrowed} books left borrowed")
+
+    await adb.set_readers(1)
+    started = time.perf_counter()
+    try:
+        await adb.export_books_to_file('txt', os.devnull, timeout=0.005)
+        print("Timed-out export: finished before the timeout (catalog too small to show)")
+    except asyncio.TimeoutError:
+        await adb.count_books()
+        freed = time.perf_counter() - started
+        print(f"Timed-out full export: reader free again after {freed * 1000:.1f} ms")
+
+    rounds = 50
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await adb.get_books(None, 50)
+        await adb.count_books()
+    sequential = (time.perf_counter() - started) / rounds
+    await adb.set_readers(max(args.readers))
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await adb.catalog_page(None, 50)
+    gathered = (time.perf_counter() - started) / rounds
+    print(f"Page + count: {sequential * 1000:.2f} ms awaited in turn, {gathered * 1000:.2f} ms with gather")
+
+    await adb.close()
+
+
+def _run(args, results):
+    import logging
+    from benchmarks.datagen import build_library
+
+    logging.disable(logging.CRITICAL)
+    build_library(args.books, args.users)
+    failures = []
+    asyncio.run(_bench(args, failures))
+    results.put(failures)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=100_000)
+    parser.add_argument('--users', type=int, default=1_000)
+    parser.add_argument('--readers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--tasks', type=int, default=32, help="concurrent reading tasks")
+    parser.add_argument('--seconds', type=float, default=3.0, help="length of each read phase")
+    args = parser.parse_args(argv)
+
+    ctx = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_NAME'] = os.path.join(tmp, 'bench.db')
+        os.environ['BCRYPT_ROUNDS'] = '4'
+        os.environ['HASH_WORKERS'] = '0'
+        results = ctx.Queue()
+        proc = ctx.Process(target=_run, args=(args, results))
+        proc.start()
+        failures = results.get()
+        proc.join()
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Multi-process borrow/return contention benchmark.
+
+N writer processes race to borrow the same set of books, then return
+them. Every book must end up borrowed by exactly one writer.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import multiprocessing
+
+
+def _worker(user_id, book_count, batch, seed, barrier, results):
+    import logging
+    import database
+
+    logging.disable(logging.CRITICAL)
+    user = {'user_id': user_id, 'username': f'bench{user_id}'}
+    book_ids = list(range(1, book_count + 1))
+    random.Random(seed).shuffle(book_ids)
+
+    started = time.perf_counter()
+    borrowed = []
+    attempts = 0
+    if batch > 1:
+        for i in range(0, len(book_ids), batch):
+            borrowed.extend(database.borrow_books(user, book_ids[i:i + batch]))
+            attempts += 1
+    else:
+        for book_id in book_ids:
+            if database.borrow_book(user, book_id):
+                borrowed.append(book_id)
+            attempts += 1
+    borrow_time = time.perf_counter() - started
+    # Nobody returns until every writer has finished borrowing, so a book
+    # borrowed twice can only mean two writers won the same race
+    barrier.wait()
+
+    started = time.perf_counter()
+    returned = sum(database.return_book(user_id, book_id) for book_id in borrowed)
+    return_time = time.perf_counter() - started
+
+    results.put({
+        'user_id': user_id,
+        'borrowed': borrowed,
+        'returned': returned,
+        'attempts': attempts,
+        'borrow_time': borrow_time,
+        'return_time': return_time,
+    })
+
+
+def run(writers, books, batch):
+    import logging
+    import database
+
+    logging.disable(logging.CRITICAL)
+    database.create_database()
+    with database.get_connection() as conn:
+        conn.executemany('INSERT INTO books (title, author) VALUES (?, ?)',
+                         ((f'Title {i}', f'Author {i % 100}') for i in range(books)))
+        conn.executemany('INSERT INTO users (user_id, username, password, email) VALUES (?, ?, ?, ?)',
+                         ((i, f'bench{i}', b'x', f'bench{i}@example.com') for i in range(1, writers + 1)))
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    barrier = ctx.Barrier(writers)
+    procs = [ctx.Process(target=_worker, args=(i, books, batch, i, barrier, results))
+             for i in range(1, writers + 1)]
+    started = time.perf_counter()
+    for p in procs:
+        p.start()
+    reports = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - started
+
+    owners = {}
+    double_borrows = 0
+    for report in reports:
+        for book_id in report['borrowed']:
+            if book_id in owners:
+                double_borrows += 1
+            owners[book_id] = report['user_id']
+
+    attempts = sum(r['attempts'] for r in reports)
+    returns = sum(r['returned'] for r in reports)
+    with database.get_connection() as conn:
+        still_borrowed = conn.execute("SELECT COUNT(*) FROM books WHERE status != 'Available'").fetchone()[0]
+
+    print(f"writers={writers} books={books} batch={batch}")
+    print(f"  borrow attempts: {attempts}, successful: {len(owners)}, returns: {returns}")
+    print(f"  double borrows:  {double_borrows}")
+    print(f"  left borrowed:   {still_borrowed}")
+    print(f"  throughput:      {(attempts + returns) / elapsed:,.0f} ops/s over {elapsed:.2f}s")
+    return double_borrows == 0 and len(owners) == books and still_borrowed == 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--writers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--books', type=int, default=2000)
+    parser.add_argument('--batch', type=int, default=1, help="use borrow_books with this batch size")
+    args = parser.parse_args(argv)
+
+    ok = True
+    for writers in args.writers:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ['DATABASE_NAME'] = os.path.join(tmp, 'bench.db')
+            # Run each configuration in a fresh interpreter so the pool binds to the new file
+            ctx = multiprocessing.get_context('spawn')
+            proc = ctx.Process(target=_run_child, args=(writers, args.books, args.batch))
+            proc.start()
+            proc.join()
+            ok = ok and proc.exitcode == 0
+    sys.exit(0 if ok else 1)
+
+
+def _run_child(writers, books, batch):
+    sys.exit(0 if run(writers, books, batch) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Write throughput of a branch federation as branches are added.
+
+For each branch count a fresh set of branch databases is seeded with the
+same catalogue split evenly across them. --writers processes then run
+borrow/return pairs for --duration seconds, each on its own books, which
+are spread over all branches. With one branch every write takes the same
+lock. With more branches, writes to different branches commit side by
+side. Also checks that a paged fan-out read returns every book exactly
+once and in order.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+
+def _writer(names, pattern, writer, writers, books, duration, barrier, results):
+    import logging
+    import database
+    from branches import Federation
+
+    logging.disable(logging.CRITICAL)
+    database.set_cache_enabled(False)
+    federation = Federation(names, pattern)
+    user = {'user_id': 1, 'username': 'user1'}
+    per_branch = books // len(names)
+    mine = [(name, book_id) for book_id in range(1 + writer, per_branch + 1, writers) for name in names]
+    pairs = failed = 0
+    barrier.wait()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        for book in mine:
+            if federation.borrow_book(user, book) and federation.return_book(user['user_id'], book):
+                pairs += 1
+            else:
+                failed += 1
+            if time.perf_counter() >= deadline:
+                break
+    federation.close()
+    results.put((pairs, failed))
+
+
+def _seed(names, pattern, books):
+    import logging
+    import database
+    from branches import Federation
+
+    logging.disable(logging.CRITICAL)
+    federation = Federation(names, pattern)
+    federation.create_database()
+    per_branch = books // len(names)
+
+    def fill(name):
+        with database.get_connection() as conn:
+            conn.execute("INSERT INTO users (user_id, username, password, email) VALUES (1, 'user1', x'00', 'u@x.com')")
+            conn.executemany('INSERT INTO books (title, author) VALUES (?, ?)',
+                             ((f'{name} title {i}', f'Author{i % 50}') for i in range(per_branch)))
+
+    for name, branch in federation.branches.items():
+        branch.run(fill, name)
+
+    # Page through the merged catalogue and check nothing is lost or repeated
+    seen, after = [], None
+    while True:
+        page = federation.get_books(after, 997)
+        if not page:
+            break
+        seen.extend((row[0], row[1]) for row in page)
+        after = (page[-1][0], page[-1][1])
+    federation.close()
+    ordered = seen == sorted(seen, key=lambda book: (book[1], names.index(book[0])))
+    return len(seen) == len(set(seen)) == per_branch * len(names) and ordered
+
+
+def run(branches, args, tmp):
+    names = [f'branch{i}' for i in range(branches)]
+    pattern = os.path.join(tmp, f'{branches}-{{branch}}.db')
+    ctx = multiprocessing.get_context('spawn')
+    merged_ok = ctx.Pool(1).apply(_seed, (names, pattern, args.books))
+
+    results = ctx.Queue()
+    barrier = ctx.Barrier(args.writers)
+    procs = [ctx.Process(target=_writer, args=(names, pattern, w, args.writers, args.books,
+                                               args.duration, barrier, results))
+             for w in range(args.writers)]
+    for p in procs:
+        p.start()
+    outcomes = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    pairs = sum(pairs for pairs, _ in outcomes)
+    failed = sum(failed for _, failed in outcomes)
+    return pairs / args.duration, failed, merged_ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--branches', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--books', type=int, default=8_000)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--synchronous', default='FULL',
+                        help="DB_SYNCHRONOUS for the run; FULL makes every commit wait for the disk")
+    args = parser.parse_args(argv)
+
+    os.environ['BCRYPT_ROUNDS'] = '4'
+    os.environ['HASH_WORKERS'] = '0'
+    os.environ['DB_SYNCHRONOUS'] = args.synchronous
+    failures = []
+    print(f"{args.writers} writer processes, {os.cpu_count()} CPUs, synchronous={args.synchronous}")
+    print(f"{'branches':>8}{'pairs/s':>10}{'vs 1':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        first = None
+        for branches in args.branches:
+            rate, failed, merged_ok = run(branches, args, tmp)
+            first = first or rate
+            print(f"{branches:>8}{rate:>10.0f}{rate / first:>6.2f}x")
+            if failed:
+                failures.append(f"{failed} borrow/return pairs failed with {branches} branches")
+            if not merged_ok:
+                failures.append(f"merged catalogue pages were wrong with {branches} branches")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Hold queue benchmark: borrow and return latency as queues grow.
+
+For each queue length a title gets a few copies, all borrowed, and that
+many users waiting for it. Every timed return hands the copy to the next
+hold, whose holder then returns it in turn, so the run walks the queue.
+Borrow/return of an unrelated book is timed alongside. Fails if the
+queue was not served in arrival order or if latency grows with the
+queue beyond --max-ratio.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+from benchmarks.suite import summarize
+
+
+def _queue(database, length, copies, rounds):
+    title = f'Hold Queue {length}'
+    for _ in range(copies):
+        database.add_book(title, 'Bench Author', 'fiction', 'bench')
+    with database.get_connection() as conn:
+        title_id, = conn.execute('SELECT title_id FROM titles WHERE title = ?', (title,)).fetchone()
+        book_ids = [row[0] for row in conn.execute('SELECT book_id FROM books WHERE title_id = ?', (title_id,))]
+    for user_id, book_id in enumerate(book_ids, 1):
+        database.borrow_book({'user_id': user_id, 'username': f'user{user_id}'}, book_id)
+    # Holders start after the borrowers; placing thousands one by one is not what is measured
+    first = copies + 1
+    now = time.time()
+    with database.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO holds (title_id, user_id, status, created_at) VALUES (?, ?, 'Waiting', ?)",
+            ((title_id, user_id, now) for user_id in range(first, first + length)))
+
+    with database.get_connection() as conn:
+        other, = conn.execute("SELECT book_id FROM books WHERE status = 'Available' AND title_id != ? LIMIT 1",
+                              (title_id,)).fetchone()
+    bench = {'user_id': 1, 'username': 'user1'}
+    holders = {book_id: user_id for user_id, book_id in enumerate(book_ids, 1)}
+    returns, borrows = [], []
+    for i in range(rounds):
+        book_id = book_ids[i % copies]
+        started = time.perf_counter()
+        database.return_book(holders[book_id], book_id)
+        returns.append(time.perf_counter() - started)
+        with database.get_connection() as conn:
+            row = conn.execute("SELECT borrower_id FROM books WHERE book_id = ? AND status = 'Borrowed'",
+                               (book_id,)).fetchone()
+        if row is None:
+            # Queue used up (or empty): put the copy back out for the next round
+            database.borrow_book({'user_id': holders[book_id], 'username': 'bench'}, book_id)
+        else:
+            holders[book_id] = row[0]
+
+        started = time.perf_counter()
+        database.borrow_book(bench, other)
+        database.return_book(bench['user_id'], other)
+        borrows.append(time.perf_counter() - started)
+
+    with database.get_connection() as conn:
+        served = [row[0] for row in conn.execute(
+            "SELECT user_id FROM holds WHERE title_id = ? AND status = 'Fulfilled' ORDER BY fulfilled_at, hold_id",
+            (title_id,))]
+    in_order = served == list(range(first, first + min(length, rounds)))
+    return summarize(returns), summarize(borrows), in_order
+
+
+def _run(args, results):
+    import logging
+    import database
+    from benchmarks.datagen import build_library
+
+    logging.disable(logging.CRITICAL)
+    build_library(args.books, max(args.queues) + args.copies + 1)
+    database.set_cache_enabled(False)
+    report = []
+    for length in args.queues:
+        report.append((length, *_queue(database, length, args.copies, args.rounds)))
+    results.put(report)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=10_000)
+    parser.add_argument('--queues', type=int, nargs='+', default=[0, 100, 1_000, 10_000])
+    parser.add_argument('--copies', type=int, default=5)
+    parser.add_argument('--rounds', type=int, default=300)
+    parser.add_argument('--max-ratio', type=float, default=3.0,
+                        help="fail if p95 at the longest queue exceeds this multiple of the empty queue's")
+    args = parser.parse_args(argv)
+
+    ctx = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_NAME'] = os.path.join(tmp, 'bench.db')
+        os.environ['BCRYPT_ROUNDS'] = '4'
+        os.environ['HASH_WORKERS'] = '0'
+        results = ctx.Queue()
+        proc = ctx.Process(target=_run, args=(args, results))
+        proc.start()
+        report = results.get()
+        proc.join()
+
+    print(f"{'queue':>8}{'return p50':>12}{'p95':>10}{'borrow+return p50':>19}{'p95':>10}")
+    failures = []
+    for length, returns, borrows, in_order in report:
+        print(f"{length:>8}{returns['p50_ms']:>10.3f}ms{returns['p95_ms']:>8.3f}ms"
+              f"{borrows['p50_ms']:>17.3f}ms{borrows['p95_ms']:>8.3f}ms")
+        if not in_order:
+            failures.append(f"queue of {length} was not served in arrival order")
+    # Sub-millisecond noise is not growth, hence the absolute floor
+    baseline = max(report[0][1]['p95_ms'], 0.5)
+    longest = report[-1][1]['p95_ms']
+    if longest > baseline * args.max_ratio:
+        failures.append(f"return p95 {longest:.3f} ms with {report[-1][0]} waiting, {baseline:.3f} ms with none")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
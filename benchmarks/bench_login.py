@@ -0,0 +1,66 @@
+"""Login throughput against the number of hashing worker processes.
+
+Each configuration runs in a fresh interpreter (HASH_WORKERS is read at
+import time) against its own temporary database.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _run(users, logins, clients, results):
+    import logging
+    import database
+
+    logging.disable(logging.CRITICAL)
+    database.create_database()
+    hashed = database.hash_password('Password1')
+    with database.get_connection() as conn:
+        conn.executemany('INSERT INTO users (username, password, email) VALUES (?, ?, ?)',
+                         ((f'user{i}', hashed, f'user{i}@example.com') for i in range(users)))
+
+    # Warm the pool so process start-up is not counted
+    database.login('user0', 'Password1')
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as callers:
+        ok = sum(1 for user in callers.map(
+            lambda i: database.login(f'user{i % users}', 'Password1'), range(logins)) if user)
+    elapsed = time.perf_counter() - started
+    database.hasher.shutdown()
+    results.put((ok, elapsed))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--clients', type=int, default=16, help="concurrent callers")
+    args = parser.parse_args(argv)
+
+    ctx = multiprocessing.get_context('spawn')
+    print(f"rounds={args.rounds} logins={args.logins} clients={args.clients}")
+    for workers in sorted(set(args.workers)):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ['DATABASE_NAME'] = os.path.join(tmp, 'bench.db')
+            os.environ['HASH_WORKERS'] = str(workers)
+            os.environ['BCRYPT_ROUNDS'] = str(args.rounds)
+            results = ctx.Queue()
+            proc = ctx.Process(target=_run, args=(args.users, args.logins, args.clients, results))
+            proc.start()
+            ok, elapsed = results.get()
+            proc.join()
+        label = 'inline' if workers == 0 else f'{workers} workers'
+        print(f"  {label:>12}: {ok / elapsed:8.1f} logins/s ({ok}/{args.logins} ok, {elapsed:.2f}s)")
+        if ok != args.logins:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Memory and construction speed of book representations.
+
+Reads the same synthetic books table into the raw tuples the database
+layer returns today, a list of dicts, slot-based Book objects built by
+book_row_factory, and a Catalog, and reports memory and build time.
+"""
+import gc
+import time
+import sqlite3
+import argparse
+import tracemalloc
+
+from book_models import book_row_factory, Catalog
+from benchmarks.datagen import synthetic_rows
+
+
+SELECT = '''SELECT book_id, title, author, status, borrower_id, book_type, genre_or_subject
+              FROM books ORDER BY book_id'''
+
+
+def _dicts(conn):
+    conn.row_factory = sqlite3.Row
+    try:
+        return [dict(row) for row in conn.execute(SELECT)]
+    finally:
+        conn.row_factory = None
+
+
+def _books(conn):
+    cursor = conn.cursor()
+    cursor.row_factory = book_row_factory
+    return cursor.execute(SELECT).fetchall()
+
+
+BUILDERS = {
+    'tuples': lambda conn: conn.execute(SELECT).fetchall(),
+    'dicts': _dicts,
+    'books': _books,
+    'catalog': lambda conn: Catalog.from_cursor(conn.execute(SELECT)),
+}
+
+
+def measure(name, conn):
+    # Timed and traced in separate runs: tracemalloc slows every allocation
+    gc.collect()
+    started = time.perf_counter()
+    result = BUILDERS[name](conn)
+    elapsed = time.perf_counter() - started
+    del result
+    gc.collect()
+    tracemalloc.start()
+    result = BUILDERS[name](conn)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--books', type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(':memory:')
+    conn.execute('''CREATE TABLE books (book_id INTEGER PRIMARY KEY, title TEXT, author TEXT,
+                    status TEXT, borrower_id INTEGER, book_type TEXT, genre_or_subject TEXT)''')
+    conn.executemany('INSERT INTO books VALUES (?, ?, ?, ?, ?, ?, ?)', synthetic_rows(args.books, users=10000))
+    print(f"{args.books:,} books")
+    print(f"  {'representation':<14}{'memory':>12}{'per book':>12}{'build time':>12}")
+    for name in BUILDERS:
+        size, elapsed = measure(name, conn)
+        print(f"  {name:<14}{size / 2**20:>10.1f}MB{size / args.books:>11.0f}B{elapsed:>11.2f}s")
+
+
+if __name__ == "__main__":
+    main()
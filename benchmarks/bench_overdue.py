@@ -0,0 +1,130 @@
+"""Overdue sweep on a large loan table, alone and under borrow/return load.
+
+Builds a library where every book is out on an open loan (about half of
+them overdue) plus a shelf of free books, then:
+
+* times borrow/return pairs from another process with no sweep running
+* sweeps with the default chunking while those pairs keep running
+* resets the flags and sweeps again with nothing else running
+* times the per-user report and a repeat (no-op) sweep
+
+Fails if a sweep chunk held the write lock longer than --max-lock-ms.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+from benchmarks.suite import summarize
+
+
+def _probe(book_ids, stop, results):
+    """Borrow and return book_ids round-robin until stop is set"""
+    import logging
+    import database
+
+    logging.disable(logging.CRITICAL)
+    database.set_cache_enabled(False)
+    user = {'user_id': 1, 'username': 'user1'}
+    samples = []
+    while not stop.is_set():
+        for book_id in book_ids:
+            started = time.perf_counter()
+            database.borrow_book(user, book_id)
+            database.return_book(user['user_id'], book_id)
+            samples.append(time.perf_counter() - started)
+            if stop.is_set():
+                break
+    results.put(samples)
+
+
+def _under_probe(ctx, book_ids, work):
+    stop = ctx.Event()
+    results = ctx.Queue()
+    proc = ctx.Process(target=_probe, args=(book_ids, stop, results))
+    proc.start()
+    time.sleep(1.0)  # let the probe import and warm up
+    outcome = work()
+    stop.set()
+    samples = results.get()
+    proc.join()
+    return outcome, summarize(samples)
+
+
+def _run(args, results):
+    import logging
+    import database
+    import overdue
+    from benchmarks.datagen import build_library
+
+    logging.disable(logging.CRITICAL)
+    started = time.perf_counter()
+    build_library(args.loans, args.users, borrowed=1.0)
+    with database.get_connection() as conn:
+        cursor = conn.executemany('INSERT INTO books (title, author) VALUES (?, ?)',
+                                  ((f'Probe {i}', 'Probe Author') for i in range(args.probe_books)))
+        free = [row[0] for row in conn.execute(
+            "SELECT book_id FROM books WHERE author = 'Probe Author' AND status = 'Available'")]
+        loans, overdue_loans = conn.execute(
+            'SELECT COUNT(*), SUM(due_at < ?) FROM loans WHERE returned_at IS NULL', (time.time(),)).fetchone()
+    report = {'build_s': time.perf_counter() - started, 'loans': loans, 'overdue': overdue_loans}
+
+    ctx = multiprocessing.get_context('spawn')
+    _, report['idle'] = _under_probe(ctx, free, lambda: time.sleep(args.seconds))
+    report['sweep_loaded'], report['loaded'] = _under_probe(
+        ctx, free, lambda: overdue.sweep_overdue(chunk_size=args.chunk))
+
+    with database.get_connection() as conn:
+        conn.execute('UPDATE loans SET overdue_at = NULL WHERE overdue_at IS NOT NULL')
+    report['sweep_alone'] = overdue.sweep_overdue(chunk_size=args.chunk, pause=0)
+
+    started = time.perf_counter()
+    users = overdue.get_overdue_report()
+    report['report_s'] = time.perf_counter() - started
+    report['report_users'] = len(users)
+    report['sweep_again'] = overdue.sweep_overdue(chunk_size=args.chunk)
+    results.put(report)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--loans', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--chunk', type=int, default=500)
+    parser.add_argument('--probe-books', type=int, default=200)
+    parser.add_argument('--seconds', type=float, default=3.0, help="length of the idle probe")
+    parser.add_argument('--max-lock-ms', type=float, default=100.0)
+    args = parser.parse_args(argv)
+
+    ctx = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_NAME'] = os.path.join(tmp, 'bench.db')
+        os.environ['BCRYPT_ROUNDS'] = '4'
+        os.environ['HASH_WORKERS'] = '0'
+        results = ctx.Queue()
+        proc = ctx.Process(target=_run, args=(args, results))
+        proc.start()
+        report = results.get()
+        proc.join()
+
+    print(f"{report['loans']:,} open loans, {report['overdue']:,} overdue (built in {report['build_s']:.0f}s)")
+    for name in ('sweep_loaded', 'sweep_alone', 'sweep_again'):
+        sweep = report[name]
+        print(f"{name:<13} {sweep['flagged']:>9,} flagged in {sweep['chunks']:>5} chunks, "
+              f"{sweep['seconds']:7.2f}s, longest lock {sweep['max_lock_ms']:6.1f} ms")
+    for name in ('idle', 'loaded'):
+        probe = report[name]
+        print(f"borrow+return {'during sweep' if name == 'loaded' else 'no sweep':<13} "
+              f"p50 {probe['p50_ms']:.2f} ms  p99 {probe['p99_ms']:.2f} ms  ({probe['count']} pairs)")
+    print(f"overdue report: {report['report_users']:,} users in {report['report_s']:.2f}s")
+
+    longest = max(report[name]['max_lock_ms'] for name in ('sweep_loaded', 'sweep_alone'))
+    if longest > args.max_lock_ms:
+        print(f"FAIL: a sweep chunk held the write lock for {longest:.1f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
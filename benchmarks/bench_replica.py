@@ -0,0 +1,125 @@
+"""Read latency from the in-memory replica against the database file.
+
+Seeds a temporary library, starts a process that keeps borrowing and
+returning books, and meanwhile times get_books pages, get_books_by_author
+and get_all_users, first reading the file and then with the replica
+enabled. The query cache is off throughout. Also reports how many times
+the replica copied the file, how long a copy took and the oldest copy a
+read was served.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import multiprocessing
+
+from benchmarks.suite import summarize
+
+
+def _writer(stop, pairs):
+    import logging
+    import database
+
+    logging.disable(logging.CRITICAL)
+    with database.get_connection() as conn:
+        book_ids = [row[0] for row in conn.execute(
+            "SELECT book_id FROM books WHERE status = 'Available' LIMIT 500")]
+    user = {'user_id': 1, 'username': 'user1'}
+    while not stop.is_set():
+        for book_id in book_ids:
+            if database.borrow_book(user, book_id) and database.return_book(1, book_id):
+                with pairs.get_lock():
+                    pairs.value += 1
+            if stop.is_set():
+                break
+
+
+def _reads(database, args, pairs):
+    rng = random.Random(args.seed)
+    samples = {'get_books': [], 'get_books_by_author': [], 'get_all_users': []}
+    oldest = 0.0
+    before = pairs.value
+    started = time.perf_counter()
+    for i in range(args.iterations):
+        calls = [('get_books', database.get_books, (rng.randint(0, args.books), 50)),
+                 ('get_books_by_author', database.get_books_by_author, (f'Author{rng.randint(0, args.books // 20)}',))]
+        if i % 10 == 0:
+            calls.append(('get_all_users', database.get_all_users, ()))
+        for name, fn, call_args in calls:
+            t = time.perf_counter()
+            fn(*call_args)
+            samples[name].append(time.perf_counter() - t)
+        if database.replica is not None:
+            oldest = max(oldest, database.replica.age())
+    writes = (pairs.value - before) / (time.perf_counter() - started)
+    return {name: summarize(values) for name, values in samples.items()}, writes, oldest
+
+
+def _run(args, results):
+    import logging
+    import database
+    from benchmarks.datagen import build_library
+
+    logging.disable(logging.CRITICAL)
+    build_library(args.books, args.users)
+    database.set_cache_enabled(False)
+
+    ctx = multiprocessing.get_context('spawn')
+    stop, pairs = ctx.Event(), ctx.Value('l', 0)
+    writer = ctx.Process(target=_writer, args=(stop, pairs))
+    writer.start()
+    time.sleep(1.0)
+
+    report = {'disk': _reads(database, args, pairs)}
+    replica = database.enable_replica(args.staleness)
+    report['replica'] = _reads(database, args, pairs)
+    report['replica_stats'] = replica.stats()
+    database.disable_replica()
+
+    stop.set()
+    writer.join()
+    results.put(report)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=100_000)
+    parser.add_argument('--users', type=int, default=2_000)
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--staleness', type=float, default=1.0, help="replica max staleness (seconds)")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    ctx = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_NAME'] = os.path.join(tmp, 'bench.db')
+        os.environ['BCRYPT_ROUNDS'] = '4'
+        os.environ['HASH_WORKERS'] = '0'
+        results = ctx.Queue()
+        proc = ctx.Process(target=_run, args=(args, results))
+        proc.start()
+        report = results.get()
+        proc.join()
+
+    print(f"{args.books:,} books, {args.users:,} users, borrow/return running in another process")
+    print(f"{'read':<22}{'path':<9}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name in ('get_books', 'get_books_by_author', 'get_all_users'):
+        for path in ('disk', 'replica'):
+            s = report[path][0][name]
+            print(f"{name:<22}{path:<9}{s['p50_ms']:>8.3f}ms{s['p95_ms']:>8.3f}ms{s['p99_ms']:>8.3f}ms")
+    for path in ('disk', 'replica'):
+        print(f"writes meanwhile ({path}): {report[path][1]:.0f} borrow/return pairs/s")
+    stats = report['replica_stats']
+    oldest = report['replica'][2]
+    print(f"replica: {stats['copies']} copies ({stats['last_copy_ms']:.0f} ms each), "
+          f"{stats['skipped']} checks found nothing new, oldest copy read {oldest:.2f}s "
+          f"(limit {args.staleness:.2f}s)")
+    if oldest > args.staleness:
+        print("FAIL: a read was served from a copy older than the staleness limit")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
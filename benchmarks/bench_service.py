@@ -0,0 +1,182 @@
+"""Load test for library_service with many concurrent keep-alive clients.
+
+Starts the service in a fresh interpreter on a seeded temporary library,
+then each client logs in and runs a mix of page listings, searches and
+borrow/return pairs for --duration seconds. Reports throughput, latency
+percentiles per request type and the writer's group-commit batch size,
+and fails if any book ends up in an inconsistent state.
+"""
+import os
+import sys
+import json
+import time
+import base64
+import random
+import sqlite3
+import asyncio
+import argparse
+import tempfile
+import multiprocessing
+
+from benchmarks.datagen import PASSWORD
+from benchmarks.suite import summarize
+
+
+ADMIN = ('bench-admin', 'bench-password')
+
+
+def _serve(books, users, ready):
+    import logging
+    import library_service
+    from benchmarks.datagen import build_library
+
+    logging.disable(logging.CRITICAL)
+    build_library(books, users)
+    asyncio.run(library_service.serve('127.0.0.1', 0, ready=ready.put))
+
+
+def _borrowed(path):
+    """(borrowed books, books whose status and borrower disagree)"""
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('''
+            SELECT COALESCE(SUM(status = 'Borrowed'), 0),
+                   COALESCE(SUM((status = 'Borrowed') != (borrower_id IS NOT NULL)), 0)
+            FROM books
+        ''').fetchone()
+    finally:
+        conn.close()
+
+
+class Client:
+    def __init__(self, port):
+        self.port = port
+        self.token = None
+        self.reader = self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection('127.0.0.1', self.port)
+
+    async def request(self, method, path, data=None, auth=None):
+        body = json.dumps(data).encode() if data is not None else b''
+        headers = f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n'
+        if auth:
+            headers += f'Authorization: {auth}\r\n'
+        elif self.token:
+            headers += f'Authorization: Bearer {self.token}\r\n'
+        self.writer.write(headers.encode() + b'\r\n' + body)
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode().partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    async def close(self):
+        self.writer.close()
+
+
+async def _client(port, user, books, deadline, samples, counts):
+    client = Client(port)
+    await client.connect()
+    status, payload = await client.request('POST', '/login', {'username': f'user{user}', 'password': PASSWORD})
+    if status != 200:
+        counts['login_failed'] = counts.get('login_failed', 0) + 1
+        return
+    client.token = payload['session_token']
+    rng = random.Random(user)
+    words = ['shadow', 'river', 'empire', 'garden', 'winter', 'storm']
+
+    async def timed(kind, method, path, data=None):
+        started = time.perf_counter()
+        status, payload = await client.request(method, path, data)
+        samples.setdefault(kind, []).append(time.perf_counter() - started)
+        counts[f'{kind} {status}'] = counts.get(f'{kind} {status}', 0) + 1
+        return status, payload
+
+    while time.perf_counter() < deadline:
+        roll = rng.random()
+        if roll < 0.6:
+            await timed('list', 'GET', f'/books?after={rng.randint(0, books)}&limit=50')
+        elif roll < 0.8:
+            await timed('search', 'GET', f'/books/search?q={rng.choice(words)}&limit=20')
+        else:
+            book_id = rng.randint(1, books)
+            status, _ = await timed('borrow', 'POST', f'/books/{book_id}/borrow')
+            if status == 200:
+                await timed('return', 'POST', f'/books/{book_id}/return')
+    await client.close()
+
+
+async def _load(port, clients, users, books, duration):
+    samples, counts = {}, {}
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(_client(port, 1 + i % users, books, deadline, samples, counts)
+                           for i in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    admin = Client(port)
+    await admin.connect()
+    auth = 'Basic ' + base64.b64encode(':'.join(ADMIN).encode()).decode()
+    _, stats = await admin.request('GET', '/stats', auth=auth)
+    await admin.close()
+    return samples, counts, elapsed, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--books', type=int, default=10_000)
+    parser.add_argument('--users', type=int, default=1_000)
+    parser.add_argument('--workers', type=int, default=8, help="service reader threads")
+    args = parser.parse_args(argv)
+
+    ctx = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        os.environ.update({
+            'DATABASE_NAME': path, 'BCRYPT_ROUNDS': '4', 'HASH_WORKERS': '0',
+            'ASYNC_DB_READERS': str(args.workers), 'ADMIN_USER': ADMIN[0], 'ADMIN_PASS': ADMIN[1],
+        })
+        ready = ctx.Queue()
+        server = ctx.Process(target=_serve, args=(args.books, args.users, ready))
+        server.start()
+        port = ready.get()
+        before = _borrowed(path)
+        try:
+            samples, counts, elapsed, stats = asyncio.run(
+                _load(port, args.clients, args.users, args.books, args.duration))
+        finally:
+            server.terminate()
+            server.join()
+
+        after = _borrowed(path)
+
+    total = sum(len(s) for s in samples.values())
+    print(f"{args.clients} clients, {args.duration:.0f}s, {args.books:,} books: "
+          f"{total / elapsed:,.0f} requests/s")
+    print(f"{'request':<10}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for kind, values in sorted(samples.items()):
+        s = summarize(values)
+        print(f"{kind:<10}{s['count']:>8}{s['p50_ms']:>8.2f}ms{s['p95_ms']:>8.2f}ms{s['p99_ms']:>8.2f}ms")
+    print("responses:", ', '.join(f'{key}: {n}' for key, n in sorted(counts.items())))
+    writer = stats.get('writer', {})
+    if writer.get('batches'):
+        print(f"writer: {writer['operations']} writes in {writer['batches']} commits "
+              f"({writer['operations'] / writer['batches']:.1f} per commit)")
+    # Every successful borrow was followed by a return, so the catalog must end as it started
+    expected = before[0] + counts.get('borrow 200', 0) - counts.get('return 200', 0)
+    if after[0] != expected or after[1]:
+        print(f"INCONSISTENT: {after[0]} books borrowed, expected {expected}; "
+              f"{after[1]} with mismatched status/borrower")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Seeded synthetic library data.
+
+    python -m benchmarks.datagen bench.db --size medium
+
+builds a database with the current schema and a reproducible catalog.
+"""
+import os
+import random
+import argparse
+
+
+SIZES = {
+    'small': (1_000, 10_000),
+    'medium': (100_000, 100_000),
+    'large': (1_000_000, 100_000),
+}
+
+PASSWORD = 'Password1'
+GENRES = ['fantasy', 'science', 'history', 'poetry', 'mystery', 'biography', 'romance', 'travel']
+TYPES = ['fiction', 'non-fiction', 'general']
+WORDS = ['shadow', 'river', 'empire', 'garden', 'silent', 'winter', 'glass', 'storm',
+         'ancient', 'city', 'letters', 'night', 'journey', 'secret', 'iron', 'ocean']
+
+
+def synthetic_rows(count, seed=42, users=0, borrowed=0.2):
+    """Yield (book_id, title, author, status, borrower_id, book_type, genre) rows"""
+    rng = random.Random(seed)
+    authors = [f'{rng.choice(WORDS).title()} Author{i}' for i in range(max(count // 20, 1))]
+    for book_id in range(1, count + 1):
+        is_borrowed = users and rng.random() < borrowed
+        title = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title()
+        yield (book_id, f'{title} {book_id}', rng.choice(authors),
+               'Borrowed' if is_borrowed else 'Available',
+               rng.randint(1, users) if is_borrowed else None,
+               rng.choice(TYPES), rng.choice(GENRES))
+
+
+def build_library(books, users, seed=42, batch_size=50_000, borrowed=0.2):
+    """Fill the database configured in DATABASE_NAME; returns (books, users)
+
+    Borrowed books get an open loan taken within the last 30 days, due
+    LOAN_DAYS (14 by default) later, so about half of them are overdue.
+    """
+    import time
+    import database
+
+    database.create_database()
+    hashed = database.hash_password(PASSWORD)
+    with database.get_connection() as conn:
+        rows = []
+        for user_id in range(1, users + 1):
+            rows.append((user_id, f'user{user_id}', hashed, f'user{user_id}@example.com'))
+            if len(rows) >= batch_size:
+                conn.executemany('INSERT INTO users (user_id, username, password, email) VALUES (?, ?, ?, ?)', rows)
+                rows = []
+        conn.executemany('INSERT INTO users (user_id, username, password, email) VALUES (?, ?, ?, ?)', rows)
+
+        rows = []
+        for row in synthetic_rows(books, seed, users, borrowed):
+            rows.append(row)
+            if len(rows) >= batch_size:
+                conn.executemany('''
+                    INSERT INTO books (book_id, title, author, status, borrower_id, book_type, genre_or_subject)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                rows = []
+        conn.executemany('''
+            INSERT INTO books (book_id, title, author, status, borrower_id, book_type, genre_or_subject)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        # A fixed scatter of book_id keeps the loan times reproducible
+        conn.execute('''
+            UPDATE books SET borrowed_at = :now - (book_id * 7919) % (30 * 86400),
+                             due_date = :now - (book_id * 7919) % (30 * 86400) + :loan_days * 86400
+            WHERE status = 'Borrowed'
+        ''', {'now': int(time.time()), 'loan_days': database.LOAN_DAYS})
+        conn.execute('''
+            INSERT INTO loans (book_id, user_id, borrowed_at, due_at)
+            SELECT book_id, borrower_id, borrowed_at, due_date FROM books WHERE status = 'Borrowed'
+        ''')
+        conn.execute('ANALYZE')
+    database.query_cache.bump()
+    return books, users
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('path')
+    parser.add_argument('--size', choices=SIZES, default='small')
+    parser.add_argument('--books', type=int)
+    parser.add_argument('--users', type=int)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    books, users = SIZES[args.size]
+    os.environ['DATABASE_NAME'] = args.path
+    os.environ.setdefault('BCRYPT_ROUNDS', '4')
+    os.environ.setdefault('HASH_WORKERS', '0')
+    build_library(args.books or books, args.users or users, args.seed)
+    print(f"Built {args.path}: {args.books or books:,} books, {args.users or users:,} users")
+
+
+if __name__ == "__main__":
+    main()
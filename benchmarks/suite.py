@@ -0,0 +1,201 @@
+"""Latency of every database.py operation on a synthetic catalog.
+
+    python -m benchmarks.suite --size medium --output results.json
+    python -m benchmarks.suite --size medium --baseline baseline.json
+
+Builds a seeded library (see benchmarks.datagen) in a fresh interpreter,
+times each operation and reports p50/p95/p99 latency and ops/s. With
+--baseline the run fails when an operation got slower than the saved
+numbers by more than --tolerance; --save-baseline writes the current run
+as the new baseline.
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import platform
+import tempfile
+import multiprocessing
+from functools import partial
+
+from benchmarks.datagen import SIZES, PASSWORD
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(int(round(pct / 100 * len(samples))) - 1, 0)
+    return samples[min(index, len(samples) - 1)]
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    total = sum(samples)
+    return {
+        'count': len(samples),
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'mean_ms': total / len(samples) * 1000,
+        'ops_per_sec': len(samples) / total if total else 0.0,
+    }
+
+
+def timed(calls):
+    """Run each zero-argument callable once and return the durations"""
+    samples = []
+    for call in calls:
+        started = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _operations(database, export_books, books, users, iterations, scans, seed, tmp):
+    """Yield (name, calls); reads come first so writes do not skew them"""
+    rng = random.Random(seed)
+    with database.get_connection() as conn:
+        sample = conn.execute('SELECT title, author FROM books ORDER BY random() LIMIT ?',
+                              (iterations,)).fetchall()
+        available = [row[0] for row in conn.execute(
+            "SELECT book_id FROM books WHERE status = 'Available' ORDER BY random() LIMIT ?",
+            (iterations,))]
+
+    yield 'get_books', [database.get_books] * scans
+    yield 'get_books_page', [partial(database.get_books, after_book_id=rng.randint(0, books), limit=200)
+                             for _ in range(iterations)]
+    yield 'get_books_by_author', [partial(database.get_books_by_author, author) for _, author in sample]
+    yield 'book_exists', [partial(database.book_exists, title, author) for title, author in sample]
+    yield 'export_txt', [partial(database.export_books_to_file, 'txt', os.path.join(tmp, f'export{i}.txt'))
+                         for i in range(scans)]
+    yield 'export_csv', [partial(export_books, os.path.join(tmp, f'export{i}.csv')) for i in range(scans)]
+    yield 'login', [partial(database.login, f'user{rng.randint(1, users)}', PASSWORD)
+                    for _ in range(iterations)]
+
+    yield 'add_book', [partial(database.add_book, f'Benchmark Title {i}', f'Benchmark Author {i % 50}')
+                       for i in range(iterations)]
+    loans = [(rng.randint(1, users), book_id) for book_id in available]
+    yield 'borrow_book', [partial(database.borrow_book, {'user_id': user_id, 'username': 'bench'}, book_id)
+                          for user_id, book_id in loans]
+    yield 'return_book', [partial(database.return_book, user_id, book_id) for user_id, book_id in loans]
+    yield 'sign_up', [partial(database.sign_up, f'newuser{i}', PASSWORD, f'newuser{i}@example.com')
+                      for i in range(iterations)]
+    with database.get_connection() as conn:
+        new_users = [row[0] for row in conn.execute(
+            "SELECT user_id FROM users WHERE username LIKE 'newuser%'")]
+    yield 'delete_user', [partial(database.delete_user, user_id) for user_id in new_users]
+
+
+def _run(books, users, iterations, scans, seed, results):
+    import logging
+    import database
+    from catalog_export import export_books
+    from benchmarks.datagen import build_library
+
+    logging.disable(logging.CRITICAL)
+    build_library(books, users, seed)
+    # Measure the database, not the query cache
+    database.set_cache_enabled(False)
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, calls in _operations(database, export_books, books, users, iterations, scans, seed, tmp):
+            samples = timed(calls)
+            if samples:
+                report[name] = summarize(samples)
+    database.hasher.shutdown()
+    results.put(report)
+
+
+def compare(current, baseline, metric, tolerance, min_delta_ms=0.0):
+    """Return (lines, regressed) comparing metric per operation.
+
+    A slowdown only counts when it exceeds both the relative tolerance and
+    min_delta_ms, so jitter on microsecond operations does not fail a run.
+    """
+    lines = [f"{'operation':<22}{'baseline':>12}{'current':>12}{'change':>10}"]
+    regressed = False
+    for name in sorted(set(baseline) | set(current)):
+        if name not in current or name not in baseline:
+            lines.append(f"{name:<22}{'missing from ' + ('current' if name not in current else 'baseline'):>34}")
+            regressed |= name not in current
+            continue
+        before, after = baseline[name][metric], current[name][metric]
+        change = (after - before) / before if before else 0.0
+        flag = '  REGRESSION' if change > tolerance and after - before > min_delta_ms else ''
+        regressed |= bool(flag)
+        lines.append(f"{name:<22}{before:>10.3f}ms{after:>10.3f}ms{change:>+9.0%}{flag}")
+    return lines, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', choices=SIZES, default='small')
+    parser.add_argument('--books', type=int, help="overrides --size")
+    parser.add_argument('--users', type=int, help="overrides --size")
+    parser.add_argument('--iterations', type=int, default=200, help="calls per point operation")
+    parser.add_argument('--scans', type=int, default=5, help="calls per full-catalog operation")
+    parser.add_argument('--rounds', type=int, default=4, help="bcrypt cost for login/sign_up")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="write results as JSON")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="write results to --baseline")
+    parser.add_argument('--metric', choices=['p50_ms', 'p95_ms', 'p99_ms', 'mean_ms'], default='p95_ms')
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument('--min-delta-ms', type=float, default=0.05, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    books, users = SIZES[args.size]
+    books, users = args.books or books, args.users or users
+
+    ctx = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_NAME'] = os.path.join(tmp, 'bench.db')
+        os.environ['BCRYPT_ROUNDS'] = str(args.rounds)
+        os.environ['HASH_WORKERS'] = '0'
+        results = ctx.Queue()
+        proc = ctx.Process(target=_run, args=(books, users, args.iterations, args.scans, args.seed, results))
+        proc.start()
+        operations = results.get()
+        proc.join()
+
+    run = {
+        'meta': {
+            'books': books, 'users': users, 'iterations': args.iterations, 'scans': args.scans,
+            'rounds': args.rounds, 'seed': args.seed, 'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version, 'machine': platform.machine(),
+        },
+        'operations': operations,
+    }
+
+    print(f"{books:,} books, {users:,} users")
+    print(f"{'operation':<22}{'p50':>10}{'p95':>10}{'p99':>10}{'ops/s':>12}")
+    for name, stats in operations.items():
+        print(f"{name:<22}{stats['p50_ms']:>8.3f}ms{stats['p95_ms']:>8.3f}ms"
+              f"{stats['p99_ms']:>8.3f}ms{stats['ops_per_sec']:>12.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(run, f, indent=2)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['meta'].get('books') != books or baseline['meta'].get('users') != users:
+            print("Warning: baseline was recorded on a different catalog size")
+        lines, regressed = compare(operations, baseline['operations'], args.metric,
+                                    args.tolerance, args.min_delta_ms)
+        print(f"\n{args.metric} against {args.baseline} (tolerance {args.tolerance:.0%}):")
+        print('\n'.join(lines))
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,197 @@
+from array import array
+from bisect import bisect_left
 from dataclasses import dataclass
 from typing import Optional
 
-@dataclass
+@dataclass(slots=True)
 class Book:
     title: str
     author: str
     status: str = 'Available'
     borrower_id: Optional[int] = None
-    
-    def __istr__(self):
-        return f"Title: {self.ttle}, Author: {self.author}, Status: {self.status}"
+    book_id: Optional[int] = None
+    book_type: str = 'general'
 
-@dataclass
+    def __str__(self):
+        return f"Title: {self.title}, Author: {self.author}, Status: {self.status}"
+
+@dataclass(slots=True)
 class FictionBook(Book):
     genre: str = 'fantasy'
-    
+    book_type: str = 'fiction'
+
     def __str__(self):
-        return f"{super().__str__()}, Genre: {self.genre}"
+        return f"{Book.__str__(self)}, Genre: {self.genre}"
 
-@dataclass
+@dataclass(slots=True)
 class NonFictionBook(Book):
-    subject: str
-    
+    subject: Optional[str] = None
+    book_type: str = 'non-fiction'
+
     def __str__(self):
-        return f"{super().__str__()}, Subject: {self.subject}"
\ No newline at end of file
+        return f"{Book.__str__(self)}, Subject: {self.subject}"
+
+
+BOOK_CLASSES = {
+    'fiction': FictionBook,
+    'non-fiction': NonFictionBook,
+}
+
+# Column order of the rows make_book() and Catalog accept
+BOOK_FIELDS = ('book_id', 'title', 'author', 'status', 'borrower_id', 'book_type', 'genre_or_subject')
+_IDENTITY = tuple(range(len(BOOK_FIELDS)))
+
+
+def make_book(book_id, title, author, status, borrower_id, book_type, genre_or_subject):
+    """Build the right Book subclass for a books row"""
+    cls = BOOK_CLASSES.get(book_type)
+    if cls is FictionBook:
+        return FictionBook(title, author, status, borrower_id, book_id, book_type,
+                           genre_or_subject or 'fantasy')
+    if cls is NonFictionBook:
+        return NonFictionBook(title, author, status, borrower_id, book_id, book_type,
+                              genre_or_subject)
+    return Book(title, author, status, borrower_id, book_id, book_type or 'general')
+
+_positions = {}
+_last_description = (None, None)
+
+def _column_positions(description):
+    key = tuple(column[0] for column in description)
+    positions = _positions.get(key)
+    if positions is None:
+        positions = tuple(key.index(field) if field in key else None for field in BOOK_FIELDS)
+        _positions[key] = positions
+    return positions
+
+def book_row_factory(cursor, row):
+    """sqlite3 row factory that turns books rows into Book objects.
+
+    Columns are matched by name once per query, so any SELECT that
+    includes the BOOK_FIELDS columns (in any order) works.
+    """
+    global _last_description
+    description = cursor.description
+    last, positions = _last_description
+    if description is not last:
+        positions = _column_positions(description)
+        # One tuple swap, so concurrent cursors never see a mismatched pair
+        _last_description = (description, positions)
+    if positions == _IDENTITY:
+        return make_book(*row)
+    return make_book(*[row[i] if i is not None else None for i in positions])
+
+
+class Catalog:
+    """Column-oriented container for large numbers of books.
+
+    Numbers live in typed arrays and repeated strings (author, status,
+    type, genre) are dictionary-encoded, so a million books take a
+    fraction of the memory of a list of dicts or Book objects. Items are
+    materialized as Book objects only when accessed.
+    """
+
+    def __init__(self):
+        self.book_ids = array('q')
+        self.borrower_ids = array('q')      # 0 means no borrower
+        self.titles = []
+        self._author_codes = array('l')
+        self._status_codes = array('b')
+        self._type_codes = array('b')
+        self._genre_codes = array('l')
+        self._dictionaries = {name: ([], {}) for name in ('author', 'status', 'type', 'genre')}
+        self._sorted = True
+
+    def _encode(self, name, value):
+        values, codes = self._dictionaries[name]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def _decode(self, name, code):
+        return self._dictionaries[name][0][code]
+
+    def append_row(self, row):
+        """Add one row in BOOK_FIELDS order"""
+        book_id, title, author, status, borrower_id, book_type, genre = row
+        if self.book_ids and book_id <= self.book_ids[-1]:
+            self._sorted = False
+        self.book_ids.append(book_id)
+        self.borrower_ids.append(borrower_id or 0)
+        self.titles.append(title)
+        self._author_codes.append(self._encode('author', author))
+        self._status_codes.append(self._encode('status', status))
+        self._type_codes.append(self._encode('type', book_type))
+        self._genre_codes.append(self._encode('genre', genre))
+
+    def extend_rows(self, rows):
+        """Bulk version of append_row with the per-row lookups hoisted out"""
+        book_ids, borrower_ids, titles = self.book_ids, self.borrower_ids, self.titles
+        columns = (self._author_codes, self._status_codes, self._type_codes, self._genre_codes)
+        encoders = [self._dictionaries[name][1] for name in ('author', 'status', 'type', 'genre')]
+        last = book_ids[-1] if book_ids else None
+        for book_id, title, author, status, borrower_id, book_type, genre in rows:
+            if last is not None and book_id <= last:
+                self._sorted = False
+            last = book_id
+            book_ids.append(book_id)
+            borrower_ids.append(borrower_id or 0)
+            titles.append(title)
+            for column, codes, name, value in zip(columns, encoders,
+                                                  ('author', 'status', 'type', 'genre'),
+                                                  (author, status, book_type, genre)):
+                code = codes.get(value)
+                if code is None:
+                    code = self._encode(name, value)
+                column.append(code)
+
+    @classmethod
+    def from_cursor(cls, cursor, chunk_size=10000):
+        """Fill a catalog from a cursor over BOOK_FIELDS without building a row list"""
+        catalog = cls()
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return catalog
+            catalog.extend_rows(rows)
+
+    def __len__(self):
+        return len(self.book_ids)
+
+    def row(self, index):
+        return (
+            self.book_ids[index],
+            self.titles[index],
+            self._decode('author', self._author_codes[index]),
+            self._decode('status', self._status_codes[index]),
+            self.borrower_ids[index] or None,
+            self._decode('type', self._type_codes[index]),
+            self._decode('genre', self._genre_codes[index]),
+        )
+
+    def __getitem__(self, index):
+        return make_book(*self.row(index))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def get(self, book_id):
+        """Find a book by ID (binary search when rows arrived in ID order)"""
+        if self._sorted:
+            index = bisect_left(self.book_ids, book_id)
+            if index < len(self.book_ids) and self.book_ids[index] == book_id:
+                return self[index]
+            return None
+        try:
+            return self[self.book_ids.index(book_id)]
+        except ValueError:
+            return None
+
+    def count_by_status(self):
+        counts = {}
+        for code in self._status_codes:
+            counts[code] = counts.get(code, 0) + 1
+        return {self._decode('status', code): n for code, n in counts.items()}
\ No newline at end of file
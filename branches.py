@@ -0,0 +1,186 @@
+"""One SQLite database per library branch.
+
+    LIBRARY_BRANCHES=central,north,harbour
+    BRANCH_DATABASE=library_{branch}.db
+
+Every branch file has the full schema and its own write lock, so writes
+at different branches never wait for each other. A copy and the account
+borrowing it live at the same branch, so a write goes to one database:
+books are addressed as (branch, book_id). Catalogue-wide reads run the
+database.py function on every branch at once and merge the per-branch
+results, which are already ordered, with a k-way merge.
+"""
+import os
+import heapq
+import logging
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+from db_pool import ConnectionPool
+
+
+BRANCHES        = [name.strip() for name in os.getenv('LIBRARY_BRANCHES', '').split(',') if name.strip()]
+BRANCH_DATABASE = os.getenv('BRANCH_DATABASE', 'library_{branch}.db')
+
+
+def _tagged(name, rows):
+    for row in rows:
+        yield (name, *row)
+
+
+class Branch:
+    """A branch name and the connection pool for its database file"""
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.pool = ConnectionPool(
+            path,
+            max_connections=database.pool.max_connections,
+            pragmas=database.pool.pragmas,
+            factory=database.pool.factory,
+        )
+
+    def run(self, fn, *args, **kwargs):
+        """Call a database.py function (or anything using get_connection) on this branch"""
+        with database.using_pool(self.pool):
+            return fn(*args, **kwargs)
+
+    def __repr__(self):
+        return f'Branch({self.name!r}, {self.path!r})'
+
+
+class Federation:
+    """Routes writes to the owning branch and fans reads out over all of them.
+
+    Rows from catalogue-wide reads are the single-database rows with the
+    branch name in front: (branch, book_id, title, ...).
+    """
+
+    def __init__(self, names=None, pattern=BRANCH_DATABASE, workers=None):
+        names = list(names or BRANCHES)
+        if not names:
+            raise ValueError("No branches configured (set LIBRARY_BRANCHES)")
+        self.branches = {name: Branch(name, pattern.format(branch=name)) for name in names}
+        self.order = {name: index for index, name in enumerate(names)}
+        self._executor = ThreadPoolExecutor(max_workers=workers or len(names), thread_name_prefix='db-branch')
+
+    def branch(self, name) -> Branch:
+        try:
+            return self.branches[name]
+        except KeyError:
+            raise ValueError(f"Unknown branch {name!r}") from None
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        for branch in self.branches.values():
+            branch.pool.close_all()
+
+    # -- fan-out -------------------------------------------------------------
+
+    def fan_out(self, fn, *args, **kwargs) -> dict:
+        """Run fn on every branch in parallel; returns {branch: result}"""
+        futures = {name: self._executor.submit(branch.run, fn, *args, **kwargs)
+                   for name, branch in self.branches.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    def _merged(self, results, key, limit=None):
+        """k-way merge of per-branch sorted rows, ties broken by branch order"""
+        streams = [_tagged(name, rows) for name, rows in results.items()]
+        merged = heapq.merge(*streams, key=lambda row: (key(row), self.order[row[0]]))
+        return list(islice(merged, limit))
+
+    def create_database(self) -> dict:
+        """Create or upgrade every branch's schema; returns {branch: version}"""
+        return self.fan_out(database.create_database)
+
+    # -- reads ---------------------------------------------------------------
+
+    def get_books(self, after: tuple = None, limit: int = None, detailed: bool = False) -> list:
+        """Books of all branches ordered by (book_id, branch).
+
+        Pass the (branch, book_id) of the last row as after for the next page.
+        """
+        if after is None:
+            results = self.fan_out(database.get_books, None, limit, detailed=detailed)
+        else:
+            after_branch, after_id = after
+            after_index = self.order[after_branch]
+            futures = {}
+            for name, branch in self.branches.items():
+                # Branches after after_branch still owe their copy of after_id itself
+                start = after_id if self.order[name] <= after_index else after_id - 1
+                futures[name] = self._executor.submit(
+                    branch.run, database.get_books, start, limit, detailed=detailed)
+            results = {name: future.result() for name, future in futures.items()}
+        return self._merged(results, key=lambda row: row[1], limit=limit)
+
+    def get_books_by_author(self, author: str) -> list:
+        """Books by author at every branch, ordered by (book_id, branch)"""
+        return self._merged(self.fan_out(database.get_books_by_author, author), key=lambda row: row[1])
+
+    def get_all_users(self) -> list:
+        """Accounts of every branch as (branch, user_id, username, email)"""
+        return self._merged(self.fan_out(database.get_all_users), key=lambda row: row[1])
+
+    def find_user(self, username: str) -> list:
+        """(branch, user_id, username, email) for each branch holding that username"""
+        def lookup():
+            with database.get_connection() as conn:
+                return conn.execute('SELECT user_id, username, email FROM users WHERE username = ?',
+                                    (username,)).fetchall()
+        return self._merged(self.fan_out(lookup), key=lambda row: row[1])
+
+    def count_books(self) -> int:
+        return sum(self.fan_out(database.count_books).values())
+
+    def get_book_counts(self) -> dict:
+        """database.get_book_counts() summed over the branches"""
+        total = {'total': 0, 'status': {}, 'book_type': {}, 'genre': {}}
+        for counts in self.fan_out(database.get_book_counts).values():
+            total['total'] += counts['total']
+            for dimension in ('status', 'book_type', 'genre'):
+                for value, count in counts[dimension].items():
+                    total[dimension][value] = total[dimension].get(value, 0) + count
+        return total
+
+    # -- writes (one branch each) -------------------------------------------
+
+    def add_book(self, branch: str, title: str, author: str, book_type: str = 'fiction',
+                 genre_or_subject: str = None) -> bool:
+        return self.branch(branch).run(database.add_book, title, author, book_type, genre_or_subject)
+
+    def borrow_book(self, user, book: tuple) -> bool:
+        """Borrow (branch, book_id); user is an account of that branch"""
+        branch, book_id = book
+        return self.branch(branch).run(database.borrow_book, user, book_id)
+
+    def return_book(self, user_id: int, book: tuple) -> bool:
+        branch, book_id = book
+        return self.branch(branch).run(database.return_book, user_id, book_id)
+
+    def delete_book(self, book: tuple) -> bool:
+        branch, book_id = book
+        return self.branch(branch).run(database.delete_book, book_id)
+
+    def sign_up(self, branch: str, username: str, password: str, email: str) -> bool:
+        return self.branch(branch).run(database.sign_up, username, password, email)
+
+    def authenticate(self, branch: str, username: str, password: str) -> dict:
+        user = self.branch(branch).run(database.authenticate, username, password)
+        if user is not None:
+            user['branch'] = branch
+        return user
+
+
+_federation = None
+
+
+def federation() -> Federation:
+    """The Federation for LIBRARY_BRANCHES, created on first use"""
+    global _federation
+    if _federation is None:
+        _federation = Federation()
+        logging.info("Library federation over branches %s", ', '.join(_federation.branches))
+    return _federation
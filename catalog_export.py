@@ -0,0 +1,96 @@
+import csv
+import gzip
+import json
+import logging
+
+from database import get_connection, _fts_query
+
+
+EXPORT_COLUMNS = ['ID', 'Title', 'Author', 'Status', 'Type', 'Genre/Subject', 'Borrower']
+JSON_KEYS = ['book_id', 'title', 'author', 'status', 'book_type', 'genre_or_subject', 'borrower']
+FORMATS = ('csv', 'jsonl', 'txt')
+BUFFER_SIZE = 1 << 20
+
+
+def _query(status=None, book_type=None, author=None):
+    joins, where, params = '', [], []
+    if author:
+        joins = 'JOIN books_fts ON books_fts.rowid = b.book_id'
+        where.append('books_fts MATCH ?')
+        params.append(_fts_query(author, column='author'))
+    if status:
+        where.append('b.status = ?')
+        params.append(status)
+    if book_type:
+        where.append('b.book_type = ?')
+        params.append(book_type)
+    sql = f'''
+        SELECT b.book_id, b.title, b.author, b.status,
+               b.book_type, b.genre_or_subject,
+               COALESCE(u.username, '-') as borrower
+        FROM books b
+        {joins}
+        LEFT JOIN users u ON b.borrower_id = u.user_id
+        {'WHERE ' + ' AND '.join(where) if where else ''}
+        ORDER BY b.book_id
+    '''
+    return sql, params
+
+def _open(path, compress):
+    if compress:
+        return gzip.open(path, 'wt', encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='', buffering=BUFFER_SIZE)
+
+def _write_txt(f, rows):
+    for book in rows:
+        f.write(f"ID: {book[0]}\n"
+                f"Title: {book[1]}\n"
+                f"Author: {book[2]}\n"
+                f"Status: {book[3]}\n"
+                f"Type: {book[4]}\n"
+                f"Genre/Subject: {book[5]}\n"
+                + "-" * 50 + "\n")
+
+def export_books(path: str, fmt: str = None, compress: bool = None,
+                 status: str = None, book_type: str = None, author: str = None,
+                 chunk_size: int = 1000, progress=None) -> int:
+    """Stream the catalog to a CSV, JSONL or txt file and return the row count.
+
+    Rows are read with fetchmany(chunk_size) and written straight through,
+    so memory use does not grow with the catalog. A path ending in .gz is
+    gzip-compressed unless compress says otherwise. progress(rows_written)
+    is called after every chunk.
+    """
+    if compress is None:
+        compress = path.endswith('.gz')
+    if fmt is None:
+        stem = path[:-3] if path.endswith('.gz') else path
+        fmt = stem.rsplit('.', 1)[-1] if '.' in stem else 'csv'
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    sql, params = _query(status, book_type, author)
+    written = 0
+    with get_connection() as conn, _open(path, compress) as f:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        if fmt == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_COLUMNS)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            if fmt == 'csv':
+                writer.writerows(rows)
+            elif fmt == 'jsonl':
+                f.writelines(json.dumps(dict(zip(JSON_KEYS, row)), ensure_ascii=False) + '\n'
+                             for row in rows)
+            else:
+                _write_txt(f, rows)
+            written += len(rows)
+            if progress is not None:
+                progress(written)
+
+    logging.info("Exported %s books to %s", written, path)
+    return written
@@ -1,318 +1,822 @@
 import os
 import re
-import bcrypt
+import time
+import atexit
+import random
 import sqlite3
 import logging
-from dotenv import load_dotenv
-
+from functools import wraps
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from db_pool import ConnectionPool
+from log_config import configure_logging
+from migrations import (migrate, BOOK_COUNTS_SQL, LOGIN_SQL, SIGN_UP_SQL, BOOK_EXISTS_SQL, BOOKS_PAGE_SQL,
+                        SEARCH_BOOKS_SQL, NEXT_HOLD_SQL, FREE_COPY_SQL, CLOSE_LOAN_SQL, CLOSE_USER_LOANS_SQL,
+                        RELEASE_USER_BOOKS_SQL, USER_HOLDS_SQL, LOAN_HISTORY_SQL, MOST_BORROWED_SQL)
+from hashing import PasswordHasher
+from query_cache import QueryCache
+from query_trace import tracer, TracedConnection
+
+
+def _load_env(path):
+    """Load KEY=VALUE lines from path without overriding the environment.
+
+    Plain files are parsed here; anything fancier (quotes, export,
+    interpolation) goes to python-dotenv, which is slow to import.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return
+    values = {}
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        key, sep, value = line.partition('=')
+        if not sep or line.startswith('export ') or any(c in line for c in '"\'$#'):
+            from dotenv import load_dotenv
+            load_dotenv(path)
+            return
+        values[key.strip()] = value.strip()
+    for key, value in values.items():
+        os.environ.setdefault(key, value)
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
-load_dotenv(os.path.join(current_dir, 'manager.env'))
+_load_env(os.path.join(current_dir, 'manager.env'))
 
 ADMIN_USER    = os.getenv('ADMIN_USER')
 ADMIN_PASS    = os.getenv('ADMIN_PASS')
 DATABASE_NAME = os.getenv('DATABASE_NAME', 'library.db')
 PEPPER        = os.getenv('PEPPER', 'default-pepper').encode()
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+HASH_WORKERS  = os.getenv('HASH_WORKERS')
+LOAN_DAYS     = float(os.getenv('LOAN_DAYS', '14'))
+QUERY_TRACE   = os.getenv('QUERY_TRACE', '0') not in ('0', 'false', 'off')
+DB_REPLICA    = os.getenv('DB_REPLICA', '0') not in ('0', 'false', 'off')
+
+hasher = PasswordHasher(
+    PEPPER,
+    rounds=BCRYPT_ROUNDS,
+    workers=int(HASH_WORKERS) if HASH_WORKERS else None,
+)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[logging.FileHandler('library.log'), logging.StreamHandler()]
+pool = ConnectionPool(
+    DATABASE_NAME,
+    max_connections=int(os.getenv('DB_POOL_SIZE', '8')),
+    pragmas={
+        'journal_mode': 'WAL',
+        'synchronous': os.getenv('DB_SYNCHRONOUS', 'NORMAL'),
+        'cache_size': -int(os.getenv('DB_CACHE_SIZE_KB', '20000')),
+        'mmap_size': int(os.getenv('DB_MMAP_SIZE', '268435456')),
+        'busy_timeout': int(os.getenv('DB_BUSY_TIMEOUT_MS', '5000')),
+        'temp_store': 'MEMORY',
+    },
+    factory=TracedConnection if QUERY_TRACE else sqlite3.Connection,
 )
+# Set by using_pool() to point this thread's calls at another database (a branch)
+_active_pool = ContextVar('active_pool', default=None)
+
+def get_connection():
+    """Pooled connection to DATABASE_NAME, or to the pool selected with using_pool()"""
+    return (_active_pool.get() or pool).connection()
+
+@contextmanager
+def using_pool(other):
+    """Run the functions of this module against another ConnectionPool"""
+    token = _active_pool.set(other)
+    try:
+        yield other
+    finally:
+        _active_pool.reset(token)
+
+tracer.enabled = QUERY_TRACE
+tracer.slow_ms = float(os.getenv('SLOW_QUERY_MS', '100'))
+if os.getenv('QUERY_TRACE_DUMP'):
+    atexit.register(tracer.dump, os.getenv('QUERY_TRACE_DUMP'))
+
+def _data_version():
+    """data_version of the database being read, so commits by other processes invalidate the cache"""
+    try:
+        return (_active_pool.get() or pool).data_version()
+    except (AttributeError, sqlite3.Error) as e:
+        logging.debug("No data_version, reading uncached: %s", e)
+        return None
+
+query_cache = QueryCache(
+    maxsize=int(os.getenv('QUERY_CACHE_SIZE', '256')),
+    enabled=os.getenv('QUERY_CACHE', '1') not in ('0', 'false', 'off'),
+    namespace=_active_pool.get,
+    version=_data_version,
+)
+
+@contextmanager
+def write_connection():
+    """Pooled connection for writes; bumps the cache generation once committed"""
+    with get_connection() as conn:
+        yield conn
+    query_cache.bump()
+
+# Optional in-memory copy serving the list views, see enable_replica()
+replica = None
+
+def enable_replica(max_staleness: float = None, refresh_interval: float = None):
+    """Serve get_books, get_books_by_author and get_all_users from an in-memory copy.
+
+    The copy may lag the file by up to max_staleness seconds
+    (REPLICA_MAX_STALENESS, default 1), this process's own writes included.
+    The app and the service call this at start-up when DB_REPLICA is set.
+    """
+    global replica
+    from replica import ReadReplica
+    disable_replica()
+    if max_staleness is None:
+        max_staleness = float(os.getenv('REPLICA_MAX_STALENESS', '1.0'))
+    if refresh_interval is None and os.getenv('REPLICA_REFRESH'):
+        refresh_interval = float(os.getenv('REPLICA_REFRESH'))
+    replica = ReadReplica(DATABASE_NAME, max_staleness, refresh_interval, fallback=pool)
+    replica.start()
+    query_cache.bump()
+    return replica
+
+def disable_replica():
+    """Go back to reading the database file"""
+    global replica
+    if replica is not None:
+        old, replica = replica, None
+        old.close()
+        query_cache.bump()
+
+def _replicated(fn):
+    """Run a read function against the replica when one is enabled.
+
+    Replica reads skip the query cache: an entry is only invalidated by this
+    process's writes, so it could outlive the staleness bound of the copy.
+    """
+    uncached = getattr(fn, '__wrapped__', fn)
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if replica is None or _active_pool.get() is not None:
+            return fn(*args, **kwargs)
+        with using_pool(replica):
+            return uncached(*args, **kwargs)
+    return wrapper
+
+BUSY_RETRIES     = int(os.getenv('DB_BUSY_RETRIES', '5'))
+BUSY_BACKOFF     = 0.01
+BUSY_BACKOFF_MAX = 0.5
+
+configure_logging()
 
 def create_database():
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-        
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS books (
-                book_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                author TEXT NOT NULL,
-                status TEXT DEFAULT 'Available',
-                borrower_id INTEGER,
-                book_type TEXT DEFAULT 'fiction',
-                genre_or_subject TEXT,
-                FOREIGN KEY (borrower_id) REFERENCES users (user_id)
-            )
-        ''')
-        conn.commit()
+    """Create or upgrade the schema to the latest migration"""
+    with get_connection() as conn:
+        return migrate(conn)
 
 def sign_up(username: str, password: str, email: str) -> bool:
     """Register a new user"""
+    hashed = prepare_sign_up(username, password, email)
+    return hashed is not None and create_user(username, hashed, email)
+
+def prepare_sign_up(username: str, password: str, email: str) -> bytes:
+    """Validate a sign-up and hash its password; None if it cannot go ahead"""
     if not username or not password or not email:
-        return False
+        return None
 
     
     if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
         logging.warning("Invalid email format")
-        return False
+        return None
 
     try:
-        with sqlite3.connect(DATABASE_NAME) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
             
-            cursor.execute('SELECT 1 FROM users WHERE username = ?', (username,))
+            cursor.execute(SIGN_UP_SQL, (username,))
             if cursor.fetchone():
                 logging.warning("Username already exists")
-                return False
-            
-            
-            hashed = bcrypt.hashpw(password.encode() + PEPPER, bcrypt.gensalt())
-            
+                return None
             
-            cursor.execute(
+        
+        return hash_password(password)
+    except sqlite3.Error as e:
+        logging.error("Database error during sign up: %s", e)
+        return None
+
+def create_user(username: str, hashed: bytes, email: str) -> bool:
+    """Insert a user whose password is already hashed (the write half of sign_up)"""
+    try:
+        with write_connection() as conn:
+            conn.execute(
                 'INSERT INTO users (username, password, email) VALUES (?, ?, ?)',
                 (username, hashed, email)
             )
-            conn.commit()
-            logging.info(f"User {username} registered successfully")
-            return True
-            
+        logging.info("User %s registered successfully", username)
+        return True
+    except sqlite3.IntegrityError:
+        # Someone took the name while we were hashing
+        logging.warning("Username already exists")
+        return False
     except sqlite3.Error as e:
-        logging.error(f"Database error during sign up: {e}")
+        logging.error("Database error during sign up: %s", e)
         return False
 
-def login(username: str, password: str) -> dict:
-    """Authenticate user and return user data if successful"""
+def _rehash(user_id, password):
+    """Re-hash a password whose stored cost differs from BCRYPT_ROUNDS"""
     try:
-        with sqlite3.connect(DATABASE_NAME) as conn:
+        hashed = hash_password(password)
+        with get_connection() as conn:
+            conn.execute('UPDATE users SET password = ? WHERE user_id = ?', (hashed, user_id))
+        logging.info("Rehashed password for user %s at cost %s", user_id, BCRYPT_ROUNDS)
+    except sqlite3.Error as e:
+        logging.warning("Could not rehash password for user %s: %s", user_id, e)
+
+def authenticate(username: str, password: str) -> dict:
+    """Check credentials and return the user without opening a session"""
+    try:
+        with get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT user_id, username, password, email FROM users WHERE username = ?', 
-                         (username,))
+            cursor.execute(LOGIN_SQL, (username,))
             user = cursor.fetchone()
-            
-            if user and verify_password(password, user[2]): 
-                return {
-                    'user_id': user[0],
-                    'username': user[1],
-                    'email': user[3]
-                }
-            return None
+        
+        # bcrypt runs after the connection is back in the pool
+        if user and verify_password(password, user[2]): 
+            if hasher.needs_rehash(user[2]):
+                _rehash(user[0], password)
+            return {'user_id': user[0], 'username': user[1], 'email': user[3]}
+        return None
     except sqlite3.Error as e:
-        logging.error(f"Login error: {e}")
+        logging.error("Login error: %s", e)
         return None
 
-def get_all_users():
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users")
-        return [dict(row) for row in cursor.fetchall()]
-
-def delete_user(user_id):
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
-        logging.info(f"User {user_id} deleted.")
+def login(username: str, password: str) -> dict:
+    """Authenticate user and return user data if successful"""
+    user = authenticate(username, password)
+    if user is None:
+        return None
+    from sessions import create_session
+    try:
+        user['session_token'] = create_session(user['user_id'])
+    except sqlite3.Error as e:
+        logging.error("Login error: %s", e)
+        return None
+    return user
 
 def add_book(title: str, author: str, book_type: str = 'fiction', genre_or_subject: str = None) -> bool:
     """Add a new book to the database"""
     try:
-        with sqlite3.connect(DATABASE_NAME) as conn:
+        with write_connection() as conn:
             cursor = conn.cursor()
-            
-            
-            print(f"Adding book: {title=}, {author=}, {book_type=}, {genre_or_subject=}")
-            
+            logging.debug("Adding book: title=%r, author=%r, book_type=%r, genre_or_subject=%r",
+                          title, author, book_type, genre_or_subject)
             cursor.execute('''
                 INSERT INTO books (title, author, status, book_type, genre_or_subject)
                 VALUES (?, ?, 'Available', ?, ?)
             ''', (title, author, book_type, genre_or_subject))
+            # A new copy of a title people are waiting for goes straight to the queue
+            _allocate(cursor, cursor.lastrowid, time.time())
             
-            conn.commit()
-            logging.info(f"Book '{title}' by {author} added successfully")
+            logging.info("Book '%s' by %s added successfully", title, author)
             return True
             
     except sqlite3.Error as e:
-        logging.error(f"Error adding book: {e}")
-        print(f"Database error: {e}")  
+        logging.error("Error adding book: %s", e)
         return False
     except Exception as e:
-        logging.error(f"Unexpected error adding book: {e}")
-        print(f"Unexpected error: {e}") 
+        logging.error("Unexpected error adding book: %s", e)
         return False
 
-def get_books():
-    try:
-        with sqlite3.connect(DATABASE_NAME) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT b.book_id, b.title, b.author, b.status,
+BOOK_COLUMNS = '''b.book_id, b.title, b.author, b.status,
                        CASE WHEN u.username IS NOT NULL 
                             THEN u.username 
                             ELSE '-' 
-                       END as borrower
-                FROM books b
-                LEFT JOIN users u ON b.borrower_id = u.user_id
-                ORDER BY b.book_id
-            ''')
+                       END as borrower'''
+
+DETAILED_BOOK_COLUMNS = '''b.book_id, b.title, b.author, b.status,
+                       b.book_type, b.genre_or_subject,
+                       COALESCE(u.username, '-') as borrower'''
+
+@_replicated
+@query_cache.cached
+def get_books(after_book_id: int = None, limit: int = None,
+              before_book_id: int = None, detailed: bool = False):
+    """Get books ordered by ID, optionally one keyset page at a time.
+
+    Pass the last book_id of the previous page as after_book_id (or the
+    first one as before_book_id to page backwards). detailed adds the
+    type and genre/subject columns used by the admin view.
+    """
+    columns = DETAILED_BOOK_COLUMNS if detailed else BOOK_COLUMNS
+    where, params = '', []
+    order = 'ASC'
+    if after_book_id is not None:
+        where = 'WHERE b.book_id > ?'
+        params.append(after_book_id)
+    elif before_book_id is not None:
+        where = 'WHERE b.book_id < ?'
+        params.append(before_book_id)
+        order = 'DESC'
+    limit_clause = ''
+    if limit is not None:
+        limit_clause = 'LIMIT ?'
+        params.append(limit)
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(BOOKS_PAGE_SQL.format(columns=columns, where=where, order=order, limit=limit_clause),
+                           params)
+            rows = cursor.fetchall()
+            if order == 'DESC':
+                rows.reverse()
+            return rows
+    except sqlite3.Error as e:
+        logging.error("Error getting books: %s", e)
+        return []
+
+def get_book_models(after_book_id: int = None, limit: int = None) -> list:
+    """Get books as Book/FictionBook/NonFictionBook objects instead of tuples"""
+    from book_models import book_row_factory
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = book_row_factory
+            cursor.execute('''
+                SELECT book_id, title, author, status, borrower_id, book_type, genre_or_subject
+                FROM books
+                WHERE book_id > ?
+                ORDER BY book_id
+                LIMIT ?
+            ''', (after_book_id or 0, -1 if limit is None else limit))
+            return cursor.fetchall()
+    except sqlite3.Error as e:
+        logging.error("Error getting books: %s", e)
+        return []
+
+def count_books() -> int:
+    """Return the number of books without loading them"""
+    try:
+        with get_connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM books').fetchone()[0]
+    except sqlite3.Error as e:
+        logging.error("Error counting books: %s", e)
+        return 0
+
+def _fts_query(text: str, column: str = None) -> str:
+    """Turn free text into an FTS5 query that prefix-matches every word"""
+    terms = ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text))
+    if column and terms:
+        return f'{column} : ({terms})'
+    return terms
+
+def search_books(query: str, limit: int = 50, offset: int = 0):
+    """Full-text search over title, author and genre/subject, best matches first"""
+    match = _fts_query(query)
+    if not match:
+        return []
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SEARCH_BOOKS_SQL, (match, limit, offset))
             return cursor.fetchall()
     except sqlite3.Error as e:
-        print(f"Error getting books: {e}")  
+        logging.error("Error searching books: %s", e)
         return []
 
+@_replicated
+@query_cache.cached
 def get_books_by_author(author: str):
     """Get all books by a specific author"""
+    match = _fts_query(author, column='author')
+    if not match:
+        return []
     try:
-        with sqlite3.connect(DATABASE_NAME) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT b.book_id, b.title, b.author, b.status, b.book_type, 
                        b.genre_or_subject, u.username
-                FROM books b
+                FROM books_fts
+                JOIN books b ON b.book_id = books_fts.rowid
                 LEFT JOIN users u ON b.borrower_id = u.user_id 
-                WHERE b.author LIKE ?
-            ''', (f'%{author}%',))
+                WHERE books_fts MATCH ?
+                ORDER BY b.book_id
+            ''', (match,))
             return cursor.fetchall()
     except sqlite3.Error as e:
-        logging.error(f"Error getting books by author: {e}")
+        logging.error("Error getting books by author: %s", e)
         return []
 
-def borrow_book(user, book_id):
-    """Borrow a book"""
-    try:
-        with sqlite3.connect(DATABASE_NAME) as conn:
-            cursor = conn.cursor()
-            
-            
-            cursor.execute('SELECT status FROM books WHERE book_id = ?', (book_id,))
-            result = cursor.fetchone()
-            
-            if not result:
-                logging.error("Book not found")
-                return False
-                
-            if result[0] != 'Available':
-                logging.error("Book is not available")
-                return False
-                
-           
+def _begin_immediate(conn):
+    """Take the write lock up front so the statements that follow cannot deadlock on upgrade"""
+    if not conn.in_transaction:
+        conn.execute('BEGIN IMMEDIATE')
+
+def _retry_on_busy(operation, *args):
+    """Run a write operation, retrying with bounded jittered backoff on SQLITE_BUSY"""
+    delay = BUSY_BACKOFF
+    for attempt in range(BUSY_RETRIES + 1):
+        try:
+            return operation(*args)
+        except sqlite3.OperationalError as e:
+            message = str(e)
+            if attempt == BUSY_RETRIES or ('locked' not in message and 'busy' not in message):
+                raise
+            logging.warning("Database busy, retrying (%s/%s)", attempt + 1, BUSY_RETRIES)
+            time.sleep(delay * random.uniform(0.5, 1.5))
+            delay = min(delay * 2, BUSY_BACKOFF_MAX)
+
+def _due(now):
+    return now + LOAN_DAYS * 86400
+
+def _lend(cursor, book_id, user_id, now, due):
+    """Record the loan of a copy just marked Borrowed"""
+    cursor.execute('INSERT INTO loans (book_id, user_id, borrowed_at, due_at) VALUES (?, ?, ?, ?)',
+                   (book_id, user_id, now, due))
+
+def _borrow(user_id, book_ids):
+    borrowed = []
+    now = time.time()
+    due = _due(now)
+    with write_connection() as conn:
+        _begin_immediate(conn)
+        cursor = conn.cursor()
+        for book_id in book_ids:
             cursor.execute('''
                 UPDATE books 
                 SET status = 'Borrowed',
-                    borrower_id = ?
-                WHERE book_id = ?
-            ''', (user['user_id'], book_id))
-            conn.commit()
-            logging.info(f"Book {book_id} borrowed by user {user['username']}")
+                    borrower_id = ?,
+                    borrowed_at = ?,
+                    due_date = ?
+                WHERE book_id = ? AND status = 'Available'
+            ''', (user_id, now, due, book_id))
+            if cursor.rowcount == 1:
+                _lend(cursor, book_id, user_id, now, due)
+                borrowed.append(book_id)
+    return borrowed
+
+def borrow_book(user, book_id):
+    """Borrow a book"""
+    try:
+        if _retry_on_busy(_borrow, user['user_id'], (book_id,)):
+            logging.info("Book %s borrowed by user %s", book_id, user['username'])
             return True
+        logging.error("Book %s is not available", book_id)
+        return False
             
     except sqlite3.Error as e:
-        logging.error(f"Error borrowing book: {e}")
+        logging.error("Error borrowing book: %s", e)
         return False
 
+def borrow_books(user, book_ids) -> list:
+    """Borrow several books in one transaction; returns the IDs actually borrowed"""
+    try:
+        borrowed = _retry_on_busy(_borrow, user['user_id'], list(book_ids))
+        logging.info("Books %s borrowed by user %s", borrowed, user['username'])
+        return borrowed
+    except sqlite3.Error as e:
+        logging.error("Error borrowing books: %s", e)
+        return []
+
+def _allocate(cursor, book_id, now):
+    """Lend a just-freed copy to the oldest waiting hold on its title; returns that user or None"""
+    hold = cursor.execute(NEXT_HOLD_SQL, (book_id,)).fetchone()
+    if hold is None:
+        return None
+    hold_id, user_id = hold
+    due = _due(now)
+    cursor.execute('''
+        UPDATE books SET status = 'Borrowed', borrower_id = ?, borrowed_at = ?, due_date = ?
+        WHERE book_id = ?
+    ''', (user_id, now, due, book_id))
+    _lend(cursor, book_id, user_id, now, due)
+    cursor.execute('''
+        UPDATE holds SET status = 'Fulfilled', book_id = ?, fulfilled_at = ? WHERE hold_id = ?
+    ''', (book_id, now, hold_id))
+    logging.info("Book %s allocated to hold %s of user %s", book_id, hold_id, user_id)
+    return user_id
+
+def _return(user_id, book_id):
+    with write_connection() as conn:
+        _begin_immediate(conn)
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE books 
+            SET status = 'Available',
+                borrower_id = NULL,
+                borrowed_at = NULL,
+                due_date = NULL
+            WHERE book_id = ? AND status = 'Borrowed' AND borrower_id = ?
+        ''', (book_id, user_id))
+        if cursor.rowcount != 1:
+            return False
+        now = time.time()
+        cursor.execute(CLOSE_LOAN_SQL, (now, book_id))
+        _allocate(cursor, book_id, now)
+        return True
+
 def return_book(user_id, book_id):
     """Return a book to the library"""
     try:
-        with sqlite3.connect(DATABASE_NAME) as conn:
-            cursor = conn.cursor()
-            
-            
-            cursor.execute('''
-                SELECT status, borrower_id 
-                FROM books 
-                WHERE book_id = ?
-            ''', (book_id,))
-            
-            book = cursor.fetchone()
-            
-            if not book:
-                print(f"Book {book_id} not found")  
-                return False
-                
-            status, current_borrower = book
-            
-            if status != 'Borrowed' or current_borrower != user_id:
-                print(f"Book status: {status}, borrower: {current_borrower}, user: {user_id}")  
-                return False
-            
-            
-            cursor.execute('''
-                UPDATE books 
-                SET status = 'Available',
-                    borrower_id = NULL 
-                WHERE book_id = ? 
-            ''', (book_id,))
-            
-            conn.commit()
+        if _retry_on_busy(_return, user_id, book_id):
             return True
+        logging.warning("Book %s is not borrowed by user %s", book_id, user_id)
+        return False
             
     except sqlite3.Error as e:
-        print(f"Database error: {e}")  
+        logging.error("Error returning book: %s", e)
         return False
 
+def delete_book(book_id) -> bool:
+    """Delete a book by ID"""
+    try:
+        with write_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(CLOSE_LOAN_SQL, (time.time(), book_id))
+            cursor.execute('DELETE FROM books WHERE book_id = ? RETURNING title_id', (book_id,))
+            deleted = cursor.fetchall()
+            if deleted:
+                # Nobody can be served once the last copy of a title is gone
+                cursor.execute('''
+                    UPDATE holds SET status = 'Cancelled'
+                    WHERE title_id = ? AND status = 'Waiting'
+                      AND NOT EXISTS (SELECT 1 FROM books WHERE title_id = ?)
+                ''', (deleted[0][0], deleted[0][0]))
+            return bool(deleted)
+    except sqlite3.Error as e:
+        logging.error("Error deleting book: %s", e)
+        raise
+
 def get_book_types():
     return ['general', 'fiction', 'science']
 
-def export_books_to_file(format='txt'):
+def export_books_to_file(format='txt', filename: str = None, **filters):
     """Export books to a file"""
+    from catalog_export import export_books
     try:
-        books = get_books()
-        if format == 'txt':
-            with open('books_export.txt', 'w', encoding='utf-8') as f:
-                for book in books:
-                    f.write(f"ID: {book[0]}\n")
-                    f.write(f"Title: {book[1]}\n")
-                    f.write(f"Author: {book[2]}\n")
-                    f.write(f"Status: {book[3]}\n")
-                    f.write(f"Type: {book[4]}\n")
-                    f.write(f"Genre/Subject: {book[5]}\n")
-                    f.write("-" * 50 + "\n")
+        export_books(filename or f'books_export.{format}', fmt=format, **filters)
         return True
     except Exception as e:
-        logging.error(f"Error exporting books: {e}")
+        logging.error("Error exporting books: %s", e)
         return False
 
 def book_exists(title, author):
     """Check if book already exists"""
     try:
-        with sqlite3.connect(DATABASE_NAME) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT 1 FROM books WHERE title = ? AND author = ?', (title, author))
+            cursor.execute(BOOK_EXISTS_SQL, (title, author))
             return cursor.fetchone() is not None
     except sqlite3.Error as e:
-        logging.error(f"Book check error: {e}")
+        logging.error("Book check error: %s", e)
         return False
 
 
 
+@_replicated
+@query_cache.cached
 def get_all_users():
     """Get all registered users"""
     try:
-        with sqlite3.connect(DATABASE_NAME) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT user_id, username, email FROM users')
+            cursor.execute('SELECT user_id, username, email FROM users ORDER BY user_id')
             return cursor.fetchall()
     except sqlite3.Error as e:
-        logging.error(f"Error fetching users: {e}")
+        logging.error("Error fetching users: %s", e)
         return []
 
 def delete_user(user_id):
     """Delete a user by ID"""
     try:
-        with sqlite3.connect(DATABASE_NAME) as conn:
+        with write_connection() as conn:
+            _begin_immediate(conn)
             cursor = conn.cursor()
-            
-            cursor.execute('UPDATE books SET borrower_id = NULL WHERE borrower_id = ?', (user_id,))
+            now = time.time()
+            cursor.execute("UPDATE holds SET status = 'Cancelled' WHERE user_id = ? AND status = 'Waiting'",
+                           (user_id,))
+            # History stays, but the user's open loans end with the account
+            cursor.execute(CLOSE_USER_LOANS_SQL, (now, user_id))
+            # Their copies are back on the shelf, so the hold queues get them as on a return
+            cursor.execute(RELEASE_USER_BOOKS_SQL, (user_id,))
+            for (book_id,) in cursor.fetchall():
+                _allocate(cursor, book_id, now)
             
             cursor.execute('DELETE FROM users WHERE user_id = ?', (user_id,))
-            conn.commit()
+            
+            from sessions import revoke_user_sessions
+            revoke_user_sessions(user_id)
             return True
     except Exception as e:
-        logging.error(f"Error deleting user: {str(e)}")
+        logging.error("Error deleting user: %s", e)
         return False
 
 
+def _place_hold(user_id, title_id):
+    now = time.time()
+    with write_connection() as conn:
+        _begin_immediate(conn)
+        cursor = conn.cursor()
+        if cursor.execute('SELECT 1 FROM titles WHERE title_id = ?', (title_id,)).fetchone() is None:
+            return None
+        cursor.execute('''
+            INSERT INTO holds (title_id, user_id, status, created_at) VALUES (?, ?, 'Waiting', ?)
+        ''', (title_id, user_id, now))
+        hold_id = cursor.lastrowid
+        free = cursor.execute(FREE_COPY_SQL, (title_id,)).fetchone()
+        if free is not None:
+            _allocate(cursor, free[0], now)
+        status, book_id = cursor.execute('SELECT status, book_id FROM holds WHERE hold_id = ?',
+                                         (hold_id,)).fetchone()
+        return {'hold_id': hold_id, 'title_id': title_id, 'status': status, 'book_id': book_id}
+
+def place_hold(user, title_id: int) -> dict:
+    """Join the queue for a title; a free copy, if any, is lent at once.
+
+    Returns {'hold_id', 'title_id', 'status', 'book_id'} with status
+    'Fulfilled' (book_id lent to the user) or 'Waiting', or None if the
+    title does not exist or the user is already waiting for it.
+    """
+    try:
+        hold = _retry_on_busy(_place_hold, user['user_id'], title_id)
+        if hold is not None:
+            logging.info("User %s placed hold %s on title %s (%s)",
+                         user['username'], hold['hold_id'], title_id, hold['status'])
+        return hold
+    except sqlite3.IntegrityError:
+        logging.warning("User %s is already waiting for title %s", user['username'], title_id)
+        return None
+    except sqlite3.Error as e:
+        logging.error("Error placing hold: %s", e)
+        return None
+
+def cancel_hold(user_id: int, hold_id: int) -> bool:
+    """Leave a queue; only a waiting hold can be cancelled"""
+    try:
+        with write_connection() as conn:
+            cursor = conn.execute('''
+                UPDATE holds SET status = 'Cancelled'
+                WHERE hold_id = ? AND user_id = ? AND status = 'Waiting'
+            ''', (hold_id, user_id))
+            return cursor.rowcount == 1
+    except sqlite3.Error as e:
+        logging.error("Error cancelling hold: %s", e)
+        return False
+
+def get_user_holds(user_id: int, limit: int = 50) -> list:
+    """A user's holds, newest first: (hold_id, title_id, title, author, status, book_id, created_at, position)
+
+    position is the place in the queue of a waiting hold (1 is next), None otherwise.
+    """
+    try:
+        with get_connection() as conn:
+            return conn.execute(USER_HOLDS_SQL, (user_id, limit)).fetchall()
+    except sqlite3.Error as e:
+        logging.error("Error getting holds: %s", e)
+        return []
+
+def get_title(title_id: int = None, book_id: int = None) -> dict:
+    """A title (or the title of a copy) with its copy and queue sizes"""
+    try:
+        with get_connection() as conn:
+            if title_id is None:
+                row = conn.execute('SELECT title_id FROM books WHERE book_id = ?', (book_id,)).fetchone()
+                if row is None:
+                    return None
+                title_id = row[0]
+            row = conn.execute('SELECT title, author FROM titles WHERE title_id = ?', (title_id,)).fetchone()
+            if row is None:
+                return None
+            copies = dict(conn.execute(
+                'SELECT status, COUNT(*) FROM books WHERE title_id = ? GROUP BY status', (title_id,)))
+            waiting = conn.execute("SELECT COUNT(*) FROM holds WHERE title_id = ? AND status = 'Waiting'",
+                                   (title_id,)).fetchone()[0]
+            return {'title_id': title_id, 'title': row[0], 'author': row[1],
+                    'copies': sum(copies.values()), 'available': copies.get('Available', 0),
+                    'waiting': waiting}
+    except sqlite3.Error as e:
+        logging.error("Error getting title: %s", e)
+        return None
+
+def get_loan_history(book_id: int = None, user_id: int = None, limit: int = 50) -> list:
+    """Most recent loans of a book or a user: (loan_id, book_id, title, user_id, username, borrowed_at, returned_at)"""
+    column, value = ('l.book_id', book_id) if book_id is not None else ('l.user_id', user_id)
+    try:
+        with get_connection() as conn:
+            return conn.execute(LOAN_HISTORY_SQL.format(column=column), (value, limit)).fetchall()
+    except sqlite3.Error as e:
+        logging.error("Error getting loan history: %s", e)
+        return []
+
+def get_most_borrowed(month: str = None, limit: int = 10) -> list:
+    """Most borrowed books in a 'YYYY-MM' month (default: this month) as (book_id, title, author, loans)"""
+    month = month or time.strftime('%Y-%m', time.gmtime())
+    try:
+        with get_connection() as conn:
+            return conn.execute(MOST_BORROWED_SQL, (month, limit)).fetchall()
+    except sqlite3.Error as e:
+        logging.error("Error getting most borrowed books: %s", e)
+        return []
+
+def get_loan_stats(book_id: int = None, user_id: int = None) -> dict:
+    """Loan counters for one book ({loans, last_borrowed_at}) or one user ({loans, active_loans})"""
+    try:
+        with get_connection() as conn:
+            if book_id is not None:
+                row = conn.execute('SELECT loans, last_borrowed_at FROM book_loan_stats WHERE book_id = ?',
+                                   (book_id,)).fetchone()
+                return {'loans': row[0], 'last_borrowed_at': row[1]} if row else {'loans': 0, 'last_borrowed_at': None}
+            row = conn.execute('SELECT loans, active_loans FROM user_loan_stats WHERE user_id = ?',
+                               (user_id,)).fetchone()
+            return {'loans': row[0], 'active_loans': row[1]} if row else {'loans': 0, 'active_loans': 0}
+    except sqlite3.Error as e:
+        logging.error("Error getting loan stats: %s", e)
+        return {}
+
+def get_daily_loan_totals(days: int = 30) -> list:
+    """(day, borrows, returns) for the last days days, newest first"""
+    since = time.strftime('%Y-%m-%d', time.gmtime(time.time() - days * 86400))
+    try:
+        with get_connection() as conn:
+            return conn.execute(
+                'SELECT day, borrows, returns FROM daily_loan_stats WHERE day > ? ORDER BY day DESC',
+                (since,)).fetchall()
+    except sqlite3.Error as e:
+        logging.error("Error getting daily loan totals: %s", e)
+        return []
+
+def get_book_counts() -> dict:
+    """Catalog counters: {'total': n, 'status': {...}, 'book_type': {...}, 'genre': {...}}"""
+    counts = {'total': 0, 'status': {}, 'book_type': {}, 'genre': {}}
+    try:
+        with get_connection() as conn:
+            for dimension, value, count in conn.execute(
+                    'SELECT dimension, value, count FROM book_counts WHERE count != 0'):
+                if dimension == 'total':
+                    counts['total'] = count
+                else:
+                    counts[dimension][value] = count
+    except sqlite3.Error as e:
+        logging.error("Error getting book counts: %s", e)
+    return counts
+
+def check_book_counts(repair: bool = True) -> list:
+    """Recount books from scratch and compare with book_counts.
+
+    Returns the counters that drifted as (dimension, value, stored, actual)
+    and, when repair is set, rewrites the table with the recount.
+    """
+    with write_connection() as conn:
+        _begin_immediate(conn)
+        stored = {(d, v): c for d, v, c in conn.execute('SELECT dimension, value, count FROM book_counts')}
+        actual = {(d, v): c for d, v, c in conn.execute(BOOK_COUNTS_SQL)}
+        drift = [(d, v, stored.get((d, v), 0), actual.get((d, v), 0))
+                 for d, v in sorted(stored.keys() | actual.keys())
+                 if stored.get((d, v), 0) != actual.get((d, v), 0)]
+        if drift and repair:
+            conn.execute('DELETE FROM book_counts')
+            conn.execute(f'INSERT INTO book_counts (dimension, value, count) {BOOK_COUNTS_SQL}')
+    for dimension, value, was, count in drift:
+        logging.warning("Book counter %s=%r drifted: stored %s, actual %s", dimension, value, was, count)
+    return drift
+
+
+def get_cache_stats() -> dict:
+    """Return query cache hit/miss counters"""
+    return query_cache.stats()
+
+def set_cache_enabled(enabled: bool):
+    """Turn the read-through query cache on or off"""
+    query_cache.enabled = enabled
+    query_cache.bump()
+
+def get_pool_stats() -> dict:
+    """Return connection pool statistics (hits, waits, open connections)"""
+    stats = pool.stats()
+    if replica is not None:
+        stats['replica'] = replica.stats()
+    return stats
+
+def set_query_tracing(enabled: bool):
+    """Start or stop per-statement tracing; pooled connections are reopened"""
+    tracer.enabled = enabled
+    pool.set_factory(TracedConnection if enabled else sqlite3.Connection)
+
+def get_query_report(limit: int = 20) -> str:
+    """Table of the most expensive traced queries"""
+    return tracer.report(limit)
+
+
 
 def hash_password(password: str) -> bytes:
     """Hash the password using bcrypt and pepper."""
-    return bcrypt.hashpw(password.encode() + PEPPER, bcrypt.gensalt())
+    return hasher.hash(password)
 
 def verify_password(password: str, hashed: bytes) -> bool:
     """Verify the password against the hashed password."""
-    return bcrypt.checkpw(password.encode() + PEPPER, hashed)
+    return hasher.verify(password, hashed)
 
 
 
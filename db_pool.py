@@ -0,0 +1,172 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -20000,       # negative = KiB, so ~20MB of page cache
+    'mmap_size': 268435456,     # 256MB
+    'busy_timeout': 5000,       # ms
+    'temp_store': 'MEMORY',
+}
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """Raised when no connection becomes free within the pool timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of tuned SQLite connections.
+
+    A thread keeps using the same connection for nested calls, and prefers
+    the connection it used last time so its page cache stays warm.
+    """
+
+    def __init__(self, database, max_connections=8, timeout=10.0,
+                 cached_statements=256, pragmas=None, factory=sqlite3.Connection):
+        self.database = database
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.factory = factory
+
+        self._cond = threading.Condition()
+        self._idle = []
+        self._all = set()
+        self._local = threading.local()
+        self._holders = {}          # thread ident -> connection it has checked out
+        self._monitor = None        # connection only used to read PRAGMA data_version
+        self._monitor_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'waits': 0, 'wait_time': 0.0}
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.database,
+            timeout=self.pragmas.get('busy_timeout', 5000) / 1000,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            factory=self.factory,
+        )
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def acquire(self):
+        """Check out a connection, reusing the calling thread's if it holds one"""
+        local = self._local
+        if getattr(local, 'depth', 0):
+            local.depth += 1
+            return local.conn
+
+        with self._cond:
+            conn = self._take_idle(getattr(local, 'last', None))
+            if conn is None and len(self._all) < self.max_connections:
+                self._stats['misses'] += 1
+                conn = self._open()
+                self._all.add(conn)
+            if conn is None:
+                self._stats['waits'] += 1
+                started = time.perf_counter()
+                deadline = started + self.timeout
+                while not self._idle:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        raise PoolTimeout('Timed out waiting for a database connection')
+                    self._cond.wait(remaining)
+                self._stats['wait_time'] += time.perf_counter() - started
+                conn = self._take_idle(None)
+            self._holders[threading.get_ident()] = conn
+
+        local.conn = conn
+        local.last = conn
+        local.depth = 1
+        return conn
+
+    def _take_idle(self, preferred):
+        if not self._idle:
+            return None
+        self._stats['hits'] += 1
+        if preferred is not None and preferred in self._idle:
+            self._idle.remove(preferred)
+            return preferred
+        return self._idle.pop()
+
+    def release(self, conn):
+        local = self._local
+        local.depth -= 1
+        if local.depth:
+            return
+        local.conn = None
+        with self._cond:
+            self._holders.pop(threading.get_ident(), None)
+            if conn in self._all:
+                self._idle.append(conn)
+                self._cond.notify()
+            else:
+                conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Yield a pooled connection; commit on success, roll back on error.
+
+        Only the outermost block of a thread ends the transaction, so pooled
+        helpers can call each other without committing half-way.
+        """
+        conn = self.acquire()
+        outermost = self._local.depth == 1
+        try:
+            yield conn
+            if outermost:
+                conn.commit()
+        except BaseException:
+            if outermost:
+                conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def interrupt(self, thread_id):
+        """Interrupt the query running on the connection thread_id has checked out, if any"""
+        with self._cond:
+            conn = self._holders.get(thread_id)
+            if conn is not None:
+                conn.interrupt()
+
+    def data_version(self) -> int:
+        """A number that changes whenever any connection, in any process, commits to the file"""
+        with self._monitor_lock:
+            if self._monitor is None:
+                self._monitor = sqlite3.connect(self.database, check_same_thread=False)
+            return self._monitor.execute('PRAGMA data_version').fetchone()[0]
+
+    def stats(self):
+        """Return a snapshot of pool counters"""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot['open'] = len(self._all)
+            snapshot['idle'] = len(self._idle)
+            snapshot['in_use'] = len(self._all) - len(self._idle)
+            snapshot['max_connections'] = self.max_connections
+        return snapshot
+
+    def set_factory(self, factory):
+        """Open future connections with factory and retire the current ones"""
+        self.factory = factory
+        self.close_all()
+
+    def close_all(self):
+        """Close idle connections; busy ones are closed when they come back"""
+        with self._cond:
+            for conn in self._idle:
+                conn.close()
+            self._all.difference_update(self._idle)
+            self._idle.clear()
+            self._all.clear()
+        with self._monitor_lock:
+            if self._monitor is not None:
+                self._monitor.close()
+                self._monitor = None
@@ -0,0 +1,122 @@
+import os
+import queue
+import logging
+from tkinter import TclError
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DBExecutor:
+    """Runs blocking database/bcrypt calls on worker threads for a Tk window.
+
+    Results are handed back to the Tk thread by polling a queue from
+    window.after, so callbacks may touch widgets freely. Calls submitted
+    with the same key supersede each other: only the newest one reports.
+    """
+
+    def __init__(self, window, max_workers=None, poll_interval=20):
+        if max_workers is None:
+            max_workers = int(os.getenv('DB_WORKERS', '4'))
+        self.window = window
+        self.poll_interval = poll_interval
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='db-worker')
+        self._results = queue.SimpleQueue()
+        self._latest = {}
+        self._in_flight = 0
+        self._disabled = {}
+        self._polling = False
+
+    def submit(self, fn, *args, on_success=None, on_error=None, key=None,
+               widgets=(), **kwargs):
+        """Run fn(*args, **kwargs) off the UI thread.
+
+        on_success(result) or on_error(exception) is called on the Tk thread.
+        widgets are disabled until the call finishes. A later submit with
+        the same key cancels this one (or drops its result if it already ran).
+        """
+        if key is not None:
+            previous = self._latest.get(key)
+            if previous is not None:
+                previous.cancel()
+
+        self._disable(widgets)
+        future = self._pool.submit(fn, *args, **kwargs)
+        if key is not None:
+            self._latest[key] = future
+        self._in_flight += 1
+
+        def done(finished):
+            self._results.put((finished, key, widgets, on_success, on_error))
+
+        future.add_done_callback(done)
+        self._start_polling()
+        return future
+
+    def _start_polling(self):
+        if not self._polling:
+            self._polling = True
+            self.window.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        try:
+            while True:
+                try:
+                    future, key, widgets, on_success, on_error = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                self._in_flight -= 1
+                self._enable(widgets)
+                if future.cancelled():
+                    continue
+                if key is not None:
+                    if self._latest.get(key) is not future:
+                        continue
+                    del self._latest[key]
+                self._deliver(future, on_success, on_error)
+        finally:
+            # Always poll again while calls are out, or their buttons would stay disabled
+            if self._in_flight:
+                self.window.after(self.poll_interval, self._poll)
+            else:
+                self._polling = False
+
+    @staticmethod
+    def _deliver(future, on_success, on_error):
+        # A failing callback is logged so it cannot stop later results being delivered
+        try:
+            error = future.exception()
+            if error is not None:
+                if on_error is not None:
+                    on_error(error)
+                else:
+                    logging.error("Background task failed: %s", error)
+            elif on_success is not None:
+                on_success(future.result())
+        except Exception:
+            logging.exception("Callback for a background task failed")
+
+    def _disable(self, widgets):
+        for widget in widgets:
+            count = self._disabled.get(widget, 0)
+            if not count:
+                self._set_state(widget, ['disabled'])
+            self._disabled[widget] = count + 1
+
+    def _enable(self, widgets):
+        # Reference-counted so overlapping calls leave a button disabled until the last finishes
+        for widget in widgets:
+            count = self._disabled.pop(widget, 1) - 1
+            if count:
+                self._disabled[widget] = count
+            else:
+                self._set_state(widget, ['!disabled'])
+
+    @staticmethod
+    def _set_state(widget, state):
+        try:
+            if widget.winfo_exists():
+                widget.state(state)
+        except TclError:
+            pass
+
+    def shutdown(self, wait=False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
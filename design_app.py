@@ -1,28 +1,61 @@
+import time
+_started = time.perf_counter()
+
 import os
+import sys
 import tkinter as tk
 from tkinter import ttk, messagebox
-from dotenv import load_dotenv
 import sqlite3
-import csv
+import logging
 from datetime import datetime
+from functools import partial
 
 from database import (
     ADMIN_USER, ADMIN_PASS,
     create_database, sign_up, login,
-    add_book, get_books, borrow_book, return_book,
+    add_book, get_books, count_books, borrow_book, return_book,
     get_book_types, export_books_to_file,
-    get_all_users, delete_user, get_books_by_author, DATABASE_NAME
+    get_all_users, delete_user, search_books, delete_book,
+    get_book_counts, check_book_counts, get_title, place_hold,
+    DB_REPLICA, enable_replica
 )
+from db_worker import DBExecutor
+from lazy_tree import LazyTreeLoader, TreeReconciler
 
-load_dotenv(os.path.join(os.path.dirname(__file__), 'manager.env'))
+_imported = time.perf_counter()
+
+DASHBOARD_REFRESH_MS = int(os.getenv('DASHBOARD_REFRESH_MS', '2000'))
+OVERDUE_SWEEP_INTERVAL = float(os.getenv('OVERDUE_SWEEP_INTERVAL', '0'))
+SESSION_SWEEP_INTERVAL = float(os.getenv('SESSION_SWEEP_INTERVAL', '3600'))
+
+
+class StartupProfile:
+    """Wall-clock marks for --profile-startup"""
 
-class LibraryApp:
     def __init__(self):
-        create_database()
+        self.marks = [('start', _started), ('imports', _imported)]
+
+    def mark(self, phase):
+        self.marks.append((phase, time.perf_counter()))
+
+    def since_start_ms(self, phase):
+        return next((t - _started) * 1000 for name, t in self.marks if name == phase)
+
+    def report(self):
+        lines = [f"{'phase':<14}{'ms':>9}{'total ms':>10}"]
+        for (_, previous), (name, t) in zip(self.marks, self.marks[1:]):
+            lines.append(f"{name:<14}{(t - previous) * 1000:>9.1f}{(t - _started) * 1000:>10.1f}")
+        return '\n'.join(lines)
+
+class LibraryApp:
+    def __init__(self, profile=None):
+        self.profile = profile
         self.window = tk.Tk()
         self.window.title("Library System")
         self.window.geometry("1000x700")
         self.current_user = None
+        self.executor = DBExecutor(self.window)
+        self._mark('window')
 
         
         self.style = ttk.Style()
@@ -88,8 +121,40 @@ class LibraryApp:
         
         self.window.configure(bg='white')
         self.style.configure('TFrame', background='white')
+        self._mark('styles')
 
         self.show_main_menu()
+        self._mark('main menu')
+        # Queued behind Tk's own idle redraw, so the menu is on screen first
+        self.window.after_idle(self._finish_startup)
+
+    def _mark(self, phase):
+        if self.profile is not None:
+            self.profile.mark(phase)
+
+    def _finish_startup(self):
+        self._mark('first frame')
+        create_database()
+        self._mark('schema check')
+        if DB_REPLICA:
+            enable_replica()
+        if OVERDUE_SWEEP_INTERVAL:
+            self.window.after(int(OVERDUE_SWEEP_INTERVAL * 1000), self._sweep_overdue)
+        if SESSION_SWEEP_INTERVAL:
+            self.window.after(int(SESSION_SWEEP_INTERVAL * 1000), self._sweep_sessions)
+
+    def _sweep_overdue(self):
+        # Chunked with pauses, so it can share the workers with the UI's own calls
+        from overdue import sweep_overdue
+        self.executor.submit(sweep_overdue, key='overdue-sweep',
+            on_error=lambda e: logging.error("Overdue sweep failed: %s", e))
+        self.window.after(int(OVERDUE_SWEEP_INTERVAL * 1000), self._sweep_overdue)
+
+    def _sweep_sessions(self):
+        from sessions import sweep_sessions
+        self.executor.submit(sweep_sessions, key='session-sweep',
+            on_error=lambda e: logging.error("Session sweep failed: %s", e))
+        self.window.after(int(SESSION_SWEEP_INTERVAL * 1000), self._sweep_sessions)
 
     def clear_window(self):
         for widget in self.window.winfo_children():
@@ -172,6 +237,101 @@ class LibraryApp:
         self.setup_admin_book_management(books_frame)
         notebook.add(books_frame, text="Books")
 
+        dashboard_frame = ttk.Frame(notebook, padding=10)
+        self.setup_dashboard(dashboard_frame)
+        notebook.add(dashboard_frame, text="Dashboard")
+
+        overdue_frame = ttk.Frame(notebook, padding=10)
+        self.setup_overdue(overdue_frame)
+        notebook.add(overdue_frame, text="Overdue")
+
+    def setup_overdue(self, frame):
+        self.overdue_tree = ttk.Treeview(frame,
+            columns=('User', 'Email', 'Book', 'Due', 'Days Late'),
+            show='tree headings')
+        self.overdue_tree.column('#0', width=30)
+        for col, width in {'User': 150, 'Email': 200, 'Book': 250, 'Due': 100, 'Days Late': 80}.items():
+            self.overdue_tree.column(col, width=width)
+            self.overdue_tree.heading(col, text=col)
+        self.overdue_tree.pack(fill="both", expand=True)
+        self.overdue_button = ttk.Button(frame, text="Sweep and Refresh",
+                  command=self.refresh_overdue)
+        self.overdue_button.pack(pady=10)
+        self.refresh_overdue(sweep=False)
+
+    def refresh_overdue(self, sweep=True):
+        from overdue import sweep_overdue, get_overdue_report
+
+        def load():
+            if sweep:
+                sweep_overdue()
+            return get_overdue_report()
+
+        def show(report):
+            if not self.overdue_tree.winfo_exists():
+                return
+            self.overdue_tree.delete(*self.overdue_tree.get_children())
+            for entry in report:
+                parent = self.overdue_tree.insert('', 'end', open=False,
+                    values=(entry['username'], entry['email'], f"{len(entry['items'])} books", '', ''))
+                for book_id, title, author, due_date, days in entry['items']:
+                    self.overdue_tree.insert(parent, 'end', values=('', '', f"#{book_id} {title}",
+                        datetime.fromtimestamp(due_date).strftime('%Y-%m-%d'), days))
+
+        self.executor.submit(load, on_success=show, key='overdue',
+            widgets=(self.overdue_button,))
+
+    def setup_dashboard(self, frame):
+        self.dashboard_summary = ttk.Label(frame, font=("Arial", 12, "bold"))
+        self.dashboard_summary.pack(anchor="w", pady=(0, 10))
+
+        self.dashboard_tree = ttk.Treeview(frame,
+            columns=('Counter', 'Value', 'Books'),
+            show='headings')
+        for col, width in {'Counter': 150, 'Value': 250, 'Books': 100}.items():
+            self.dashboard_tree.column(col, width=width)
+            self.dashboard_tree.heading(col, text=col)
+        self.dashboard_view = TreeReconciler(self.dashboard_tree, key=lambda row: f'{row[0]}:{row[1]}')
+        self.dashboard_tree.pack(fill="both", expand=True)
+
+        self.check_counts_button = ttk.Button(frame, text="Check Counters",
+                  command=self.check_dashboard_counts)
+        self.check_counts_button.pack(pady=10)
+        self.refresh_dashboard(self.dashboard_tree)
+
+    def refresh_dashboard(self, tree):
+        # Polls the counter table, a handful of key lookups, until this tab is gone
+        if tree is not self.dashboard_tree or not tree.winfo_exists():
+            return
+        self.load_dashboard()
+        self.window.after(DASHBOARD_REFRESH_MS, self.refresh_dashboard, tree)
+
+    def load_dashboard(self):
+        self.executor.submit(get_book_counts, on_success=self.show_dashboard, key='dashboard')
+
+    def show_dashboard(self, counts):
+        if not self.dashboard_tree.winfo_exists():
+            return
+        status = counts['status']
+        self.dashboard_summary.config(text=f"{counts['total']} books: "
+            f"{status.get('Available', 0)} available, {status.get('Borrowed', 0)} borrowed")
+        labels = {'status': 'Status', 'book_type': 'Type', 'genre': 'Genre/Subject'}
+        self.dashboard_view.sync([(label, value or '(none)', count)
+                                  for dimension, label in labels.items()
+                                  for value, count in sorted(counts[dimension].items())])
+
+    def check_dashboard_counts(self):
+        def done(drift):
+            if drift:
+                details = '\n'.join(f"{d} {v!r}: {stored} -> {actual}" for d, v, stored, actual in drift[:20])
+                messagebox.showwarning("Counters", f"{len(drift)} counters had drifted and were rebuilt:\n{details}")
+            else:
+                messagebox.showinfo("Counters", "All counters match the catalog")
+            self.load_dashboard()
+        self.executor.submit(check_book_counts, on_success=done,
+            on_error=lambda e: messagebox.showerror("Error", f"Counter check failed: {e}"),
+            widgets=(self.check_counts_button,))
+
     def setup_admin_book_management(self, frame):
         
         controls = ttk.Frame(frame)
@@ -179,19 +339,22 @@ class LibraryApp:
         
         ttk.Button(controls, text="Add Book", 
                   command=self.show_add_book_dialog).pack(side="left", padx=5)
-        ttk.Button(controls, text="Delete Book", 
-                  command=self.delete_selected_book).pack(side="left", padx=5)
-        ttk.Button(controls, text="Export Books", 
-                  command=self.export_books_to_file).pack(side="left", padx=5)
+        self.delete_book_button = ttk.Button(controls, text="Delete Book", 
+                  command=self.delete_selected_book)
+        self.delete_book_button.pack(side="left", padx=5)
+        self.export_button = ttk.Button(controls, text="Export Books", 
+                  command=self.export_books_to_file)
+        self.export_button.pack(side="left", padx=5)
         
         
         search_frame = ttk.Frame(controls)
         search_frame.pack(side="right", padx=5)
-        ttk.Label(search_frame, text="Search by Author:").pack(side="left")
+        ttk.Label(search_frame, text="Search Catalog:").pack(side="left")
         self.author_search = ttk.Entry(search_frame)
         self.author_search.pack(side="left", padx=5)
-        ttk.Button(search_frame, text="Search", 
-                  command=self.search_by_author).pack(side="left")
+        self.search_button = ttk.Button(search_frame, text="Search", 
+                  command=self.search_by_author)
+        self.search_button.pack(side="left")
         
        
         self.admin_books_tree = ttk.Treeview(frame, 
@@ -207,7 +370,17 @@ class LibraryApp:
             self.admin_books_tree.column(col, width=width)
             self.admin_books_tree.heading(col, text=col)
         
-        self.admin_books_tree.pack(fill="both", expand=True)
+        admin_count_label = ttk.Label(frame)
+        admin_count_label.pack(side="bottom", anchor="w", pady=(5, 0))
+        
+        admin_scrollbar = ttk.Scrollbar(frame, orient="vertical", 
+                                      command=self.admin_books_tree.yview)
+        self.admin_books_loader = LazyTreeLoader(self.admin_books_tree,
+            partial(get_books, detailed=True), count_rows=count_books,
+            scrollbar=admin_scrollbar, count_label=admin_count_label, executor=self.executor)
+        
+        self.admin_books_tree.pack(side="left", fill="both", expand=True)
+        admin_scrollbar.pack(side="right", fill="y")
         self.update_admin_books_list()
 
     def setup_user_management(self, frame):
@@ -217,11 +390,13 @@ class LibraryApp:
             
         for col in ('ID', 'Username', 'Email'):
             self.users_tree.heading(col, text=col)
+        self.users_view = TreeReconciler(self.users_tree)
             
         self.users_tree.pack(fill="both", expand=True)
         
-        ttk.Button(frame, text="Delete User", 
-                  command=self.delete_selected_user).pack(pady=10)
+        self.delete_user_button = ttk.Button(frame, text="Delete User", 
+                  command=self.delete_selected_user)
+        self.delete_user_button.pack(pady=10)
                   
         self.update_users_list()
 
@@ -244,8 +419,9 @@ class LibraryApp:
         button_frame = ttk.Frame(login_frame)
         button_frame.pack(pady=10)
         
-        ttk.Button(button_frame, text="Login", 
-                  command=self.handle_user_login).pack(side="left", padx=5)
+        self.login_button = ttk.Button(button_frame, text="Login", 
+                  command=self.handle_user_login)
+        self.login_button.pack(side="left", padx=5)
         ttk.Button(button_frame, text="Sign Up", 
                   command=self.show_signup_ui).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Back", 
@@ -271,8 +447,9 @@ class LibraryApp:
         self.email = ttk.Entry(signup_frame)
         self.email.pack(pady=(0, 20))
         
-        ttk.Button(signup_frame, text="Sign Up", 
-                  command=self.handle_signup).pack(pady=10)
+        self.signup_button = ttk.Button(signup_frame, text="Sign Up", 
+                  command=self.handle_signup)
+        self.signup_button.pack(pady=10)
         ttk.Button(signup_frame, text="Back", 
                   command=self.show_login_ui).pack()
 
@@ -285,27 +462,31 @@ class LibraryApp:
             messagebox.showerror("Error", "Please fill all fields")
             return
             
-        try:
-            success = sign_up(username, password, email)
+        def done(success):
             if success:
                 messagebox.showinfo("Success", "Account created successfully!")
                 self.show_login_ui()  
                 
             else:
                 messagebox.showerror("Error", "Username already exists")
-        except Exception as e:
-            messagebox.showerror("Error", f"Registration failed: {str(e)}")
+        
+        self.executor.submit(sign_up, username, password, email,
+            on_success=done, key='signup', widgets=(self.signup_button,),
+            on_error=lambda e: messagebox.showerror("Error", f"Registration failed: {str(e)}"))
 
     def handle_user_login(self):
         username = self.username.get()
         password = self.password.get()
-        user = login(username, password)
         
-        if user:
-            self.current_user = user
-            self.show_user_panel()
-        else:
-            messagebox.showerror("Error", "Invalid credentials")
+        def done(user):
+            if user:
+                self.current_user = user
+                self.show_user_panel()
+            else:
+                messagebox.showerror("Error", "Invalid credentials")
+        
+        self.executor.submit(login, username, password,
+            on_success=done, key='login', widgets=(self.login_button,))
 
     def show_user_panel(self):
         self.clear_window()
@@ -321,7 +502,7 @@ class LibraryApp:
         
         
         logout_btn = ttk.Button(header_frame, text="Logout", 
-                              style='Action.TButton', cursor='hand2', command=self.show_main_menu)
+                              style='Action.TButton', cursor='hand2', command=self.logout)
         logout_btn.pack(side="right")
         
         
@@ -331,10 +512,15 @@ class LibraryApp:
         
         actions = ttk.Frame(books_frame)
         actions.pack(fill="x", pady=(0, 15))
-        ttk.Button(actions, text="Borrow Book", style='Action.TButton',
-                  cursor='hand2', command=self.borrow_book).pack(side="left", padx=5)
-        ttk.Button(actions, text="Return Book", style='Action.TButton',
-                  cursor='hand2', command=self.return_book).pack(side="left", padx=5)
+        self.borrow_button = ttk.Button(actions, text="Borrow Book", style='Action.TButton',
+                  cursor='hand2', command=self.borrow_book)
+        self.borrow_button.pack(side="left", padx=5)
+        self.return_button = ttk.Button(actions, text="Return Book", style='Action.TButton',
+                  cursor='hand2', command=self.return_book)
+        self.return_button.pack(side="left", padx=5)
+        self.hold_button = ttk.Button(actions, text="Place Hold", style='Action.TButton',
+                  cursor='hand2', command=self.place_hold)
+        self.hold_button.pack(side="left", padx=5)
         
         
         self.books_tree = ttk.Treeview(books_frame, 
@@ -352,36 +538,42 @@ class LibraryApp:
             self.books_tree.heading(col, text=col)
         
        
+        count_label = ttk.Label(books_frame)
+        count_label.pack(side="bottom", anchor="w", pady=(5, 0))
+        
         scrollbar = ttk.Scrollbar(books_frame, orient="vertical", 
                                 command=self.books_tree.yview)
-        self.books_tree.configure(yscrollcommand=scrollbar.set)
+        self.books_loader = LazyTreeLoader(self.books_tree, get_books,
+            count_rows=count_books, scrollbar=scrollbar, count_label=count_label,
+            executor=self.executor)
         
         self.books_tree.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
         self.update_books_list()
 
+    def logout(self):
+        token = self.current_user.get('session_token') if self.current_user else None
+        if token:
+            from sessions import revoke_session
+            self.executor.submit(revoke_session, token)
+        self.current_user = None
+        self.show_main_menu()
+
     def update_books_list(self):
-        for item in self.books_tree.get_children():
-            self.books_tree.delete(item)
-        books = get_books()
-        for book in books:
-            self.books_tree.insert('', 'end', values=book)
-        
-        self.books_tree.update()
+        if hasattr(self, 'books_loader'):
+            self.books_loader.refresh()
 
     def update_users_list(self):
-        for item in self.users_tree.get_children():
-            self.users_tree.delete(item)
-        users = get_all_users()
-        for user in users:
-            self.users_tree.insert('', 'end', values=user)
+        def show(users):
+            if self.users_tree.winfo_exists():
+                self.users_view.sync(users)
+
+        if self.users_tree.winfo_exists():
+            self.executor.submit(get_all_users, on_success=show, key='users')
 
     def update_admin_books_list(self):
-        for item in self.admin_books_tree.get_children():
-            self.admin_books_tree.delete(item)
-        books = get_books()
-        for book in books:
-            self.admin_books_tree.insert('', 'end', values=book)
+        if hasattr(self, 'admin_books_loader'):
+            self.admin_books_loader.refresh()
 
     def show_add_book_dialog(self):
         dialog = tk.Toplevel(self.window)
@@ -427,29 +619,28 @@ class LibraryApp:
                 messagebox.showerror("Error", "Title and Author are required")
                 return
             
-            print(f"Attempting to add book: {title=}, {author=}")  
+            logging.debug("Attempting to add book: title=%r, author=%r", title, author)
             
-            try:
-                result = add_book(
-                    title=title,
-                    author=author,
-                    book_type=book_type.get(),
-                    genre_or_subject=genre_subject
-                )
-                
+            def done(result):
                 if result:
                     messagebox.showinfo("Success", "Book added successfully")
                     self.update_admin_books_list()
-                    dialog.destroy()
+                    if dialog.winfo_exists():
+                        dialog.destroy()
                 else:
                     messagebox.showerror("Error", "Failed to add book")
-            except Exception as e:
-                messagebox.showerror("Error", f"Error adding book: {str(e)}")
+            
+            self.executor.submit(add_book, title=title, author=author,
+                book_type=book_type.get(), genre_or_subject=genre_subject,
+                on_success=done,
+                on_error=lambda e: messagebox.showerror("Error", f"Error adding book: {str(e)}"),
+                widgets=(add_button,))
         
         
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(fill='x', pady=(20, 0))
-        ttk.Button(button_frame, text="Add", command=add).pack(side='left', padx=5)
+        add_button = ttk.Button(button_frame, text="Add", command=add)
+        add_button.pack(side='left', padx=5)
         ttk.Button(button_frame, text="Cancel", 
                   command=dialog.destroy).pack(side='left', padx=5)
         
@@ -464,81 +655,52 @@ class LibraryApp:
         dialog.geometry(f"+{x}+{y}")
 
     def delete_selected_book(self):
-        try:
-            selection = self.admin_books_tree.selection()
-            if not selection:
-                messagebox.showwarning("Warning", "Please select a book to delete")
-                return
-                
-            if messagebox.askyesno("Confirm", "Delete selected book?"):
-                book_id = self.admin_books_tree.item(selection[0])['values'][0]
-                
-                
-                conn = sqlite3.connect(DATABASE_NAME)
-                cursor = conn.cursor()
-                
-                
-                cursor.execute("DELETE FROM books WHERE book_id = ?", (book_id,))
-                conn.commit()
-                
-                
-                if cursor.rowcount > 0:
-                    
-                    self.admin_books_tree.delete(selection[0])
-                    
-                    
-                    self.update_admin_books_list()
-                    if hasattr(self, 'books_tree'):
-                        self.update_books_list()
-                        
-                    messagebox.showinfo("Success", "Book deleted successfully")
-                else:
-                    messagebox.showerror("Error", "Book not found in database")
+        selection = self.admin_books_tree.selection()
+        if not selection:
+            messagebox.showwarning("Warning", "Please select a book to delete")
+            return
+            
+        if not messagebox.askyesno("Confirm", "Delete selected book?"):
+            return
+        book_id = self.admin_books_tree.item(selection[0])['values'][0]
+        
+        def done(deleted):
+            if deleted:
+                self.update_admin_books_list()
+                if hasattr(self, 'books_tree'):
+                    self.update_books_list()
                     
-                conn.close()
-                
-        except sqlite3.Error as e:
-            messagebox.showerror("Error", f"Database error: {str(e)}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to delete book: {str(e)}")
-            print(f"Error details: {str(e)}")  
+                messagebox.showinfo("Success", "Book deleted successfully")
+            else:
+                messagebox.showerror("Error", "Book not found in database")
+        
+        def failed(e):
+            if isinstance(e, sqlite3.Error):
+                messagebox.showerror("Error", f"Database error: {str(e)}")
+            else:
+                messagebox.showerror("Error", f"Failed to delete book: {str(e)}")
+            logging.error("Failed to delete book: %s", e)
+        
+        self.executor.submit(delete_book, book_id, on_success=done, on_error=failed,
+            widgets=(self.delete_book_button,))
 
     def export_books_to_file(self):
-        try:
-            
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            
-            
-            cursor.execute("""
-                SELECT b.book_id, b.title, b.author, b.status, 
-                       b.book_type, b.genre_or_subject,
-                       COALESCE(u.username, '-') as borrower
-                FROM books b
-                LEFT JOIN users u ON b.borrower_id = u.user_id
-            """)
-            books = cursor.fetchall()
-        
-            filename = f"library_books_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            
-            
-            with open(filename, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                
-                writer.writerow(['ID', 'Title', 'Author', 'Status', 
-                               'Type', 'Genre/Subject', 'Borrower'])
-                
-                writer.writerows(books)
-            
-            conn.close()
-            messagebox.showinfo("Success", f"Books exported to {filename}")
-            
-        except sqlite3.Error as e:
-            messagebox.showerror("Error", f"Database error: {str(e)}")
-            print(f"Database error details: {str(e)}")  
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to export books: {str(e)}")
-            print(f"Error details: {str(e)}") 
+        def failed(e):
+            if isinstance(e, sqlite3.Error):
+                messagebox.showerror("Error", f"Database error: {str(e)}")
+            else:
+                messagebox.showerror("Error", f"Failed to export books: {str(e)}")
+            logging.error("Export failed: %s", e)
+        
+        self.executor.submit(self._write_books_csv,
+            on_success=lambda filename: messagebox.showinfo("Success", f"Books exported to {filename}"),
+            on_error=failed, key='export', widgets=(self.export_button,))
+
+    def _write_books_csv(self):
+        from catalog_export import export_books
+        filename = f"library_books_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        export_books(filename)
+        return filename
 
     def delete_selected_user(self):
         selection = self.users_tree.selection()
@@ -546,13 +708,19 @@ class LibraryApp:
             messagebox.showwarning("Warning", "Please select a user to delete")
             return
             
-        if messagebox.askyesno("Confirm", "Delete selected user?"):
-            user_id = self.users_tree.item(selection[0])['values'][0]
-            if delete_user(user_id):
+        if not messagebox.askyesno("Confirm", "Delete selected user?"):
+            return
+        user_id = self.users_tree.item(selection[0])['values'][0]
+        
+        def done(deleted):
+            if deleted:
                 self.update_users_list()
                 messagebox.showinfo("Success", "User deleted successfully")
             else:
                 messagebox.showerror("Error", "Failed to delete user")
+        
+        self.executor.submit(delete_user, user_id, on_success=done,
+            widgets=(self.delete_user_button,))
 
     def borrow_book(self):
         selection = self.books_tree.selection()
@@ -568,12 +736,39 @@ class LibraryApp:
             messagebox.showerror("Error", "This book is not available")
             return
             
-        if borrow_book(self.current_user, book_id):
-            self.update_books_list()
-            self.update_admin_books_list()   
-            messagebox.showinfo("Success", "Book borrowed successfully")
-        else:
-            messagebox.showerror("Error", "Could not borrow book")
+        def done(success):
+            if success:
+                self.update_books_list()
+                self.update_admin_books_list()   
+                messagebox.showinfo("Success", "Book borrowed successfully")
+            else:
+                messagebox.showerror("Error", "Could not borrow book")
+        
+        self.executor.submit(borrow_book, self.current_user, book_id,
+            on_success=done, widgets=(self.borrow_button, self.return_button))
+
+    def place_hold(self):
+        selection = self.books_tree.selection()
+        if not selection:
+            messagebox.showwarning("Warning", "Please select a book to hold")
+            return
+        book_id = self.books_tree.item(selection[0])['values'][0]
+
+        def hold_title(user, book_id):
+            title = get_title(book_id=book_id)
+            return title and place_hold(user, title['title_id'])
+
+        def done(hold):
+            if not hold:
+                messagebox.showerror("Error", "You are already waiting for this title")
+            elif hold['status'] == 'Fulfilled':
+                self.update_books_list()
+                messagebox.showinfo("Success", f"A copy was free: book {hold['book_id']} is now borrowed")
+            else:
+                messagebox.showinfo("Success", "Hold placed; the next returned copy will be lent to you")
+
+        self.executor.submit(hold_title, self.current_user, book_id, on_success=done,
+            widgets=(self.borrow_button, self.return_button, self.hold_button))
 
     def return_book(self):
         selection = self.books_tree.selection()
@@ -581,38 +776,56 @@ class LibraryApp:
             messagebox.showwarning("Warning", "Please select a book to return")
             return
         
-        try:
-            book_data = self.books_tree.item(selection[0])['values']
-            book_id = book_data[0]  
-            
-            
-            print(f"Attempting to return book: {book_id} by user: {self.current_user['username']}")
-            
-            if return_book(self.current_user['user_id'], book_id):
+        book_data = self.books_tree.item(selection[0])['values']
+        book_id = book_data[0]  
+        
+        
+        logging.debug("Attempting to return book %s by user %s", book_id, self.current_user['username'])
+        
+        def done(success):
+            if success:
                 self.update_books_list()
                 messagebox.showinfo("Success", "Book returned successfully")
             else:
                 messagebox.showerror("Error", "Could not return book. Make sure you borrowed this book.")
-        except Exception as e:
+        
+        def failed(e):
             messagebox.showerror("Error", f"Error returning book: {str(e)}")
-            print(f"Error details: {str(e)}")  
+            logging.error("Return failed: %s", e)
+        
+        self.executor.submit(return_book, self.current_user['user_id'], book_id,
+            on_success=done, on_error=failed,
+            widgets=(self.borrow_button, self.return_button))
 
     def search_by_author(self):
-        author = self.author_search.get().strip()
-        if not author:
-            messagebox.showwarning("Warning", "Please enter an author name")
+        query = self.author_search.get().strip()
+        if not query:
+            messagebox.showwarning("Warning", "Please enter a title, author or genre")
             return
             
-        books = get_books_by_author(author)
-        
-        
-        for item in self.admin_books_tree.get_children():
-            self.admin_books_tree.delete(item)
-            
-        
-        for book in books:
-            self.admin_books_tree.insert('', 'end', values=book)
+        # A newer search supersedes one still in flight
+        self.executor.submit(search_books, query, limit=500,
+            on_success=self.admin_books_loader.show_rows, key='search')
 
 if __name__ == "__main__":
-    app = LibraryApp()
-    app.window.mainloop()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Library management system")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print per-phase start-up times and exit once the schema check is done")
+    parser.add_argument('--max-first-frame-ms', type=float,
+                        help="with --profile-startup, exit 1 if the first frame took longer")
+    args = parser.parse_args()
+
+    profile = StartupProfile() if args.profile_startup or args.max_first_frame_ms else None
+    app = LibraryApp(profile)
+    if profile is not None:
+        app.window.after_idle(app.window.quit)
+    app.window.mainloop()
+    app.executor.shutdown()
+
+    if profile is not None:
+        print(profile.report())
+        first_frame = profile.since_start_ms('first frame')
+        if args.max_first_frame_ms and first_frame > args.max_first_frame_ms:
+            print(f"First frame took {first_frame:.1f} ms (limit {args.max_first_frame_ms:.1f} ms)")
+            sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,74 @@
+import os
+import threading
+
+
+def _hash(secret: bytes, rounds: int) -> bytes:
+    import bcrypt
+    return bcrypt.hashpw(secret, bcrypt.gensalt(rounds))
+
+def _check(secret: bytes, hashed: bytes) -> bool:
+    import bcrypt
+    return bcrypt.checkpw(secret, hashed)
+
+
+def hash_cost(hashed: bytes) -> int:
+    """Return the work factor encoded in a bcrypt hash ($2b$<cost>$...)"""
+    return int(hashed.split(b'$')[2])
+
+
+class PasswordHasher:
+    """bcrypt hashing backed by a process pool.
+
+    With workers=0 hashing runs inline on the calling thread. Otherwise a
+    pool of that many processes is started on first use, so concurrent
+    logins use every core while callers only wait on a future.
+    """
+
+    def __init__(self, pepper: bytes, rounds: int = 12, workers: int = None):
+        self.pepper = pepper
+        self.rounds = rounds
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # Imported here: multiprocessing is a noticeable share of start-up
+                    import multiprocessing
+                    from concurrent.futures import ProcessPoolExecutor
+                    # spawn, not fork: the GUI and service processes are multi-threaded
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        return self._pool().submit(fn, *args).result()
+
+    def hash(self, password: str) -> bytes:
+        return self._run(_hash, password.encode() + self.pepper, self.rounds)
+
+    def verify(self, password: str, hashed: bytes) -> bool:
+        return self._run(_check, password.encode() + self.pepper, _as_bytes(hashed))
+
+    def needs_rehash(self, hashed: bytes) -> bool:
+        """True if hashed was made with a different work factor than the current one"""
+        try:
+            return hash_cost(_as_bytes(hashed)) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+def _as_bytes(hashed) -> bytes:
+    return hashed.encode() if isinstance(hashed, str) else hashed
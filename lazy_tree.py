@@ -0,0 +1,256 @@
+import logging
+
+
+class TreeReconciler:
+    """Keeps a ttk.Treeview in step with a list of rows using as few Tk calls as possible.
+
+    Items are keyed by iid = str(key(row)) and the last rendered values are
+    remembered in Python, so sync() only touches rows that were added,
+    changed or removed. Selection and scroll position survive a sync.
+    """
+
+    def __init__(self, tree, key=lambda row: row[0]):
+        self.tree = tree
+        self.key = key
+        self.rows = {}
+
+    def iid(self, row):
+        return str(self.key(row))
+
+    def sync(self, rows):
+        """Make the tree show exactly rows, in order"""
+        wanted = {}
+        for row in rows:
+            wanted[self.iid(row)] = tuple(row)
+        stale = [iid for iid in self.rows if iid not in wanted]
+        if stale:
+            self.tree.delete(*stale)
+            for iid in stale:
+                del self.rows[iid]
+        # After the deletes the tree holds only wanted rows; kept in step here
+        # so an item is moved only when it is not already at its index
+        order = [iid for iid in self.tree.get_children() if iid in self.rows]
+        for index, (iid, values) in enumerate(wanted.items()):
+            current = self.rows.get(iid)
+            if current is None:
+                self.tree.insert('', index, iid=iid, values=values)
+                order.insert(index, iid)
+            else:
+                if current != values:
+                    self.tree.item(iid, values=values)
+                if index >= len(order) or order[index] != iid:
+                    self.tree.move(iid, '', index)
+                    order.remove(iid)
+                    order.insert(index, iid)
+            self.rows[iid] = values
+
+    def insert(self, rows, index='end'):
+        """Insert new rows at index without diffing"""
+        for offset, row in enumerate(rows):
+            iid = self.iid(row)
+            position = index if index == 'end' else index + offset
+            self.tree.insert('', position, iid=iid, values=tuple(row))
+            self.rows[iid] = tuple(row)
+
+    def remove(self, iids):
+        if iids:
+            self.tree.delete(*iids)
+            for iid in iids:
+                self.rows.pop(iid, None)
+
+    def clear(self):
+        self.remove(list(self.rows))
+
+
+class LazyTreeLoader:
+    """Feeds a ttk.Treeview one keyset page at a time as the user scrolls.
+
+    fetch_page(after_book_id=..., before_book_id=..., limit=...) must return
+    rows whose first value is the ordering key. At most max_rows rows are
+    kept in the tree; pages that scroll far out of view are dropped and
+    fetched again if the user scrolls back. Given a DBExecutor, pages and
+    counts are read on its workers and applied when they arrive, so the
+    Tk thread never waits on the database.
+    """
+
+    def __init__(self, tree, fetch_page, count_rows=None, scrollbar=None,
+                 count_label=None, page_size=200, max_rows=2000, threshold=0.1,
+                 executor=None):
+        self.tree = tree
+        self.executor = executor
+        self.view = TreeReconciler(tree)
+        self.fetch_page = fetch_page
+        self.count_rows = count_rows
+        self.scrollbar = scrollbar
+        self.count_label = count_label
+        self.page_size = page_size
+        self.max_rows = max(max_rows, page_size * 2)
+        self.threshold = threshold
+
+        self.total = 0
+        self._first_key = None
+        self._last_key = None
+        self._more_before = False
+        self._more_after = False
+        self._pending = False
+        self._static = False
+        # Bumped by every reset/refresh/show_rows so late page reads are dropped
+        self._generation = 0
+
+        tree.configure(yscrollcommand=self._on_scroll)
+
+    def reset(self):
+        """Drop every row and load the first page"""
+        if not self.tree.winfo_exists():
+            return
+        generation = self._begin()
+
+        def apply(rows):
+            if self._current(generation):
+                self._static = False
+                self.view.clear()
+                self._first_key = self._last_key = None
+                self._more_before = False
+                self._append(rows)
+
+        self._fetch(apply, after_book_id=None, limit=self.page_size)
+        self._update_count()
+
+    def refresh(self):
+        """Re-read the rows currently loaded and apply only what changed"""
+        if not self.tree.winfo_exists():
+            return
+        if self._static or self._first_key is None:
+            self.reset()
+            return
+        generation = self._begin()
+        first_key, last_key = self._first_key, self._last_key
+        more_after = self._more_after
+        limit = len(self.view.rows) + self.page_size
+
+        def apply(rows):
+            if not self._current(generation):
+                return
+            if more_after:
+                rows = [row for row in rows if row[0] <= last_key]
+            else:
+                # A full read means more rows were added past it than one page
+                self._more_after = len(rows) >= limit or len(rows) > self.max_rows
+                rows = rows[:self.max_rows]
+            self.view.sync(rows)
+            if rows:
+                self._first_key, self._last_key = rows[0][0], rows[-1][0]
+
+        self._fetch(apply, after_book_id=first_key - 1, limit=limit)
+        self._update_count()
+
+    def show_rows(self, rows, label=None):
+        """Show a fixed result set (e.g. search hits) and stop paging"""
+        if not self.tree.winfo_exists():
+            return
+        self._begin()
+        self._static = True
+        self.view.sync(rows)
+        if self.count_label is not None:
+            self.count_label.configure(text=label or f"{len(rows)} results")
+
+    def _begin(self):
+        # Pages still in flight now belong to an older view of the tree
+        self._generation += 1
+        self._pending = False
+        return self._generation
+
+    def _current(self, generation):
+        return generation == self._generation and self.tree.winfo_exists()
+
+    def _fetch(self, apply, **kwargs):
+        """fetch_page(**kwargs), handed to apply on the Tk thread"""
+        if self.executor is None:
+            apply(self.fetch_page(**kwargs))
+            return
+        self.executor.submit(self.fetch_page, on_success=apply, on_error=self._failed,
+                             key=(id(self), 'rows'), **kwargs)
+
+    def _failed(self, error):
+        self._pending = False
+        logging.error("Loading books failed: %s", error)
+
+    def _append(self, rows):
+        self.view.insert(rows)
+        if rows:
+            if self._first_key is None:
+                self._first_key = rows[0][0]
+            self._last_key = rows[-1][0]
+        self._more_after = len(rows) == self.page_size
+        self._trim('top')
+
+    def _prepend(self, rows):
+        self.view.insert(rows, index=0)
+        if rows:
+            self._first_key = rows[0][0]
+        self._more_before = len(rows) == self.page_size
+        self._trim('bottom')
+
+    def _trim(self, side):
+        children = self.tree.get_children()
+        excess = len(children) - self.max_rows
+        if excess <= 0:
+            return
+        first, _ = self.tree.yview()
+        top_index = int(first * len(children))
+        if side == 'top':
+            self.view.remove(children[:excess])
+            self._first_key = self.view.rows[children[excess]][0]
+            self._more_before = True
+            top_index -= excess
+        else:
+            self.view.remove(children[-excess:])
+            self._last_key = self.view.rows[children[-excess - 1]][0]
+            self._more_after = True
+        # Keep the same rows on screen after removing rows above them
+        self.tree.yview_moveto(max(top_index, 0) / self.max_rows)
+
+    def _on_scroll(self, first, last):
+        if self.scrollbar is not None:
+            self.scrollbar.set(first, last)
+        if self._static or self._pending:
+            return
+        near_end = float(last) >= 1 - self.threshold and self._more_after
+        near_start = float(first) <= self.threshold and self._more_before
+        if near_end or near_start:
+            self._pending = True
+            self.tree.after_idle(self._load_more, near_end)
+
+    def _load_more(self, forward):
+        if not self.tree.winfo_exists():
+            self._pending = False
+            return
+        generation = self._generation
+
+        def apply(rows):
+            if not self._current(generation):
+                return
+            self._pending = False
+            if forward:
+                self._append(rows)
+            else:
+                self._prepend(rows)
+
+        if forward:
+            self._fetch(apply, after_book_id=self._last_key, limit=self.page_size)
+        else:
+            self._fetch(apply, before_book_id=self._first_key, limit=self.page_size)
+
+    def _update_count(self):
+        if self.count_rows is None:
+            self._show_count()
+        elif self.executor is None:
+            self._show_count(self.count_rows())
+        else:
+            self.executor.submit(self.count_rows, on_success=self._show_count, key=(id(self), 'count'))
+
+    def _show_count(self, total=None):
+        if total is not None:
+            self.total = total
+        if self.count_label is not None and self.tree.winfo_exists():
+            self.count_label.configure(text=f"{self.total} books")
@@ -0,0 +1,374 @@
+"""HTTP/JSON front end for the library database, built on asyncio streams.
+
+    python library_service.py --port 8080
+
+Handlers call async_database: reads and bcrypt run on its bounded pool of
+reader threads, and every write goes through its single writer, which
+commits whatever queued up meanwhile as one transaction (group commit).
+Users authenticate with the session token from POST /login
+(Authorization: Bearer ...); admin routes use HTTP Basic auth with
+ADMIN_USER/ADMIN_PASS.
+"""
+import os
+import re
+import hmac
+import json
+import base64
+import signal
+import asyncio
+import logging
+import sqlite3
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+
+import database
+import async_database as adb
+from sessions import SESSION_SWEEP_INTERVAL
+
+
+MAX_BODY          = 64 * 1024
+MAX_HEADERS       = 100
+PAGE_LIMIT        = 500
+
+BOOK_KEYS = ('book_id', 'title', 'author', 'status', 'book_type', 'genre_or_subject', 'borrower')
+
+
+def _limit(query, default):
+    """The limit query parameter, clamped to 1..PAGE_LIMIT (SQLite reads LIMIT -1 as no limit)"""
+    return max(1, min(int(query.get('limit', default)), PAGE_LIMIT))
+
+def _offset(query):
+    offset = int(query.get('offset', 0))
+    if offset < 0:
+        raise HTTPError(400, 'Offset must not be negative')
+    return offset
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message=None):
+        super().__init__(message or HTTPStatus(status).phrase)
+        self.status = status
+
+
+class LibraryService:
+    """Routes HTTP requests to database.py operations"""
+
+    def __init__(self):
+        self.routes = [
+            ('GET', r'/books', self.list_books),
+            ('GET', r'/books/count', self.count_books),
+            ('GET', r'/books/search', self.search_books),
+            ('GET', r'/books/by-author', self.books_by_author),
+            ('POST', r'/books', self.add_book),
+            ('DELETE', r'/books/(\d+)', self.delete_book),
+            ('POST', r'/books/(\d+)/borrow', self.borrow_book),
+            ('POST', r'/books/(\d+)/return', self.return_book),
+            ('POST', r'/users', self.sign_up),
+            ('GET', r'/users', self.list_users),
+            ('DELETE', r'/users/(\d+)', self.delete_user),
+            ('POST', r'/login', self.login),
+            ('POST', r'/logout', self.logout),
+            ('GET', r'/stats', self.stats),
+            ('GET', r'/titles/(\d+)', self.get_title),
+            ('POST', r'/titles/(\d+)/holds', self.place_hold),
+            ('GET', r'/holds', self.list_holds),
+            ('DELETE', r'/holds/(\d+)', self.cancel_hold),
+            ('GET', r'/overdue', self.overdue),
+            ('GET', r'/loans/top', self.top_loans),
+            ('GET', r'/loans/daily', self.daily_loans),
+        ]
+        self.routes = [(method, re.compile(pattern + '$'), handler) for method, pattern, handler in self.routes]
+
+    # -- request handling --------------------------------------------------
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, query, headers, body = request
+                status, payload = await self.dispatch(method, path, query, headers, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f'HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n'
+                    f'Content-Type: application/json\r\n'
+                    f'Content-Length: {len(data)}\r\n'
+                    f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except HTTPError as e:
+            data = json.dumps({'error': str(e)}).encode()
+            writer.write(f'HTTP/1.1 {e.status} {HTTPStatus(e.status).phrase}\r\n'
+                         f'Content-Length: {len(data)}\r\nConnection: close\r\n\r\n'.encode() + data)
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode('latin-1').split()
+        except ValueError:
+            raise HTTPError(400, 'Malformed request line')
+        headers = {}
+        for _ in range(MAX_HEADERS):
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HTTPError(431)
+        try:
+            length = int(headers.get('content-length', '0'))
+        except ValueError:
+            raise HTTPError(400, 'Bad Content-Length')
+        if length > MAX_BODY:
+            raise HTTPError(413)
+        body = await reader.readexactly(length) if length else b''
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        return method.upper(), url.path.rstrip('/') or '/', query, headers, body
+
+    async def dispatch(self, method, path, query, headers, body):
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if not match:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            try:
+                data = json.loads(body) if body else {}
+                result = await handler(*match.groups(), query=query, headers=headers, data=data)
+                return (201 if method == 'POST' and path in ('/books', '/users') else 200), result
+            except HTTPError as e:
+                return e.status, {'error': str(e)}
+            except (ValueError, KeyError, TypeError) as e:
+                return 400, {'error': f'Bad request: {e}'}
+            except sqlite3.Error as e:
+                logging.error("Service database error on %s %s: %s", method, path, e)
+                return 500, {'error': 'Database error'}
+        if allowed:
+            return 405, {'error': 'Method not allowed'}
+        return 404, {'error': 'Not found'}
+
+    # -- authentication ----------------------------------------------------
+
+    async def current_user(self, headers):
+        scheme, _, token = headers.get('authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            raise HTTPError(401, 'Session token required')
+        user = await adb.validate_session(token.strip())
+        if user is None:
+            raise HTTPError(401, 'Invalid or expired session')
+        return user
+
+    def require_admin(self, headers):
+        scheme, _, credentials = headers.get('authorization', '').partition(' ')
+        if scheme.lower() == 'basic':
+            try:
+                username, _, password = base64.b64decode(credentials).decode().partition(':')
+            except (ValueError, UnicodeDecodeError):
+                username = password = ''
+            if (database.ADMIN_USER and hmac.compare_digest(username, database.ADMIN_USER)
+                    and hmac.compare_digest(password, database.ADMIN_PASS or '')):
+                return
+        raise HTTPError(401, 'Admin credentials required')
+
+    # -- routes --------------------------------------------------------------
+
+    async def list_books(self, query, **_):
+        limit = _limit(query, 50)
+        after = int(query['after']) if 'after' in query else None
+        before = int(query['before']) if 'before' in query and after is None else None
+        if after is None and before is None:
+            after = 0
+        rows = await adb.get_books(after, limit, before, True)
+        books = [dict(zip(BOOK_KEYS, row)) for row in rows]
+        return {
+            'books': books,
+            'next': books[-1]['book_id'] if len(books) == limit else None,
+            'previous': books[0]['book_id'] if books else None,
+        }
+
+    async def count_books(self, **_):
+        return {'count': await adb.count_books()}
+
+    async def search_books(self, query, **_):
+        rows = await adb.search_books(query.get('q', ''), _limit(query, 50), _offset(query))
+        return {'books': [dict(zip(BOOK_KEYS, row)) for row in rows]}
+
+    async def books_by_author(self, query, **_):
+        rows = await adb.get_books_by_author(query.get('author', ''))
+        return {'books': [dict(zip(BOOK_KEYS, row)) for row in rows]}
+
+    async def add_book(self, headers, data, **_):
+        self.require_admin(headers)
+        title, author = data['title'].strip(), data['author'].strip()
+        if not title or not author:
+            raise HTTPError(400, 'Title and author are required')
+        ok = await adb.add_book(title, author, data.get('book_type', 'fiction'), data.get('genre_or_subject'))
+        if not ok:
+            raise HTTPError(500, 'Could not add book')
+        return {'added': True}
+
+    async def delete_book(self, book_id, headers, **_):
+        self.require_admin(headers)
+        if not await adb.delete_book(int(book_id)):
+            raise HTTPError(404, 'No such book')
+        return {'deleted': int(book_id)}
+
+    async def borrow_book(self, book_id, headers, **_):
+        user = await self.current_user(headers)
+        if not await adb.borrow_book(user, int(book_id)):
+            raise HTTPError(409, 'Book is not available')
+        return {'borrowed': int(book_id)}
+
+    async def return_book(self, book_id, headers, **_):
+        user = await self.current_user(headers)
+        if not await adb.return_book(user['user_id'], int(book_id)):
+            raise HTTPError(409, 'Book is not borrowed by this user')
+        return {'returned': int(book_id)}
+
+    async def get_title(self, title_id, **_):
+        title = await adb.get_title(int(title_id))
+        if title is None:
+            raise HTTPError(404, 'No such title')
+        return title
+
+    async def place_hold(self, title_id, headers, **_):
+        user = await self.current_user(headers)
+        hold = await adb.place_hold(user, int(title_id))
+        if hold is None:
+            raise HTTPError(409, 'No such title or already waiting for it')
+        return hold
+
+    async def list_holds(self, headers, **_):
+        user = await self.current_user(headers)
+        rows = await adb.get_user_holds(user['user_id'])
+        keys = ('hold_id', 'title_id', 'title', 'author', 'status', 'book_id', 'created_at', 'position')
+        return {'holds': [dict(zip(keys, row)) for row in rows]}
+
+    async def cancel_hold(self, hold_id, headers, **_):
+        user = await self.current_user(headers)
+        if not await adb.cancel_hold(user['user_id'], int(hold_id)):
+            raise HTTPError(409, 'No waiting hold with that ID')
+        return {'cancelled': int(hold_id)}
+
+    async def sign_up(self, data, **_):
+        username, password, email = data['username'], data['password'], data['email']
+        if not database.validate_password(password):
+            raise HTTPError(400, 'Password must be at least 8 characters with an uppercase letter')
+        if not await adb.sign_up(username, password, email):
+            raise HTTPError(409, 'Username taken or invalid email')
+        return {'username': username}
+
+    async def login(self, data, **_):
+        user = await adb.login(data['username'], data['password'])
+        if user is None:
+            raise HTTPError(401, 'Invalid username or password')
+        return user
+
+    async def logout(self, headers, **_):
+        scheme, _, token = headers.get('authorization', '').partition(' ')
+        if scheme.lower() != 'bearer':
+            raise HTTPError(401, 'Session token required')
+        return {'revoked': await adb.revoke_session(token.strip())}
+
+    async def list_users(self, headers, **_):
+        self.require_admin(headers)
+        rows = await adb.get_all_users()
+        return {'users': [dict(zip(('user_id', 'username', 'email'), row)) for row in rows]}
+
+    async def delete_user(self, user_id, headers, **_):
+        self.require_admin(headers)
+        if not await adb.delete_user(int(user_id)):
+            raise HTTPError(500, 'Could not delete user')
+        return {'deleted': int(user_id)}
+
+    async def stats(self, headers, **_):
+        self.require_admin(headers)
+        return {
+            'pool': adb.get_pool_stats(),
+            'cache': adb.get_cache_stats(),
+            'writer': adb.writer().stats(),
+            'books': await adb.get_book_counts(),
+        }
+
+    async def overdue(self, headers, **_):
+        self.require_admin(headers)
+        report = await adb.get_overdue_report()
+        keys = ('book_id', 'title', 'author', 'due_date', 'days_overdue')
+        return {'users': [dict(entry, items=[dict(zip(keys, item)) for item in entry['items']])
+                          for entry in report]}
+
+    async def top_loans(self, headers, query, **_):
+        self.require_admin(headers)
+        rows = await adb.get_most_borrowed(query.get('month'), _limit(query, 10))
+        return {'books': [dict(zip(('book_id', 'title', 'author', 'loans'), row)) for row in rows]}
+
+    async def daily_loans(self, headers, query, **_):
+        self.require_admin(headers)
+        rows = await adb.get_daily_loan_totals(int(query.get('days', 30)))
+        return {'days': [dict(zip(('day', 'borrows', 'returns'), row)) for row in rows]}
+
+
+async def sweep_sessions_every(interval):
+    """Sweep expired and revoked sessions every interval seconds until cancelled"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await adb.sweep_sessions()
+        except sqlite3.Error as e:
+            logging.error("Session sweep failed: %s", e)
+
+
+async def serve(host='127.0.0.1', port=8080, ready=None):
+    """Run the service until cancelled or interrupted; ready(port) is called once listening"""
+    await adb.create_database()
+    if database.DB_REPLICA:
+        database.enable_replica()
+    service = LibraryService()
+    server = await asyncio.start_server(service.handle, host, port, limit=MAX_BODY)
+    bound = server.sockets[0].getsockname()[1]
+    logging.info("Library service listening on %s:%s", host, bound)
+    if ready is not None:
+        ready(bound)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    sweeper = None
+    if SESSION_SWEEP_INTERVAL:
+        sweeper = asyncio.create_task(sweep_sessions_every(SESSION_SWEEP_INTERVAL))
+    async with server:
+        await stop.wait()
+    if sweeper is not None:
+        sweeper.cancel()
+    await adb.close()
+    database.disable_replica()
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Library HTTP/JSON service')
+    parser.add_argument('--host', default=os.getenv('SERVICE_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('SERVICE_PORT', '8080')))
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
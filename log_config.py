@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class TextFormatter(logging.Formatter):
+    """The classic library.log line, noting how many similar records were dropped"""
+
+    def format(self, record):
+        line = super().format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            line += f' [{suppressed} similar messages suppressed]'
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; extra= fields become top-level keys"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Pass at most burst records per message template each interval.
+
+    Past the burst one record in sample still gets through (0 drops them
+    all); the next record let through carries the number suppressed.
+    Templates are the unformatted %-style messages, so "Book %s is not
+    available" counts as one event whatever the book.
+    """
+
+    def __init__(self, burst=20, interval=1.0, sample=0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.sample = sample
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.CRITICAL:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                window = self._windows[key] = [now, 0, window[2] if window else 0]
+            window[1] += 1
+            over = window[1] - self.burst
+            if over > 0 and not (self.sample and over % self.sample == 0):
+                window[2] += 1
+                return False
+            if window[2]:
+                record.suppressed, window[2] = window[2], 0
+        return True
+
+
+class _LazyQueueHandler(QueueHandler):
+    """Hands records to the listener without formatting them on the caller's thread"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The queue never leaves the process, so the record can travel as is
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener = None
+
+
+def configure_logging(path=None, level=None, json_format=None, console=True):
+    """Route the root logger through a queue to a background writer thread.
+
+    Settings not given come from LOG_FILE, LOG_LEVEL, LOG_JSON,
+    LOG_MAX_BYTES, LOG_BACKUPS, LOG_QUEUE_SIZE, LOG_RATE_LIMIT and
+    LOG_SAMPLE. Like basicConfig this does nothing if the root logger
+    already has handlers; returns the listener (or None).
+    """
+    global _listener
+    root = logging.getLogger()
+    if root.handlers:
+        return _listener
+
+    path = path or os.getenv('LOG_FILE', 'library.log')
+    level = level or os.getenv('LOG_LEVEL', 'INFO').upper()
+    if json_format is None:
+        json_format = os.getenv('LOG_JSON', '0') not in ('0', 'false', 'off')
+
+    formatter = JsonFormatter() if json_format else TextFormatter(TEXT_FORMAT)
+    handlers = [RotatingFileHandler(
+        path,
+        maxBytes=int(os.getenv('LOG_MAX_BYTES', str(5 * 1024 * 1024))),
+        backupCount=int(os.getenv('LOG_BACKUPS', '5')),
+        encoding='utf-8',
+        delay=True,
+    )]
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(int(os.getenv('LOG_QUEUE_SIZE', '10000')))
+    queue_handler = _LazyQueueHandler(log_queue)
+    burst = int(os.getenv('LOG_RATE_LIMIT', '20'))
+    if burst:
+        queue_handler.addFilter(RateLimitFilter(burst, sample=int(os.getenv('LOG_SAMPLE', '0'))))
+
+    root.setLevel(level)
+    root.addHandler(queue_handler)
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
@@ -0,0 +1,545 @@
+import sys
+import logging
+import sqlite3
+from datetime import datetime
+
+
+def _create_books(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS books (
+            book_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            author TEXT NOT NULL,
+            status TEXT DEFAULT 'Available',
+            borrower_id INTEGER,
+            book_type TEXT DEFAULT 'fiction',
+            genre_or_subject TEXT,
+            FOREIGN KEY (borrower_id) REFERENCES users (user_id)
+        )
+    ''')
+
+def _create_users(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL UNIQUE,
+            password BLOB NOT NULL,
+            email TEXT NOT NULL
+        )
+    ''')
+
+def _create_indexes(cursor):
+    try:
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username ON users (username)')
+    except sqlite3.IntegrityError:
+        # Older databases may already hold duplicate usernames; still index the lookup
+        logging.warning("Duplicate usernames found, creating non-unique username index")
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_username ON users (username)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_books_title_author ON books (title, author)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_books_borrower_id ON books (borrower_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_books_status ON books (status)')
+
+def _create_books_fts(cursor):
+    # External-content index over books; prefix indexes keep "tolk*" queries cheap
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+            title, author, genre_or_subject,
+            content='books', content_rowid='book_id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+            INSERT INTO books_fts (rowid, title, author, genre_or_subject)
+            VALUES (new.book_id, new.title, new.author, new.genre_or_subject);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+            INSERT INTO books_fts (books_fts, rowid, title, author, genre_or_subject)
+            VALUES ('delete', old.book_id, old.title, old.author, old.genre_or_subject);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_fts_au
+        AFTER UPDATE OF title, author, genre_or_subject ON books BEGIN
+            INSERT INTO books_fts (books_fts, rowid, title, author, genre_or_subject)
+            VALUES ('delete', old.book_id, old.title, old.author, old.genre_or_subject);
+            INSERT INTO books_fts (rowid, title, author, genre_or_subject)
+            VALUES (new.book_id, new.title, new.author, new.genre_or_subject);
+        END
+    ''')
+    cursor.execute("INSERT INTO books_fts (books_fts) VALUES ('rebuild')")
+
+def _create_sessions(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            revoked INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_user_id ON sessions (user_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)')
+
+def _create_loans(cursor):
+    # One row per loan, never deleted; a return only fills in returned_at
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS loans (
+            loan_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            book_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            borrowed_at REAL NOT NULL,
+            returned_at REAL,
+            FOREIGN KEY (book_id) REFERENCES books (book_id),
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_loans_book ON loans (book_id, borrowed_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_loans_user ON loans (user_id, borrowed_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_loans_borrowed_at ON loans (borrowed_at)')
+    # At most one open loan per book; also the index a return uses to close it
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_loans_open_book
+        ON loans (book_id) WHERE returned_at IS NULL
+    ''')
+
+    # Summaries kept current by the triggers below, so statistics are key lookups
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS book_loan_stats (
+            book_id INTEGER PRIMARY KEY,
+            loans INTEGER NOT NULL DEFAULT 0,
+            last_borrowed_at REAL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_loan_stats (
+            user_id INTEGER PRIMARY KEY,
+            loans INTEGER NOT NULL DEFAULT 0,
+            active_loans INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_loan_stats (
+            day TEXT PRIMARY KEY,
+            borrows INTEGER NOT NULL DEFAULT 0,
+            returns INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS monthly_book_loans (
+            month TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            loans INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, book_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_monthly_book_loans_rank ON monthly_book_loans (month, loans)')
+
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS loans_ai AFTER INSERT ON loans BEGIN
+            INSERT INTO book_loan_stats (book_id, loans, last_borrowed_at)
+            VALUES (new.book_id, 1, new.borrowed_at)
+            ON CONFLICT (book_id) DO UPDATE SET loans = loans + 1,
+                last_borrowed_at = MAX(COALESCE(last_borrowed_at, 0), excluded.last_borrowed_at);
+            INSERT INTO user_loan_stats (user_id, loans, active_loans)
+            VALUES (new.user_id, 1, new.returned_at IS NULL)
+            ON CONFLICT (user_id) DO UPDATE SET loans = loans + 1,
+                active_loans = active_loans + excluded.active_loans;
+            INSERT INTO daily_loan_stats (day, borrows)
+            VALUES (date(new.borrowed_at, 'unixepoch'), 1)
+            ON CONFLICT (day) DO UPDATE SET borrows = borrows + 1;
+            INSERT INTO monthly_book_loans (month, book_id, loans)
+            VALUES (strftime('%Y-%m', new.borrowed_at, 'unixepoch'), new.book_id, 1)
+            ON CONFLICT (month, book_id) DO UPDATE SET loans = loans + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS loans_returned
+        AFTER UPDATE OF returned_at ON loans
+        WHEN old.returned_at IS NULL AND new.returned_at IS NOT NULL BEGIN
+            UPDATE user_loan_stats SET active_loans = active_loans - 1 WHERE user_id = new.user_id;
+            INSERT INTO daily_loan_stats (day, returns)
+            VALUES (date(new.returned_at, 'unixepoch'), 1)
+            ON CONFLICT (day) DO UPDATE SET returns = returns + 1;
+        END
+    ''')
+
+    # Books already out when history starts get an open loan from today
+    cursor.execute('''
+        INSERT INTO loans (book_id, user_id, borrowed_at)
+        SELECT book_id, borrower_id, CAST(strftime('%s', 'now') AS REAL) FROM books
+        WHERE status = 'Borrowed' AND borrower_id IS NOT NULL
+          AND book_id NOT IN (SELECT book_id FROM loans WHERE returned_at IS NULL)
+    ''')
+
+
+# (dimension, column) pairs counted in book_counts
+BOOK_COUNT_COLUMNS = (('status', 'status'), ('book_type', 'book_type'), ('genre', 'genre_or_subject'))
+
+# book_counts recomputed from books: used to backfill and to check for drift
+BOOK_COUNTS_SQL = ' UNION ALL '.join(
+    ["SELECT 'total', '', COUNT(*) FROM books"]
+    + [f"SELECT '{dimension}', COALESCE({column}, ''), COUNT(*) FROM books GROUP BY 1, 2"
+       for dimension, column in BOOK_COUNT_COLUMNS]
+)
+
+def _book_count_change(dimension, value, delta, when='1'):
+    return f'''
+            INSERT INTO book_counts (dimension, value, count)
+            SELECT '{dimension}', COALESCE({value}, ''), {delta} WHERE {when}
+            ON CONFLICT (dimension, value) DO UPDATE SET count = count + excluded.count;'''
+
+def _create_book_counts(cursor):
+    # Catalog totals by status, type and genre, so the dashboard never scans books
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS book_counts (
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dimension, value)
+        ) WITHOUT ROWID
+    ''')
+    insert = _book_count_change('total', "''", 1)
+    delete = _book_count_change('total', "''", -1)
+    update = ''
+    for dimension, column in BOOK_COUNT_COLUMNS:
+        insert += _book_count_change(dimension, f'new.{column}', 1)
+        delete += _book_count_change(dimension, f'old.{column}', -1)
+        changed = f'old.{column} IS NOT new.{column}'
+        update += (_book_count_change(dimension, f'old.{column}', -1, changed)
+                   + _book_count_change(dimension, f'new.{column}', 1, changed))
+    cursor.execute(f'CREATE TRIGGER IF NOT EXISTS book_counts_ai AFTER INSERT ON books BEGIN{insert}\n        END')
+    cursor.execute(f'CREATE TRIGGER IF NOT EXISTS book_counts_ad AFTER DELETE ON books BEGIN{delete}\n        END')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS book_counts_au
+        AFTER UPDATE OF status, book_type, genre_or_subject ON books BEGIN{update}
+        END''')
+    cursor.execute('DELETE FROM book_counts')
+    cursor.execute(f'INSERT INTO book_counts (dimension, value, count) {BOOK_COUNTS_SQL}')
+
+def _create_titles_and_holds(cursor):
+    # books rows stay the physical copies; a title groups the copies of one work
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS titles (
+            title_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            author TEXT NOT NULL,
+            UNIQUE (title, author)
+        )
+    ''')
+    columns = [row[1] for row in cursor.execute('PRAGMA table_info(books)')]
+    if 'title_id' not in columns:
+        cursor.execute('ALTER TABLE books ADD COLUMN title_id INTEGER REFERENCES titles (title_id)')
+    cursor.execute('''
+        INSERT OR IGNORE INTO titles (title, author)
+        SELECT title, author FROM books GROUP BY title, author ORDER BY MIN(book_id)
+    ''')
+    cursor.execute('''
+        UPDATE books SET title_id = (
+            SELECT title_id FROM titles t WHERE t.title = books.title AND t.author = books.author
+        ) WHERE title_id IS NULL
+    ''')
+    # Finds a free copy of a title without looking at the borrowed ones
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_books_title_status ON books (title_id, status)')
+    # Copies inserted without a title_id (add_book, bulk loads) are filed under their title
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_title_ai AFTER INSERT ON books
+        WHEN new.title_id IS NULL BEGIN
+            INSERT INTO titles (title, author) SELECT new.title, new.author
+            WHERE NOT EXISTS (SELECT 1 FROM titles WHERE title = new.title AND author = new.author);
+            UPDATE books SET title_id = (
+                SELECT title_id FROM titles WHERE title = new.title AND author = new.author
+            ) WHERE book_id = new.book_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_title_au AFTER UPDATE OF title, author ON books BEGIN
+            INSERT INTO titles (title, author) SELECT new.title, new.author
+            WHERE NOT EXISTS (SELECT 1 FROM titles WHERE title = new.title AND author = new.author);
+            UPDATE books SET title_id = (
+                SELECT title_id FROM titles WHERE title = new.title AND author = new.author
+            ) WHERE book_id = new.book_id;
+        END
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS holds (
+            hold_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'Waiting',
+            book_id INTEGER,
+            created_at REAL NOT NULL,
+            fulfilled_at REAL,
+            FOREIGN KEY (title_id) REFERENCES titles (title_id),
+            FOREIGN KEY (user_id) REFERENCES users (user_id),
+            FOREIGN KEY (book_id) REFERENCES books (book_id)
+        )
+    ''')
+    # The queue: only waiting holds are indexed, in arrival order per title,
+    # so the next hold is one index seek however long the history grows
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_holds_queue
+        ON holds (title_id, hold_id) WHERE status = 'Waiting'
+    ''')
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_holds_waiting_user
+        ON holds (title_id, user_id) WHERE status = 'Waiting'
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_holds_user ON holds (user_id, hold_id)')
+
+def _add_due_dates(cursor):
+    books = [row[1] for row in cursor.execute('PRAGMA table_info(books)')]
+    if 'due_date' not in books:
+        cursor.execute('ALTER TABLE books ADD COLUMN borrowed_at REAL')
+        cursor.execute('ALTER TABLE books ADD COLUMN due_date REAL')
+    loans = [row[1] for row in cursor.execute('PRAGMA table_info(loans)')]
+    if 'due_at' not in loans:
+        cursor.execute('ALTER TABLE loans ADD COLUMN due_at REAL')
+        cursor.execute('ALTER TABLE loans ADD COLUMN overdue_at REAL')
+    # Loans already out get the usual loan period from when their history starts
+    from database import LOAN_DAYS
+    cursor.execute('''
+        UPDATE loans SET due_at = borrowed_at + ? * 86400
+        WHERE returned_at IS NULL AND due_at IS NULL
+    ''', (LOAN_DAYS,))
+    cursor.execute('''
+        UPDATE books SET (borrowed_at, due_date) = (
+            SELECT borrowed_at, due_at FROM loans l
+            WHERE l.book_id = books.book_id AND l.returned_at IS NULL
+        ) WHERE status = 'Borrowed'
+    ''')
+    # "What is overdue" is a range of this index
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_books_status_due ON books (status, due_date)')
+    # Only open loans the sweep has not handled yet are indexed, so each
+    # sweep reads just the newly overdue ones
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_loans_unswept
+        ON loans (due_at) WHERE returned_at IS NULL AND overdue_at IS NULL
+    ''')
+
+
+# Ordered (version, description, step). Steps must be idempotent so that a
+# database created before versioning existed can be upgraded in place.
+MIGRATIONS = [
+    (1, 'create books table', _create_books),
+    (2, 'create users table', _create_users),
+    (3, 'index hot lookups', _create_indexes),
+    (4, 'full-text catalog index', _create_books_fts),
+    (5, 'login sessions', _create_sessions),
+    (6, 'loan history and statistics', _create_loans),
+    (7, 'book counters', _create_book_counts),
+    (8, 'titles, copies and holds', _create_titles_and_holds),
+    (9, 'due dates', _add_due_dates),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn) -> int:
+    """Return the highest applied migration version (0 for a fresh database)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    ''')
+    row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+    return row[0] or 0
+
+def migrate(conn) -> int:
+    """Apply pending migrations in order, one transaction per step.
+
+    PRAGMA user_version mirrors the applied version and is read from the
+    file header, so an up-to-date database is confirmed without a write.
+    """
+    if conn.execute('PRAGMA user_version').fetchone()[0] == LATEST_VERSION:
+        return LATEST_VERSION
+    current = get_schema_version(conn)
+    conn.commit()
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            step(cursor)
+            cursor.execute(
+                'INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)',
+                (version, description, datetime.now().isoformat(timespec='seconds'))
+            )
+            cursor.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logging.error("Migration %s (%s) failed", version, description)
+            raise
+        logging.info("Applied migration %s: %s", version, description)
+        current = version
+    if conn.execute('PRAGMA user_version').fetchone()[0] != current:
+        # Databases migrated before user_version was kept in step
+        conn.execute(f'PRAGMA user_version = {current}')
+        conn.commit()
+    return current
+
+
+# Statements on hot paths, run as they are here by database.py, sessions.py
+# and overdue.py so check_query_plans sees exactly what the application runs
+LOGIN_SQL = 'SELECT user_id, username, password, email FROM users WHERE username = ?'
+SIGN_UP_SQL = 'SELECT 1 FROM users WHERE username = ?'
+BOOK_EXISTS_SQL = 'SELECT 1 FROM books WHERE title = ? AND author = ?'
+# Formatted with the columns, keyset WHERE, direction and LIMIT of a page
+BOOKS_PAGE_SQL = '''
+                SELECT {columns}
+                FROM books b
+                LEFT JOIN users u ON b.borrower_id = u.user_id
+                {where}
+                ORDER BY b.book_id {order}
+                {limit}
+            '''
+SEARCH_BOOKS_SQL = '''
+                SELECT b.book_id, b.title, b.author, b.status, b.book_type,
+                       b.genre_or_subject, u.username
+                FROM books_fts
+                JOIN books b ON b.book_id = books_fts.rowid
+                LEFT JOIN users u ON b.borrower_id = u.user_id
+                WHERE books_fts MATCH ?
+                ORDER BY bm25(books_fts)
+                LIMIT ? OFFSET ?
+            '''
+NEXT_HOLD_SQL = '''
+        SELECT h.hold_id, h.user_id FROM books b
+        JOIN holds h ON h.title_id = b.title_id AND h.status = 'Waiting'
+        WHERE b.book_id = ? AND b.status = 'Available'
+        ORDER BY h.hold_id LIMIT 1
+    '''
+FREE_COPY_SQL = "SELECT book_id FROM books WHERE title_id = ? AND status = 'Available' LIMIT 1"
+CLOSE_LOAN_SQL = 'UPDATE loans SET returned_at = ? WHERE book_id = ? AND returned_at IS NULL'
+CLOSE_USER_LOANS_SQL = 'UPDATE loans SET returned_at = ? WHERE user_id = ? AND returned_at IS NULL'
+RELEASE_USER_BOOKS_SQL = '''
+                UPDATE books
+                SET status = 'Available', borrower_id = NULL, borrowed_at = NULL, due_date = NULL
+                WHERE borrower_id = ?
+                RETURNING book_id
+            '''
+USER_HOLDS_SQL = '''
+                SELECT h.hold_id, h.title_id, t.title, t.author, h.status, h.book_id, h.created_at,
+                       CASE WHEN h.status = 'Waiting' THEN (
+                           SELECT COUNT(*) FROM holds q
+                           WHERE q.title_id = h.title_id AND q.status = 'Waiting' AND q.hold_id <= h.hold_id
+                       ) END
+                FROM holds h
+                JOIN titles t ON t.title_id = h.title_id
+                WHERE h.user_id = ?
+                ORDER BY h.hold_id DESC
+                LIMIT ?
+            '''
+# Formatted with the column filtered on, l.book_id or l.user_id
+LOAN_HISTORY_SQL = '''
+                SELECT l.loan_id, l.book_id, b.title, l.user_id, u.username, l.borrowed_at, l.returned_at
+                FROM loans l
+                LEFT JOIN books b ON b.book_id = l.book_id
+                LEFT JOIN users u ON u.user_id = l.user_id
+                WHERE {column} = ?
+                ORDER BY l.borrowed_at DESC
+                LIMIT ?
+            '''
+MOST_BORROWED_SQL = '''
+                SELECT m.book_id, b.title, b.author, m.loans
+                FROM monthly_book_loans m
+                LEFT JOIN books b ON b.book_id = m.book_id
+                WHERE m.month = ?
+                ORDER BY m.loans DESC
+                LIMIT ?
+            '''
+SESSION_USER_SQL = '''
+                SELECT u.user_id, u.username, u.email, s.expires_at
+                FROM sessions s JOIN users u ON u.user_id = s.user_id
+                WHERE s.session_id = ? AND s.revoked = 0
+            '''
+REVOKE_USER_SESSIONS_SQL = 'UPDATE sessions SET revoked = 1, expires_at = 0 WHERE user_id = ?'
+SWEEP_SESSIONS_SQL = '''
+                DELETE FROM sessions WHERE session_id IN (
+                    SELECT session_id FROM sessions
+                    WHERE expires_at <= ?
+                    LIMIT ?
+                )
+            '''
+OVERDUE_BOOKS_SQL = '''
+                SELECT b.borrower_id, u.username, u.email, b.book_id, b.title, b.author, b.due_date
+                FROM books b
+                JOIN users u ON u.user_id = b.borrower_id
+                WHERE b.status = 'Borrowed' AND b.due_date < ?
+                ORDER BY b.due_date
+            '''
+SWEEP_OVERDUE_SQL = '''
+                UPDATE loans SET overdue_at = ? WHERE loan_id IN (
+                    SELECT loan_id FROM loans
+                    WHERE returned_at IS NULL AND overdue_at IS NULL AND due_at < ?
+                    LIMIT ?
+                )
+            '''
+
+# Each of these must be answered with an index seek: (sql, sample parameters)
+HOT_QUERIES = {
+    'login': (LOGIN_SQL, ('x',)),
+    'sign_up': (SIGN_UP_SQL, ('x',)),
+    'book_exists': (BOOK_EXISTS_SQL, ('x', 'y')),
+    'books_page': (BOOKS_PAGE_SQL.format(columns='b.book_id, u.username', where='WHERE b.book_id > ?',
+                                         order='ASC', limit='LIMIT ?'), (1, 200)),
+    'search_books': (SEARCH_BOOKS_SQL, ('x*', 50, 0)),
+    'next_hold': (NEXT_HOLD_SQL, (1,)),
+    'free_copy': (FREE_COPY_SQL, (1,)),
+    'close_loan': (CLOSE_LOAN_SQL, (0, 1)),
+    'close_user_loans': (CLOSE_USER_LOANS_SQL, (0, 1)),
+    'delete_user': (RELEASE_USER_BOOKS_SQL, (1,)),
+    'user_holds': (USER_HOLDS_SQL, (1, 50)),
+    'loan_history': (LOAN_HISTORY_SQL.format(column='l.user_id'), (1, 50)),
+    'book_loan_history': (LOAN_HISTORY_SQL.format(column='l.book_id'), (1, 50)),
+    'most_borrowed': (MOST_BORROWED_SQL, ('2024-01', 10)),
+    'validate_session': (SESSION_USER_SQL, ('x',)),
+    'revoke_user_sessions': (REVOKE_USER_SESSIONS_SQL, (1,)),
+    'sweep_sessions': (SWEEP_SESSIONS_SQL, (0, 100)),
+    'overdue_books': (OVERDUE_BOOKS_SQL, (0,)),
+    'sweep_overdue': (SWEEP_OVERDUE_SQL, (0, 0, 500)),
+}
+
+def check_query_plans(conn) -> dict:
+    """Run EXPLAIN QUERY PLAN on HOT_QUERIES and return those that scan a table"""
+    failures = {}
+    for name, (sql, params) in HOT_QUERIES.items():
+        plan = conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+        # A virtual table "SCAN ... VIRTUAL TABLE INDEX" is the FTS index lookup itself
+        scans = [row[3] for row in plan
+                 if row[3].startswith('SCAN') and 'VIRTUAL TABLE INDEX' not in row[3]]
+        if scans:
+            failures[name] = scans
+    return failures
+
+
+if __name__ == "__main__":
+    from database import get_connection
+
+    with get_connection() as conn:
+        version = migrate(conn)
+        print(f"Schema version: {version}")
+        if '--check' in sys.argv:
+            failures = check_query_plans(conn)
+            for name, scans in failures.items():
+                print(f"FAIL {name}: {'; '.join(scans)}")
+            if failures:
+                sys.exit(1)
+            print(f"All {len(HOT_QUERIES)} hot queries use indexes")
+    if '--check-counts' in sys.argv:
+        from database import check_book_counts
+        drift = check_book_counts(repair='--repair' in sys.argv)
+        for dimension, value, stored, actual in drift:
+            print(f"DRIFT {dimension}={value!r}: stored {stored}, actual {actual}")
+        if drift:
+            sys.exit(1)
+        print("Book counters match the catalog")
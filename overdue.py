@@ -0,0 +1,118 @@
+"""Overdue loans: a chunked sweep and a per-user report.
+
+    python overdue.py                 # sweep, then print the report
+    python overdue.py --report-only
+    python overdue.py --every 900     # keep sweeping every 15 minutes
+
+The sweep flags each open loan past its due date once (loans.overdue_at).
+Every chunk is its own short transaction, with a pause before the next,
+so borrowing and returning carry on between chunks.
+"""
+import os
+import time
+import logging
+import sqlite3
+
+from database import get_connection, _begin_immediate
+from migrations import OVERDUE_BOOKS_SQL, SWEEP_OVERDUE_SQL
+
+
+SWEEP_CHUNK    = int(os.getenv('OVERDUE_SWEEP_CHUNK', '500'))
+SWEEP_PAUSE    = float(os.getenv('OVERDUE_SWEEP_PAUSE', '0.005'))
+SWEEP_INTERVAL = float(os.getenv('OVERDUE_SWEEP_INTERVAL', '0'))
+
+
+def sweep_overdue(now: float = None, chunk_size: int = SWEEP_CHUNK, pause: float = SWEEP_PAUSE) -> dict:
+    """Flag newly overdue loans chunk by chunk.
+
+    Flagged loans leave the partial index the chunks are read from, so
+    each chunk starts at the front again and a sweep never rereads work.
+    Returns {'flagged', 'chunks', 'seconds', 'max_lock_ms'}, the last
+    being the longest any chunk held the write lock.
+    """
+    now = time.time() if now is None else now
+    flagged = chunks = 0
+    longest = 0.0
+    started = time.perf_counter()
+    while True:
+        # No cached query reads overdue_at, so the query cache is left alone
+        with get_connection() as conn:
+            _begin_immediate(conn)
+            locked = time.perf_counter()
+            cursor = conn.execute(SWEEP_OVERDUE_SQL, (now, now, chunk_size))
+        longest = max(longest, time.perf_counter() - locked)
+        flagged += cursor.rowcount
+        chunks += 1
+        if cursor.rowcount < chunk_size:
+            break
+        if pause:
+            time.sleep(pause)
+    result = {'flagged': flagged, 'chunks': chunks,
+              'seconds': time.perf_counter() - started, 'max_lock_ms': longest * 1000}
+    logging.info("Overdue sweep flagged %s loans in %s chunks", flagged, chunks)
+    return result
+
+def get_overdue_report(now: float = None) -> list:
+    """Users with overdue books, most overdue first.
+
+    Each entry is {'user_id', 'username', 'email', 'items'} where items are
+    (book_id, title, author, due_date, days_overdue) oldest first.
+    """
+    now = time.time() if now is None else now
+    try:
+        with get_connection() as conn:
+            rows = conn.execute(OVERDUE_BOOKS_SQL, (now,)).fetchall()
+    except sqlite3.Error as e:
+        logging.error("Error building overdue report: %s", e)
+        return []
+    users = {}
+    for user_id, username, email, book_id, title, author, due_date in rows:
+        entry = users.setdefault(user_id, {'user_id': user_id, 'username': username, 'email': email, 'items': []})
+        entry['items'].append((book_id, title, author, due_date, int((now - due_date) // 86400)))
+    return sorted(users.values(), key=lambda entry: (-len(entry['items']), entry['items'][0][3]))
+
+def get_user_overdue(user_id: int, now: float = None) -> list:
+    """One user's overdue books: (book_id, title, author, due_date)"""
+    now = time.time() if now is None else now
+    try:
+        with get_connection() as conn:
+            return conn.execute('''
+                SELECT book_id, title, author, due_date FROM books
+                WHERE borrower_id = ? AND status = 'Borrowed' AND due_date < ?
+                ORDER BY due_date
+            ''', (user_id, now)).fetchall()
+    except sqlite3.Error as e:
+        logging.error("Error getting overdue books: %s", e)
+        return []
+
+def format_report(report: list, limit: int = None) -> str:
+    lines = []
+    for entry in report[:limit]:
+        lines.append(f"{entry['username']} <{entry['email']}>: {len(entry['items'])} overdue")
+        for book_id, title, author, due_date, days in entry['items']:
+            due = time.strftime('%Y-%m-%d', time.localtime(due_date))
+            lines.append(f"    #{book_id} {title} by {author}, due {due} ({days} days late)")
+    if limit is not None and len(report) > limit:
+        lines.append(f"... and {len(report) - limit} more users")
+    return '\n'.join(lines) or "Nothing is overdue"
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Sweep overdue loans and report them per user")
+    parser.add_argument('--report-only', action='store_true')
+    parser.add_argument('--chunk', type=int, default=SWEEP_CHUNK)
+    parser.add_argument('--pause', type=float, default=SWEEP_PAUSE)
+    parser.add_argument('--every', type=float, default=SWEEP_INTERVAL,
+                        help="repeat the sweep every this many seconds (0 runs once)")
+    parser.add_argument('--limit', type=int, default=50, help="users shown in the report")
+    args = parser.parse_args()
+
+    while not args.report_only:
+        result = sweep_overdue(chunk_size=args.chunk, pause=args.pause)
+        print(f"Flagged {result['flagged']} loans in {result['chunks']} chunks, "
+              f"{result['seconds']:.2f}s (longest lock {result['max_lock_ms']:.1f} ms)")
+        if not args.every:
+            break
+        time.sleep(args.every)
+    print(format_report(get_overdue_report(), args.limit))
@@ -0,0 +1,82 @@
+import threading
+from functools import wraps
+from collections import OrderedDict
+
+
+def _copy(result):
+    # Lists are copied so callers cannot change what is cached; anything else is returned as is
+    return list(result) if isinstance(result, list) else result
+
+
+class QueryCache:
+    """LRU cache for read queries, invalidated by a write generation counter.
+
+    Every write bumps the generation; an entry is only served while the
+    generation it was read under is still current, so a stale result can
+    never outlive the write that made it stale. Writes by other processes
+    are caught with version(), called on every lookup: an entry is only
+    served while it returns what it did when the entry was read, and a
+    lookup where it returns None is not cached at all.
+    """
+
+    def __init__(self, maxsize=256, enabled=True, namespace=None, version=None):
+        self.maxsize = maxsize
+        self.enabled = enabled
+        # Called per lookup when one process reads several databases
+        self.namespace = namespace
+        self.version = version
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def bump(self):
+        """Invalidate everything cached so far"""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def cached(self, fn):
+        """Decorate a read function whose result depends only on its arguments"""
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return fn(*args, **kwargs)
+            key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+            if self.namespace is not None:
+                key += (self.namespace(),)
+            version = None
+            if self.version is not None:
+                version = self.version()
+                if version is None:
+                    return fn(*args, **kwargs)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == self.generation and entry[1] == version:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return _copy(entry[2])
+                self.misses += 1
+                generation = self.generation
+            result = fn(*args, **kwargs)
+            # Empty results are not kept so a swallowed query error cannot stick
+            if result:
+                with self._lock:
+                    if generation == self.generation:
+                        self._entries[key] = (generation, version, _copy(result))
+                        while len(self._entries) > self.maxsize:
+                            self._entries.popitem(last=False)
+            return result
+        return wrapper
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'generation': self.generation,
+            }
@@ -0,0 +1,242 @@
+"""Per-statement timing for the SQLite connections in the pool.
+
+Connections opened with TracedConnection record every statement they run
+(normalized SQL, duration including row fetching, rows, calling function)
+into the module-level tracer. Connections opened with the plain
+sqlite3.Connection factory pay nothing, so tracing is off by default.
+
+    python query_trace.py query_trace.json
+
+prints the report for a dump written with QUERY_TRACE_DUMP.
+"""
+import re
+import sys
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left
+from functools import lru_cache
+import sqlite3
+
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float('inf'))
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=1024)
+def normalize(sql: str) -> str:
+    """Collapse whitespace and replace literals with ? so equal queries group together"""
+    return _LITERALS.sub('?', _SPACES.sub(' ', sql).strip())
+
+
+class QueryStats:
+    __slots__ = ('calls', 'total', 'max', 'rows', 'histogram', 'callers')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.histogram = [0] * len(BUCKETS_MS)
+        self.callers = {}
+
+    def percentile(self, pct):
+        """Upper bound (ms) of the bucket holding the pct-th percentile"""
+        rank = pct / 100 * self.calls
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.histogram):
+            seen += count
+            if seen >= rank and count:
+                return min(bound, self.max * 1000)
+        return self.max * 1000
+
+    def as_dict(self):
+        return {
+            'calls': self.calls,
+            'total_ms': self.total * 1000,
+            'mean_ms': self.total * 1000 / self.calls if self.calls else 0.0,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': self.max * 1000,
+            'rows': self.rows,
+            'histogram': dict(zip(map(str, BUCKETS_MS), self.histogram)),
+            'callers': dict(self.callers),
+        }
+
+
+class QueryTracer:
+    """Collects per-query latency histograms and logs slow statements"""
+
+    def __init__(self, slow_ms=100.0, enabled=False):
+        self.slow_ms = slow_ms
+        self.enabled = enabled
+        self._queries = {}
+        self._lock = threading.Lock()
+
+    def record(self, sql, seconds, rows, caller):
+        query = normalize(sql)
+        rows = max(rows, 0)     # rowcount is -1 for DDL
+        with self._lock:
+            stats = self._queries.get(query)
+            if stats is None:
+                stats = self._queries[query] = QueryStats()
+            stats.calls += 1
+            stats.total += seconds
+            stats.rows += rows
+            if seconds > stats.max:
+                stats.max = seconds
+            stats.histogram[bisect_left(BUCKETS_MS, seconds * 1000)] += 1
+            stats.callers[caller] = stats.callers.get(caller, 0) + 1
+        if seconds * 1000 >= self.slow_ms:
+            logging.warning("Slow query (%.1f ms, %s rows) in %s: %s", seconds * 1000, rows, caller, query)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {query: stats.as_dict() for query, stats in self._queries.items()}
+
+    def reset(self):
+        with self._lock:
+            self._queries.clear()
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def report(self, limit=20, sort='total_ms') -> str:
+        return format_report(self.snapshot(), limit, sort)
+
+
+def format_report(snapshot, limit=20, sort='total_ms') -> str:
+    """Render a snapshot as a table, slowest (by sort key) first"""
+    rows = sorted(snapshot.items(), key=lambda item: item[1][sort], reverse=True)[:limit]
+    lines = [f"{'calls':>8}{'total ms':>11}{'mean':>9}{'p95':>9}{'max':>9}{'rows':>9}  query / callers"]
+    for query, stats in rows:
+        lines.append(f"{stats['calls']:>8}{stats['total_ms']:>11.1f}{stats['mean_ms']:>9.3f}"
+                     f"{stats['p95_ms']:>9.3f}{stats['max_ms']:>9.3f}{stats['rows']:>9}  {query[:100]}")
+        callers = ', '.join(f'{name} ({count})' for name, count in
+                            sorted(stats['callers'].items(), key=lambda item: -item[1]))
+        lines.append(f"{'':>55}  {callers}")
+    return '\n'.join(lines)
+
+
+tracer = QueryTracer()
+
+
+def _caller():
+    """module.function of the first frame outside this module"""
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+    if frame is None:
+        return '?'
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}"
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor that times execute plus every fetch until the result is consumed"""
+
+    _pending = None     # [sql, seconds, rows, caller] of a SELECT still being read
+
+    def _finish(self):
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            tracer.record(*pending)
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        caller = _caller()
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        elapsed = time.perf_counter() - started
+        if self.description is None:
+            tracer.record(sql, elapsed, self.rowcount, caller)
+        else:
+            self._pending = [sql, elapsed, 0, caller]
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        caller = _caller()
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        tracer.record(sql, time.perf_counter() - started, self.rowcount, caller)
+        return self
+
+    def _fetched(self, started, rows, done):
+        pending = self._pending
+        if pending is not None:
+            pending[1] += time.perf_counter() - started
+            pending[2] += rows
+            if done:
+                self._finish()
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(started, len(rows), not rows)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows), True)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0, True)
+            raise
+        self._fetched(started, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # Covers result sets read with a single fetchone() and then dropped
+        self._finish()
+
+
+class TracedConnection(sqlite3.Connection):
+    """Connection factory whose statements go through TracedCursor"""
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Print a query trace dump')
+    parser.add_argument('path', help="JSON written by QueryTracer.dump")
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--sort', choices=['total_ms', 'mean_ms', 'p95_ms', 'max_ms', 'calls', 'rows'],
+                        default='total_ms')
+    args = parser.parse_args(argv)
+    with open(args.path) as f:
+        print(format_report(json.load(f), args.limit, args.sort))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import time
+import logging
+import sqlite3
+import itertools
+import threading
+from contextlib import contextmanager
+
+
+class ReadReplica:
+    """In-memory copy of a database file for read-only queries.
+
+    The file is copied with the SQLite backup API into a shared-cache
+    memory database; each reader thread gets its own connection to the
+    copy, so reads never touch the file or wait for its writers. A copy
+    is served for at most max_staleness seconds after it was last known
+    to match the file. A refresh first compares PRAGMA data_version and
+    only copies again if someone committed since. A background thread
+    refreshes every refresh_interval seconds, so reads rarely have to.
+    A new copy is built beside the old one and swapped in, so readers
+    never wait for a copy; reader connections left on the old copy are
+    closed as soon as they are idle, so it is freed. Has the connection()
+    interface of ConnectionPool, to be selected with database.using_pool().
+    """
+
+    _names = itertools.count()
+
+    def __init__(self, source, max_staleness=1.0, refresh_interval=None, fallback=None):
+        self.source = source
+        self.max_staleness = max_staleness
+        self.refresh_interval = refresh_interval or max_staleness / 2
+        self.fallback = fallback
+        self.copies = 0
+        self.skipped = 0
+        self.fallbacks = 0
+        self.copy_seconds = 0.0
+        self._lock = threading.Lock()           # one refresh at a time
+        self._swap_lock = threading.Lock()      # _current, _readers and _holders
+        self._readers = {}          # thread ident -> (uri, its connection to that copy)
+        self._holders = {}          # thread ident -> connection it is reading with
+        self._current = None        # (uri, connection keeping the copy alive)
+        self._closed = False
+        self._verified = float('-inf')
+        self._data_version = None
+        self._monitor = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def age(self) -> float:
+        """Seconds since the copy was last known to match the file"""
+        return time.monotonic() - self._verified
+
+    def refresh(self, force=False) -> bool:
+        """Bring the copy up to date; returns True if the file had to be copied again"""
+        with self._lock:
+            if self._closed:
+                raise sqlite3.OperationalError('Replica is closed')
+            checked = time.monotonic()
+            if self._monitor is None:
+                self._monitor = sqlite3.connect(self.source, check_same_thread=False)
+            version = self._monitor.execute('PRAGMA data_version').fetchone()[0]
+            if not force and self._current is not None and version == self._data_version:
+                self._verified = checked
+                self.skipped += 1
+                return False
+
+            started = time.perf_counter()
+            uri = f'file:library-replica-{next(self._names)}?mode=memory&cache=shared'
+            copy = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self._monitor.backup(copy)
+            self.copy_seconds = time.perf_counter() - started
+            with self._swap_lock:
+                old, self._current = self._current, (uri, copy)
+                idle = self._drop_readers(uri)
+            # Anything committed after the version was read is caught by the next check
+            self._data_version = version
+            self._verified = checked
+            self.copies += 1
+        # Readers still busy on the old copy keep it alive until their read ends
+        for conn in idle:
+            conn.close()
+        if old is not None:
+            old[1].close()
+        logging.debug("Replica of %s refreshed in %.1f ms", self.source, self.copy_seconds * 1000)
+        return True
+
+    @contextmanager
+    def connection(self):
+        """This thread's connection to a copy no older than max_staleness"""
+        stale = self.age() > self.max_staleness
+        if stale:
+            try:
+                self.refresh()
+                stale = False
+            except sqlite3.Error as e:
+                if self.fallback is None:
+                    raise
+                logging.warning("Replica refresh failed, reading %s directly: %s", self.source, e)
+                self.fallbacks += 1
+        thread_id = threading.get_ident()
+        conn = None
+        if not stale:
+            # Connecting under the lock: the copy cannot be swapped out and freed meanwhile
+            with self._swap_lock:
+                if self._current is not None:
+                    uri = self._current[0]
+                    reader = self._readers.get(thread_id)
+                    if reader is None or reader[0] != uri:
+                        if reader is not None:
+                            reader[1].close()
+                        reader = (uri, sqlite3.connect(uri, uri=True, check_same_thread=False))
+                        reader[1].execute('PRAGMA query_only = 1')
+                        self._readers[thread_id] = reader
+                    conn = self._holders[thread_id] = reader[1]
+        if conn is None:
+            if self.fallback is None:
+                raise sqlite3.OperationalError('Replica is closed')
+            with self.fallback.connection() as conn:
+                yield conn
+            return
+        try:
+            yield conn
+        finally:
+            with self._swap_lock:
+                del self._holders[thread_id]
+                current = self._current[0] if self._current is not None else None
+                if self._readers[thread_id][0] != current:
+                    del self._readers[thread_id]
+                else:
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def _drop_readers(self, current):
+        """Forget idle reader connections not on the current copy; returns them to be closed"""
+        idle = []
+        for thread_id, (uri, conn) in list(self._readers.items()):
+            if uri != current and thread_id not in self._holders:
+                del self._readers[thread_id]
+                idle.append(conn)
+        return idle
+
+    def interrupt(self, thread_id):
+        """Interrupt the query thread_id is running on the copy, if any"""
+        with self._swap_lock:
+            conn = self._holders.get(thread_id)
+            if conn is not None:
+                conn.interrupt()
+        if self.fallback is not None:
+            self.fallback.interrupt(thread_id)
+
+    def start(self):
+        """Copy now and keep refreshing on a background thread"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='db-replica', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except sqlite3.Error as e:
+                logging.warning("Replica refresh failed: %s", e)
+            if self._stop.wait(self.refresh_interval):
+                break
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            self._closed = True
+            with self._swap_lock:
+                current, self._current = self._current, None
+                # Busy readers close their own connection when their read ends
+                idle = self._drop_readers(None)
+            for conn in idle:
+                conn.close()
+            if current is not None:
+                current[1].close()
+            if self._monitor is not None:
+                self._monitor.close()
+                self._monitor = None
+            self._verified = float('-inf')
+
+    def stats(self) -> dict:
+        return {
+            'copies': self.copies,
+            'skipped': self.skipped,
+            'fallbacks': self.fallbacks,
+            'age': self.age(),
+            'last_copy_ms': self.copy_seconds * 1000,
+            'max_staleness': self.max_staleness,
+        }
@@ -0,0 +1,176 @@
+import os
+import hmac
+import time
+import base64
+import hashlib
+import logging
+import secrets
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from database import get_connection, PEPPER
+from migrations import SESSION_USER_SQL, REVOKE_USER_SESSIONS_SQL, SWEEP_SESSIONS_SQL
+
+
+SESSION_SECRET     = os.getenv('SESSION_SECRET', '').encode() or PEPPER
+SESSION_TTL        = int(os.getenv('SESSION_TTL', '28800'))
+SESSION_CACHE_SIZE = int(os.getenv('SESSION_CACHE_SIZE', '1024'))
+SESSION_CACHE_TTL  = float(os.getenv('SESSION_CACHE_TTL', '5'))
+SESSION_SWEEP_INTERVAL = float(os.getenv('SESSION_SWEEP_INTERVAL', '3600'))
+
+
+class SessionCache:
+    """Small thread-safe LRU of recently validated sessions.
+
+    An entry is served for at most ttl seconds after the table was checked,
+    so a session revoked by another process stops working within ttl.
+    """
+
+    def __init__(self, maxsize, ttl=SESSION_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[2] >= self.ttl:
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return entry
+
+    def put(self, session_id, user, expires_at):
+        with self._lock:
+            self._entries[session_id] = (user, expires_at, time.monotonic())
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def discard_user(self, user_id):
+        with self._lock:
+            for session_id in [k for k, entry in self._entries.items() if entry[0]['user_id'] == user_id]:
+                del self._entries[session_id]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+cache = SessionCache(SESSION_CACHE_SIZE)
+
+
+def _sign(payload: str) -> str:
+    digest = hmac.new(SESSION_SECRET, payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+def _parse(token: str):
+    """Return (session_id, user_id, expires_at) if the signature checks out"""
+    try:
+        session_id, user_id, expires_at, signature = token.split('.')
+        payload = f'{session_id}.{user_id}.{expires_at}'
+        if not hmac.compare_digest(signature, _sign(payload)):
+            return None
+        return session_id, int(user_id), int(expires_at)
+    except (AttributeError, ValueError):
+        return None
+
+def create_session(user_id: int, ttl: int = None) -> str:
+    """Store a new session for user_id and return its signed token"""
+    now = time.time()
+    expires_at = int(now + (ttl or SESSION_TTL))
+    session_id = secrets.token_urlsafe(16)
+    with get_connection() as conn:
+        conn.execute(
+            'INSERT INTO sessions (session_id, user_id, created_at, expires_at) VALUES (?, ?, ?, ?)',
+            (session_id, user_id, now, expires_at)
+        )
+    return f'{session_id}.{user_id}.{expires_at}.{_sign(f"{session_id}.{user_id}.{expires_at}")}'
+
+def validate_session(token: str) -> dict:
+    """Return the user for a live session token, or None.
+
+    A forged or expired token is rejected without touching the database;
+    sessions validated in the last SESSION_CACHE_TTL seconds are answered
+    from the in-memory LRU.
+    """
+    parsed = _parse(token)
+    if parsed is None:
+        return None
+    session_id, _, expires_at = parsed
+    if expires_at <= time.time():
+        cache.discard(session_id)
+        return None
+
+    entry = cache.get(session_id)
+    if entry is not None:
+        return dict(entry[0])
+
+    try:
+        with get_connection() as conn:
+            row = conn.execute(SESSION_USER_SQL, (session_id,)).fetchone()
+    except sqlite3.Error as e:
+        logging.error("Session lookup error: %s", e)
+        return None
+    if row is None or row[3] <= time.time():
+        return None
+    user = {'user_id': row[0], 'username': row[1], 'email': row[2]}
+    cache.put(session_id, user, row[3])
+    return dict(user)
+
+def revoke_session(token: str) -> bool:
+    """Revoke a single session (logout)"""
+    parsed = _parse(token)
+    if parsed is None:
+        return False
+    with get_connection() as conn:
+        cursor = conn.execute('UPDATE sessions SET revoked = 1, expires_at = 0 WHERE session_id = ?',
+                              (parsed[0],))
+    cache.discard(parsed[0])
+    return cursor.rowcount > 0
+
+def revoke_user_sessions(user_id: int) -> int:
+    """Revoke every session belonging to user_id"""
+    with get_connection() as conn:
+        cursor = conn.execute(REVOKE_USER_SESSIONS_SQL, (user_id,))
+    cache.discard_user(user_id)
+    return cursor.rowcount
+
+def sweep_sessions(now: float = None, batch_size: int = 5000) -> int:
+    """Delete expired and revoked sessions in short batches; returns rows removed.
+
+    Revoking a session also zeroes its expires_at, so one index range finds both.
+    """
+    now = time.time() if now is None else now
+    removed = 0
+    while True:
+        with get_connection() as conn:
+            cursor = conn.execute(SWEEP_SESSIONS_SQL, (now, batch_size))
+            removed += cursor.rowcount
+        if cursor.rowcount < batch_size:
+            break
+    logging.info("Swept %s expired sessions", removed)
+    return removed
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Delete expired and revoked login sessions")
+    parser.add_argument('--batch', type=int, default=5000)
+    parser.add_argument('--every', type=float, default=0,
+                        help="repeat the sweep every this many seconds (0 runs once)")
+    args = parser.parse_args()
+
+    while True:
+        print(f"Removed {sweep_sessions(batch_size=args.batch)} sessions")
+        if not args.every:
+            break
+        time.sleep(args.every)
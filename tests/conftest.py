@@ -0,0 +1,38 @@
+import os
+import tempfile
+
+import pytest
+
+# database.py reads its settings at import time, so point it at a scratch
+# directory and a cheap bcrypt cost before any test imports it
+_scratch = tempfile.mkdtemp(prefix='library-tests-')
+os.environ['DATABASE_NAME'] = os.path.join(_scratch, 'library.db')
+os.environ['LOG_FILE'] = os.path.join(_scratch, 'library.log')
+os.environ['BCRYPT_ROUNDS'] = '4'
+os.environ['HASH_WORKERS'] = '0'
+os.environ['DB_REPLICA'] = '0'
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    """database.py pointed at a fresh, migrated database file"""
+    import database
+
+    path = str(tmp_path / 'library.db')
+    database.disable_replica()
+    database.pool.close_all()
+    monkeypatch.setattr(database.pool, 'database', path)
+    monkeypatch.setattr(database, 'DATABASE_NAME', path)
+    database.query_cache.bump()
+    database.create_database()
+    yield database
+    database.disable_replica()
+    database.pool.close_all()
+    database.query_cache.bump()
+
+
+@pytest.fixture
+def user(library):
+    """A signed-up account as the dict authenticate() returns"""
+    assert library.sign_up('reader', 'Password1', 'reader@example.com')
+    return library.authenticate('reader', 'Password1')
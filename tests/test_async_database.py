@@ -0,0 +1,140 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+import async_database as adb
+
+
+def run(coro):
+    """Run coro on a fresh loop and stop the writer and readers afterwards"""
+    async def main():
+        try:
+            return await coro
+        finally:
+            await adb.close()
+    return asyncio.run(main())
+
+@pytest.fixture
+def books(library):
+    for i in range(1, 5):
+        assert library.add_book(f'Title {i}', f'Author {i}')
+    return library
+
+
+def test_reads_run_side_by_side(library):
+    def slow_read():
+        with library.get_connection() as conn:
+            conn.execute('SELECT COUNT(*) FROM books').fetchone()
+            time.sleep(0.2)
+        return True
+
+    async def elapsed(readers):
+        await adb.set_readers(readers)
+        started = time.perf_counter()
+        assert all(await asyncio.gather(*(adb.run_read(slow_read) for _ in range(4))))
+        return time.perf_counter() - started
+
+    async def main():
+        return await elapsed(1), await elapsed(4)
+
+    one, four = run(main())
+    assert one >= 0.8
+    assert four < one / 2
+
+def test_writes_run_one_at_a_time_on_the_writer(library):
+    threads = set()
+    active = []
+    overlapped = []
+
+    def write(i):
+        threads.add(threading.current_thread().name)
+        active.append(i)
+        overlapped.append(len(active) > 1)
+        result = library.add_book(f'Title {i}', 'Author')
+        active.remove(i)
+        return result
+
+    async def main():
+        results = await asyncio.gather(*(adb.run_write(write, i) for i in range(50)))
+        return results, adb.writer().stats()
+
+    results, stats = run(main())
+    assert all(results)
+    assert not any(overlapped)
+    assert len(threads) == 1
+    assert stats['operations'] == 50
+    assert stats['batches'] < 50
+    assert library.count_books() == 50
+
+def test_failed_write_is_rolled_back(books, user):
+    # An open loan on book 2 makes lending it hit the unique index half-way through
+    with books.get_connection() as conn:
+        conn.execute('INSERT INTO loans (book_id, user_id, borrowed_at) VALUES (2, ?, 0)', (user['user_id'],))
+
+    assert run(adb.borrow_books(user, [1, 2])) == []
+    with books.get_connection() as conn:
+        statuses = conn.execute('SELECT status FROM books WHERE book_id IN (1, 2)').fetchall()
+        loans = conn.execute('SELECT COUNT(*) FROM loans WHERE book_id = 1').fetchone()[0]
+    assert statuses == [('Available',), ('Available',)]
+    assert loans == 0
+
+def test_failed_write_does_not_undo_the_rest_of_its_batch(books, user):
+    async def main():
+        return await asyncio.gather(
+            adb.borrow_book(user, 1),
+            adb.return_book(user['user_id'], 3),
+            adb.borrow_book(user, 4),
+        )
+
+    assert run(main()) == [True, False, True]
+    with books.get_connection() as conn:
+        borrowed = conn.execute("SELECT book_id FROM books WHERE status = 'Borrowed' ORDER BY book_id").fetchall()
+    assert borrowed == [(1,), (4,)]
+
+def test_reads_do_not_hold_a_connection_outside_their_queries(library):
+    def not_a_query():
+        return library.pool.stats()['in_use']
+
+    assert run(adb.run_read(not_a_query)) == 0
+
+def test_writer_keeps_a_connection_while_every_reader_holds_one(library, monkeypatch):
+    monkeypatch.setattr(library.pool, 'max_connections', 2)
+    monkeypatch.setattr(library.pool, 'timeout', 2.0)
+    release = threading.Event()
+
+    def hold_connection():
+        with library.get_connection():
+            release.wait(5)
+        return True
+
+    async def main():
+        await adb.set_readers(2)
+        reads = [asyncio.ensure_future(adb.run_read(hold_connection)) for _ in range(2)]
+        await asyncio.sleep(0.1)
+        added = await adb.add_book('Dune', 'Frank Herbert')
+        release.set()
+        return added, await asyncio.gather(*reads)
+
+    added, reads = run(main())
+    assert added and all(reads)
+    assert library.pool.max_connections >= 3
+
+def test_timed_out_read_is_interrupted(books):
+    def endless():
+        with books.get_connection() as conn:
+            return conn.execute('''
+                WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n)
+                SELECT COUNT(*) FROM n
+            ''').fetchone()
+
+    async def main():
+        started = time.perf_counter()
+        with pytest.raises(asyncio.TimeoutError):
+            await adb.run_read(endless, timeout=0.2)
+        # The reader is free again once the query is interrupted
+        assert await adb.count_books(timeout=2) == 4
+        return time.perf_counter() - started
+
+    assert run(main()) < 2
@@ -0,0 +1,42 @@
+from query_cache import QueryCache
+
+
+def test_book_counts_stay_a_dict_on_repeated_calls(library):
+    library.query_cache.enabled = True
+    assert library.add_book('Dune', 'Frank Herbert', 'fiction', 'science')
+
+    first = library.get_book_counts()
+    second = library.get_book_counts()
+    assert first == second
+    assert second['total'] == 1
+    assert second['status'] == {'Available': 1}
+    assert second['genre'] == {'science': 1}
+
+def test_book_counts_follow_writes(library):
+    assert library.add_book('Dune', 'Frank Herbert')
+    assert library.get_book_counts()['total'] == 1
+    assert library.add_book('Emma', 'Jane Austen')
+    assert library.get_book_counts()['total'] == 2
+
+def test_cache_returns_non_list_results_unchanged():
+    cache = QueryCache()
+    calls = []
+
+    @cache.cached
+    def lookup(key):
+        calls.append(key)
+        return {'key': key}
+
+    assert lookup('a') == {'key': 'a'}
+    assert lookup('a') == {'key': 'a'}
+    assert calls == ['a']
+
+def test_cached_lists_are_copies():
+    cache = QueryCache()
+
+    @cache.cached
+    def rows():
+        return [(1, 'Dune')]
+
+    rows().append((2, 'Emma'))
+    assert rows() == [(1, 'Dune')]
@@ -0,0 +1,70 @@
+import time
+
+from db_worker import DBExecutor
+
+
+class FakeWindow:
+    """Collects after() callbacks so a test can run the Tk loop by hand"""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, callback, *args):
+        self.scheduled.append((callback, args))
+
+    def run(self, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while self.scheduled and time.monotonic() < deadline:
+            callback, args = self.scheduled.pop(0)
+            callback(*args)
+            time.sleep(0.005)
+
+
+class FakeButton:
+    def __init__(self):
+        self.states = []
+
+    def winfo_exists(self):
+        return True
+
+    def state(self, state):
+        self.states.append(state[0])
+
+
+def test_raising_callback_does_not_stop_later_results():
+    window = FakeWindow()
+    executor = DBExecutor(window, max_workers=1)
+    button = FakeButton()
+    delivered = []
+
+    def explode(_):
+        raise RuntimeError("callback bug")
+
+    executor.submit(lambda: 1, on_success=explode, widgets=(button,))
+    executor.submit(lambda: 2, on_success=delivered.append, widgets=(button,))
+    window.run()
+    executor.submit(lambda: 3, on_success=delivered.append)
+    window.run()
+    executor.shutdown(wait=True)
+
+    assert delivered == [2, 3]
+    assert button.states[-1] == '!disabled'
+    assert not executor._polling
+
+def test_raising_error_callback_is_contained():
+    window = FakeWindow()
+    executor = DBExecutor(window, max_workers=1)
+    delivered = []
+
+    def fail():
+        raise ValueError("query failed")
+
+    def bad_handler(error):
+        raise RuntimeError("handler bug")
+
+    executor.submit(fail, on_error=bad_handler)
+    executor.submit(lambda: 'next', on_success=delivered.append)
+    window.run()
+    executor.shutdown(wait=True)
+
+    assert delivered == ['next']
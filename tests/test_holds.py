@@ -0,0 +1,60 @@
+from catalog_import import import_books
+
+
+def _second_user(library):
+    assert library.sign_up('waiting', 'Password1', 'waiting@example.com')
+    return library.authenticate('waiting', 'Password1')
+
+def _book(library, book_id):
+    with library.get_connection() as conn:
+        return conn.execute('SELECT status, borrower_id, borrowed_at, due_date FROM books WHERE book_id = ?',
+                            (book_id,)).fetchone()
+
+
+def test_deleting_a_borrower_frees_their_copies(library, user):
+    assert library.add_book('Dune', 'Frank Herbert')
+    assert library.borrow_book(user, 1)
+
+    assert library.delete_user(user['user_id'])
+    assert _book(library, 1) == ('Available', None, None, None)
+    assert library.get_book_counts()['status'] == {'Available': 1}
+
+def test_deleting_a_borrower_serves_the_hold_queue(library, user):
+    other = _second_user(library)
+    assert library.add_book('Dune', 'Frank Herbert')
+    assert library.borrow_book(user, 1)
+    title_id = library.get_title(book_id=1)['title_id']
+    assert library.place_hold(other, title_id)['status'] == 'Waiting'
+
+    assert library.delete_user(user['user_id'])
+    status, borrower_id, _, due_date = _book(library, 1)
+    assert (status, borrower_id) == ('Borrowed', other['user_id'])
+    assert due_date is not None
+    assert library.get_user_holds(other['user_id'])[0][4] == 'Fulfilled'
+
+def test_deleted_user_is_not_served_their_own_hold(library, user):
+    other = _second_user(library)
+    assert library.add_book('Dune', 'Frank Herbert')
+    assert library.borrow_book(other, 1)
+    title_id = library.get_title(book_id=1)['title_id']
+    assert library.place_hold(user, title_id)['status'] == 'Waiting'
+    assert library.borrow_book(user, 1) is False
+
+    assert library.delete_user(user['user_id'])
+    assert library.return_book(other['user_id'], 1)
+    assert _book(library, 1)[0] == 'Available'
+
+def test_imported_copies_go_to_waiting_holds(library, user):
+    assert library.add_book('Dune', 'Frank Herbert')
+    assert library.borrow_book(user, 1)
+    other = _second_user(library)
+    title_id = library.get_title(book_id=1)['title_id']
+    assert library.place_hold(other, title_id)['status'] == 'Waiting'
+    # Re-label the only copy so the feed's copy is new to the catalogue
+    with library.get_connection() as conn:
+        conn.execute("UPDATE books SET title = 'Dune (damaged)' WHERE book_id = 1")
+
+    stats = import_books([{'title': 'Dune', 'author': 'Frank Herbert'}, {'title': 'Emma', 'author': 'Jane Austen'}])
+    assert stats['inserted'] == 2
+    assert _book(library, 2)[:2] == ('Borrowed', other['user_id'])
+    assert _book(library, 3)[:2] == ('Available', None)
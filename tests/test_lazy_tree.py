@@ -0,0 +1,134 @@
+import threading
+
+from db_worker import DBExecutor
+from lazy_tree import LazyTreeLoader, TreeReconciler
+from test_db_worker import FakeWindow
+
+
+class FakeTree:
+    """The slice of ttk.Treeview that lazy_tree uses, kept in a list"""
+
+    def __init__(self):
+        self.order = []
+        self.values = {}
+
+    def winfo_exists(self):
+        return True
+
+    def configure(self, **options):
+        pass
+
+    def insert(self, parent, index, iid, values):
+        self.order.insert(len(self.order) if index == 'end' else index, iid)
+        self.values[iid] = values
+
+    def item(self, iid, values):
+        self.values[iid] = values
+
+    def move(self, iid, parent, index):
+        self.order.remove(iid)
+        self.order.insert(index, iid)
+
+    def delete(self, *iids):
+        for iid in iids:
+            self.order.remove(iid)
+            del self.values[iid]
+
+    def get_children(self):
+        return tuple(self.order)
+
+    def yview(self):
+        return 0.0, 1.0
+
+    def yview_moveto(self, fraction):
+        pass
+
+    def after_idle(self, callback, *args):
+        callback(*args)
+
+
+def test_loader_reads_off_the_calling_thread():
+    window = FakeWindow()
+    executor = DBExecutor(window, max_workers=1)
+    tree = FakeTree()
+    books = [(book_id, f'Book {book_id}') for book_id in range(1, 6)]
+    threads = set()
+
+    def fetch_page(after_book_id=None, before_book_id=None, limit=None):
+        threads.add(threading.current_thread())
+        return [row for row in books if after_book_id is None or row[0] > after_book_id][:limit]
+
+    def count_rows():
+        threads.add(threading.current_thread())
+        return len(books)
+
+    loader = LazyTreeLoader(tree, fetch_page, count_rows=count_rows, executor=executor)
+    loader.reset()
+    assert tree.order == []
+    window.run()
+    assert tree.order == ['1', '2', '3', '4', '5']
+    assert loader.total == 5
+
+    books[1] = (2, 'Book 2 (borrowed)')
+    loader.refresh()
+    window.run()
+    executor.shutdown(wait=True)
+    assert tree.values['2'] == (2, 'Book 2 (borrowed)')
+    assert threading.current_thread() not in threads
+
+def test_search_results_are_not_overwritten_by_a_late_refresh():
+    window = FakeWindow()
+    executor = DBExecutor(window, max_workers=1)
+    tree = FakeTree()
+    loader = LazyTreeLoader(tree, lambda **kwargs: [(1, 'Dune'), (2, 'Emma')], executor=executor)
+    loader.reset()
+    window.run()
+
+    loader.refresh()
+    loader.show_rows([(7, 'Hits')])
+    window.run()
+    executor.shutdown(wait=True)
+    assert tree.order == ['7']
+
+
+def test_sync_puts_existing_rows_in_the_given_order():
+    tree = FakeTree()
+    view = TreeReconciler(tree)
+    view.sync([(book_id, f'Book {book_id}') for book_id in range(1, 6)])
+
+    view.sync([(4, 'Book 4'), (2, 'Book 2'), (9, 'Book 9')])
+    assert tree.order == ['4', '2', '9']
+
+    view.sync([(9, 'Book 9'), (2, 'Book 2'), (4, 'Book 4 (borrowed)')])
+    assert tree.order == ['9', '2', '4']
+    assert tree.values['4'] == (4, 'Book 4 (borrowed)')
+
+def test_sync_leaves_rows_in_place_when_the_order_holds():
+    tree = FakeTree()
+    moves = []
+    tree.move = lambda iid, parent, index: moves.append(iid)
+    view = TreeReconciler(tree)
+    view.sync([(1, 'a'), (2, 'b'), (3, 'c')])
+    view.sync([(1, 'a'), (3, 'c'), (4, 'd')])
+    assert tree.order == ['1', '3', '4']
+    assert moves == []
+
+def test_refresh_keeps_paging_after_more_than_a_page_was_added():
+    tree = FakeTree()
+    books = [(book_id, f'Book {book_id}') for book_id in range(1, 41)]
+
+    def fetch_page(after_book_id=None, before_book_id=None, limit=None):
+        if before_book_id is not None:
+            return [row for row in books if row[0] < before_book_id][-limit:]
+        return [row for row in books if after_book_id is None or row[0] > after_book_id][:limit]
+
+    loader = LazyTreeLoader(tree, fetch_page, page_size=50, max_rows=200)
+    loader.reset()
+    assert len(tree.order) == 40
+
+    books.extend((book_id, f'Book {book_id}') for book_id in range(41, 390))
+    loader.refresh()
+    for _ in range(20):
+        loader._on_scroll(0.95, 1.0)
+    assert tree.order[-1] == '389'
+    assert tree.order == [str(book_id) for book_id in range(int(tree.order[0]), 390)]
@@ -0,0 +1,35 @@
+import asyncio
+
+import async_database as adb
+from library_service import LibraryService, PAGE_LIMIT
+
+
+def request(method, path, query=None):
+    async def main():
+        try:
+            return await LibraryService().dispatch(method, path, query or {}, {}, b'')
+        finally:
+            await adb.close()
+    return asyncio.run(main())
+
+def _catalog(library, count):
+    with library.get_connection() as conn:
+        conn.executemany('INSERT INTO books (title, author) VALUES (?, ?)',
+                         ((f'Shadow {i}', f'Author {i}') for i in range(count)))
+
+
+def test_book_pages_never_exceed_the_page_limit(library):
+    _catalog(library, PAGE_LIMIT + 10)
+    for limit in ('-1', '0', str(PAGE_LIMIT + 1)):
+        status, body = request('GET', '/books', {'limit': limit})
+        assert status == 200
+        assert 1 <= len(body['books']) <= PAGE_LIMIT
+
+def test_search_clamps_limit_and_rejects_negative_offset(library):
+    _catalog(library, PAGE_LIMIT + 10)
+    status, body = request('GET', '/books/search', {'q': 'shadow', 'limit': '-1'})
+    assert status == 200
+    assert 1 <= len(body['books']) <= PAGE_LIMIT
+
+    status, body = request('GET', '/books/search', {'q': 'shadow', 'offset': '-5'})
+    assert status == 400
@@ -0,0 +1,6 @@
+from migrations import check_query_plans
+
+
+def test_hot_queries_use_indexes(library):
+    with library.get_connection() as conn:
+        assert check_query_plans(conn) == {}
@@ -0,0 +1,42 @@
+import time
+
+from overdue import sweep_overdue, get_overdue_report
+
+
+def test_sweep_flags_each_overdue_loan_once(library, user):
+    for i in range(5):
+        assert library.add_book(f'Title {i}', 'Author')
+        assert library.borrow_book(user, i + 1)
+    later = time.time() + (library.LOAN_DAYS + 1) * 86400
+
+    first = sweep_overdue(now=later, chunk_size=2, pause=0)
+    again = sweep_overdue(now=later, chunk_size=2, pause=0)
+    assert (first['flagged'], first['chunks']) == (5, 3)
+    assert again['flagged'] == 0
+    assert len(get_overdue_report(now=later)[0]['items']) == 5
+
+def test_sweep_leaves_the_query_cache_alone(library, user):
+    assert library.add_book('Dune', 'Frank Herbert')
+    assert library.borrow_book(user, 1)
+    generation = library.query_cache.generation
+
+    sweep_overdue(pause=0)
+    sweep_overdue(now=time.time() + (library.LOAN_DAYS + 1) * 86400, pause=0)
+    assert library.query_cache.generation == generation
+
+def test_borrow_sets_the_due_date_in_one_update(library, user):
+    assert library.add_book('Dune', 'Frank Herbert')
+    statements = []
+    with library.write_connection() as conn:
+        conn.set_trace_callback(statements.append)
+    try:
+        assert library.borrow_book(user, 1)
+    finally:
+        with library.write_connection() as conn:
+            conn.set_trace_callback(None)
+    # The due date is set by the conditional UPDATE that marks the copy Borrowed
+    assert [s for s in statements if 'UPDATE books' in s and 'due_date' not in s] == []
+    with library.get_connection() as conn:
+        due_date = conn.execute('SELECT due_date FROM books WHERE book_id = 1').fetchone()[0]
+        due_at = conn.execute('SELECT due_at FROM loans WHERE book_id = 1').fetchone()[0]
+    assert due_date == due_at
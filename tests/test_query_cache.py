@@ -0,0 +1,19 @@
+import sqlite3
+
+
+def test_cached_reads_see_commits_from_other_connections(library):
+    library.query_cache.enabled = True
+    assert library.add_book('Dune', 'Frank Herbert')
+    assert library.get_books()[0][3] == 'Available'
+    hits = library.query_cache.hits
+    assert library.get_books()[0][3] == 'Available'
+    assert library.query_cache.hits == hits + 1
+
+    # Another desk or the service writes through its own connection
+    other = sqlite3.connect(library.DATABASE_NAME)
+    with other:
+        other.execute("UPDATE books SET status = 'Borrowed' WHERE book_id = 1")
+    other.close()
+
+    assert library.get_books()[0][3] == 'Borrowed'
+    assert library.get_books_by_author('Herbert')[0][3] == 'Borrowed'
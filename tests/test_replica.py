@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import subprocess
+
+
+def test_replica_reads_respect_the_staleness_bound_with_the_cache_on(library, user):
+    library.query_cache.enabled = True
+    assert library.add_book('Dune', 'Frank Herbert')
+    replica = library.enable_replica(max_staleness=0.3, refresh_interval=0.1)
+    assert library.get_books()[0][3] == 'Available'
+
+    assert library.borrow_book(user, 1)
+    # Read at once, while the copy may still show the book on the shelf
+    library.get_books()
+    library.get_books_by_author('Herbert')
+    time.sleep(replica.max_staleness + 0.2)
+    assert library.get_books()[0][3] == 'Borrowed'
+    assert library.get_books_by_author('Herbert')[0][3] == 'Borrowed'
+
+def test_replica_is_not_started_on_import(tmp_path):
+    env = dict(os.environ, DB_REPLICA='1', DATABASE_NAME=str(tmp_path / 'library.db'))
+    out = subprocess.run([sys.executable, '-c', 'import database; print(database.replica)'],
+                         env=env, capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert out.stdout.strip() == 'None'
+
+
+def _replica(tmp_path, **kwargs):
+    import sqlite3
+    from replica import ReadReplica
+
+    path = str(tmp_path / 'source.db')
+    with sqlite3.connect(path) as conn:
+        conn.execute('CREATE TABLE t (x)')
+        conn.execute('INSERT INTO t VALUES (1)')
+    return path, ReadReplica(path, max_staleness=60, **kwargs)
+
+def _read_on_threads(replica, count):
+    import threading
+
+    def read():
+        with replica.connection() as conn:
+            conn.execute('SELECT x FROM t').fetchall()
+
+    threads = [threading.Thread(target=read) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def test_refresh_closes_idle_readers_on_the_old_copy(tmp_path):
+    import sqlite3
+
+    path, replica = _replica(tmp_path)
+    replica.refresh()
+    _read_on_threads(replica, 4)
+    assert replica._readers
+
+    with sqlite3.connect(path) as conn:
+        conn.execute('INSERT INTO t VALUES (2)')
+    assert replica.refresh()
+    assert replica._readers == {}
+    replica.close()
+
+def test_close_closes_every_reader(tmp_path):
+    import sqlite3
+    import pytest
+
+    _, replica = _replica(tmp_path)
+    replica.refresh()
+    _read_on_threads(replica, 3)
+    readers = [conn for _, conn in replica._readers.values()]
+    replica.close()
+    assert replica._readers == {}
+    for conn in readers:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute('SELECT 1')
+    # Nothing comes back to life after close
+    with pytest.raises(sqlite3.OperationalError):
+        with replica.connection():
+            pass
+
+def test_reader_busy_during_a_refresh_closes_its_connection_afterwards(tmp_path):
+    import sqlite3
+
+    path, replica = _replica(tmp_path)
+    replica.refresh()
+    with replica.connection() as conn:
+        with sqlite3.connect(path) as writer:
+            writer.execute('INSERT INTO t VALUES (2)')
+        assert replica.refresh()
+        assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 1
+    assert replica._readers == {}
+    with replica.connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 2
+    replica.close()
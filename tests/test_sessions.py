@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+import sqlite3
+import subprocess
+
+import sessions
+
+
+def test_revocation_elsewhere_ends_a_cached_session(library, user, monkeypatch):
+    monkeypatch.setattr(sessions.cache, 'ttl', 0.2)
+    token = sessions.create_session(user['user_id'])
+    assert sessions.validate_session(token)['user_id'] == user['user_id']
+
+    # The admin desk deletes the user through its own connection
+    other = sqlite3.connect(library.DATABASE_NAME)
+    with other:
+        other.execute('UPDATE sessions SET revoked = 1, expires_at = 0 WHERE user_id = ?', (user['user_id'],))
+    other.close()
+
+    time.sleep(0.3)
+    assert sessions.validate_session(token) is None
+
+def test_sweep_removes_expired_and_revoked_sessions(library, user):
+    live = sessions.create_session(user['user_id'])
+    sessions.create_session(user['user_id'], ttl=1)
+    sessions.revoke_session(sessions.create_session(user['user_id']))
+
+    assert sessions.sweep_sessions(now=time.time() + 5) == 2
+    with library.get_connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM sessions').fetchone()[0] == 1
+    assert sessions.validate_session(live) is not None
+
+def test_sweep_runs_from_the_command_line(library, user):
+    sessions.revoke_session(sessions.create_session(user['user_id']))
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, 'sessions.py'], cwd=root, capture_output=True, text=True,
+                         env=dict(os.environ, DATABASE_NAME=library.DATABASE_NAME), timeout=60)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.strip() == 'Removed 1 sessions'
+
+def test_service_sweeps_sessions_periodically(library, user):
+    import asyncio
+    import async_database as adb
+    from library_service import sweep_sessions_every
+
+    sessions.revoke_session(sessions.create_session(user['user_id']))
+
+    async def main():
+        sweeper = asyncio.create_task(sweep_sessions_every(0.05))
+        await asyncio.sleep(0.3)
+        sweeper.cancel()
+        await adb.close()
+
+    asyncio.run(main())
+    with library.get_connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM sessions').fetchone()[0] == 0